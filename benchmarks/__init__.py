@@ -0,0 +1,2 @@
+"""Benchmarks for the face blur hot paths. Run them from the repository root, e.g.
+python -m benchmarks.bench_gallery"""
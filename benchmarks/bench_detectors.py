@@ -0,0 +1,146 @@
+"""
+Detector backend comparison
+Runs every detector backend on the same frames of recorded clips and reports speed
+(per frame, one image at a time and in batches) and recall/precision against ground
+truth. Ground truth comes from an annotation file or, without one, from a reference
+detector run at full resolution with extra upsampling.
+
+    python -m benchmarks.bench_detectors clip1.mp4 clip2.mp4 --every 10 --max-frames 50
+    python -m benchmarks.bench_detectors clip.mp4 --annotations faces.json --output detectors.json
+
+Annotations are JSON: {"clip.mp4": {"<frame index>": [[top, right, bottom, left], ...]}}.
+Backends whose model files are missing are skipped (see detectors.py for the files).
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from detectors import DETECTORS, create_detector
+from face_tracking import box_iou
+
+
+def sample_frames(path: str, every: int, max_frames: int) -> List[Tuple[int, np.ndarray]]:
+    """(frame index, RGB frame) of every Nth frame of a video"""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {path}")
+    frames = []
+    index = 0
+    try:
+        while len(frames) < max_frames:
+            ok, frame_bgr = capture.read()
+            if not ok:
+                break
+            if index % every == 0:
+                frames.append((index, cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)))
+            index += 1
+    finally:
+        capture.release()
+    return frames
+
+
+def scaled(image: np.ndarray, scale: float) -> np.ndarray:
+    return image if scale == 1.0 else cv2.resize(image, (0, 0), fx=scale, fy=scale)
+
+
+def unscale(boxes, scale: float) -> list:
+    return [tuple(int(v / scale) for v in box) for box in boxes]
+
+
+def score(found: List[tuple], truth: List[tuple], iou_threshold: float) -> Tuple[int, int]:
+    """(true positives, false positives), each truth box matching at most one detection"""
+    unmatched = list(truth)
+    true_positives = 0
+    for box in found:
+        best = max(unmatched, key=lambda t: box_iou(box, t), default=None)
+        if best is not None and box_iou(box, best) >= iou_threshold:
+            unmatched.remove(best)
+            true_positives += 1
+    return true_positives, len(found) - true_positives
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("videos", nargs="+", help="recorded clips to run the detectors on")
+    parser.add_argument("--detectors", nargs="+", choices=DETECTORS, default=["hog", "ssd", "yunet", "haar"])
+    parser.add_argument("--scale", type=float, default=0.5, help="detection scale (default: %(default)s)")
+    parser.add_argument("--upsample", type=int, default=1, help="dlib upsampling for hog/cnn")
+    parser.add_argument("--batch", type=int, default=8, help="frames per detect_batch call")
+    parser.add_argument("--every", type=int, default=5, help="use every Nth frame")
+    parser.add_argument("--max-frames", type=int, default=40, help="frames per clip")
+    parser.add_argument("--model-dir", help="directory with the ssd/yunet/haar model files")
+    parser.add_argument("--annotations", help="ground truth boxes (JSON, see above)")
+    parser.add_argument("--truth", choices=DETECTORS, default="hog",
+                        help="reference detector when there are no annotations (run at full resolution)")
+    parser.add_argument("--iou", type=float, default=0.3, help="IoU needed to count a detection as a hit")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    frames = []  # (clip, frame index, frame)
+    for path in args.videos:
+        frames.extend((path, index, frame) for index, frame in sample_frames(path, args.every, args.max_frames))
+    if not frames:
+        raise SystemExit("No frames read from the clips")
+
+    if args.annotations:
+        with open(args.annotations, encoding="utf-8") as f:
+            annotations = json.load(f)
+        truth = [[tuple(box) for box in annotations.get(os.path.basename(path), annotations.get(path, {}))
+                  .get(str(index), [])] for path, index, _ in frames]
+    else:
+        reference = create_detector(args.truth, upsample=2, model_dir=args.model_dir)
+        print(f"Ground truth: {args.truth} at full resolution, upsample 2")
+        truth = [reference.detect(frame) for _, _, frame in frames]
+    truth_count = sum(len(boxes) for boxes in truth)
+    print(f"{len(frames)} frames from {len(args.videos)} clip(s), {truth_count} faces\n")
+
+    results = {"scale": args.scale, "frames": len(frames), "faces": truth_count, "detectors": {}}
+    print(f"{'detector':<8} {'input':>9} {'ms/frame':>9} {'batched':>9} {'recall':>7} {'precision':>9}")
+    for name in args.detectors:
+        try:
+            detector = create_detector(name, args.upsample, args.model_dir)
+        except ValueError as e:
+            print(f"{name:<8} skipped: {e}")
+            continue
+        images = [scaled(frame, args.scale) for _, _, frame in frames]
+        detector.detect(images[0])  # Warm-up (model load, first-call allocations)
+
+        start = time.perf_counter()
+        single = [detector.detect(image) for image in images]
+        single_ms = (time.perf_counter() - start) * 1000.0 / len(images)
+
+        start = time.perf_counter()
+        for i in range(0, len(images), args.batch):
+            detector.detect_batch(images[i:i + args.batch])
+        batched_ms = (time.perf_counter() - start) * 1000.0 / len(images)
+
+        true_positives = false_positives = 0
+        for found, expected in zip(single, truth):
+            hits, misses = score(unscale(found, args.scale), expected, args.iou)
+            true_positives += hits
+            false_positives += misses
+        row = {
+            "input_size": detector.input_size,
+            "ms_per_frame": single_ms,
+            "batched_ms_per_frame": batched_ms,
+            "recall": true_positives / truth_count if truth_count else None,
+            "precision": true_positives / max(1, true_positives + false_positives),
+        }
+        results["detectors"][name] = row
+        input_size = "x".join(map(str, detector.input_size)) if detector.input_size else "any"
+        recall = f"{row['recall']:.2f}" if row["recall"] is not None else "-"
+        print(f"{name:<8} {input_size:>9} {single_ms:>9.1f} {batched_ms:>9.1f} {recall:>7} {row['precision']:>9.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Gallery matching benchmark
+Shows how building a FaceGallery one identity at a time and FaceGallery.match scale
+with the number of references and detected faces, using synthetic dlib-like encodings.
+
+    python -m benchmarks.bench_gallery --sizes 1 100 10000 --faces 1 5 20
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from face_gallery import FaceGallery
+
+
+def synthetic_encodings(count: int, rng: np.random.Generator) -> np.ndarray:
+    """Random 128-d vectors with roughly the spread of real dlib encodings"""
+    return rng.normal(0.0, 0.09, (count, 128)).astype(np.float32)
+
+
+def time_match(gallery: FaceGallery, faces: np.ndarray, repeats: int) -> float:
+    """Median seconds per match() call"""
+    gallery.match(faces)  # Build norms and tolerances outside the timed loop
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        gallery.match(faces)
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000, 100000],
+                        help="gallery sizes (reference encodings)")
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 5, 20], help="detected faces per call")
+    parser.add_argument("--per-identity", type=int, default=5, help="reference encodings per identity")
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+
+    print(f"{'references':>10} {'build (ms)':>10} {'faces':>5} {'match (us)':>12}")
+    for size in args.sizes:
+        references = synthetic_encodings(size, rng)
+        start = time.perf_counter()
+        gallery = FaceGallery()
+        for first in range(0, size, args.per_identity):
+            gallery.add(f"person_{first // args.per_identity}", references[first:first + args.per_identity])
+        gallery.match(references[:1])  # Stacks the added rows
+        build = (time.perf_counter() - start) * 1000.0
+
+        for face_count in args.faces:
+            # Half the faces are noisy copies of references, half are strangers
+            known = references[rng.integers(0, size, face_count // 2)]
+            faces = np.vstack([known + rng.normal(0.0, 0.01, known.shape).astype(np.float32),
+                               synthetic_encodings(face_count - len(known), rng)])
+            print(f"{size:>10} {build:>10.1f} {face_count:>5} {time_match(gallery, faces, args.repeats) * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
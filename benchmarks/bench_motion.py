@@ -0,0 +1,139 @@
+"""
+Motion model benchmark
+Simulates a face panning across the screen in bursts and measures how much of it the
+blur covers when the boxes arrive late and jittery, comparing the old 5-box average
+with the Kalman filter, with and without prediction to display time.
+
+    python -m benchmarks.bench_motion --speed 1500 --latency 60 --noise 0.05
+
+Columns:
+    mean_cover: mean fraction of the true face inside the blurred area
+    exposed: share of displayed frames where more than 5% of the face shows
+    error_px: mean distance between the blurred box centre and the true face centre
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from face_tracking import BoxKalmanFilter
+
+METHODS = ("last", "average", "kalman", "predicted")
+
+
+def trajectory(seconds: float, fps: float, speed: float, face_size: int, width: int, height: int,
+               rng: np.random.Generator) -> np.ndarray:
+    """True face centre per frame: bursts of constant velocity up to speed px/s, pauses in between"""
+    frames = int(seconds * fps)
+    centres = np.zeros((frames, 2))
+    position = np.array([width / 2, height / 2])
+    velocity = np.zeros(2)
+    next_change = 0
+    for frame in range(frames):
+        if frame >= next_change:
+            moving = rng.random() < 0.7
+            angle = rng.uniform(0, 2 * np.pi)
+            velocity = rng.uniform(0.3, 1.0) * speed * np.array([np.cos(angle), np.sin(angle)]) if moving else 0 * velocity
+            next_change = frame + int(rng.uniform(0.3, 1.2) * fps)
+        position = position + velocity / fps
+        # Bounce off the screen edges
+        for axis, limit in ((0, width), (1, height)):
+            if not face_size / 2 <= position[axis] <= limit - face_size / 2:
+                velocity[axis] = -velocity[axis]
+                position[axis] = np.clip(position[axis], face_size / 2, limit - face_size / 2)
+        centres[frame] = position
+    return centres
+
+
+def box(centre, size: float):
+    x, y = centre
+    return int(y - size / 2), int(x + size / 2), int(y + size / 2), int(x - size / 2)
+
+
+def blur_area(face_location):
+    """The rectangle BlurProcessor blurs for a face box (20% expansion, then 10% padding)"""
+    top, right, bottom, left = face_location
+    expand_w, expand_h = int((right - left) * 0.2), int((bottom - top) * 0.2)
+    top, right, bottom, left = top - expand_h, right + expand_w, bottom + expand_h, left - expand_w
+    pad_w, pad_h = int((right - left) * 0.1), int((bottom - top) * 0.1)
+    return top - pad_h, right + pad_w, bottom + pad_h, left - pad_w
+
+
+def covered(face, area) -> float:
+    """Fraction of the face box inside the area"""
+    inter_h = min(face[2], area[2]) - max(face[0], area[0])
+    inter_w = min(face[1], area[1]) - max(face[3], area[3])
+    if inter_h <= 0 or inter_w <= 0:
+        return 0.0
+    return inter_h * inter_w / float((face[2] - face[0]) * (face[1] - face[3]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--fps", type=float, default=60.0, help="capture and display rate")
+    parser.add_argument("--speed", type=float, default=1500.0, help="fastest pan in pixels per second")
+    parser.add_argument("--face-size", type=int, default=120)
+    parser.add_argument("--latency", type=float, default=60.0,
+                        help="ms from capturing a frame to its overlay being on screen")
+    parser.add_argument("--noise", type=float, default=0.05, help="box jitter as a fraction of the face size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    centres = trajectory(args.seconds, args.fps, args.speed, args.face_size, 1920, 1080, rng)
+    lag = max(1, int(round(args.latency / 1000.0 * args.fps)))  # Frames between capture and display
+
+    history = []
+    kalman = None
+    update_seconds = 0.0
+    scores = {method: [] for method in METHODS}
+    errors = {method: [] for method in METHODS}
+    for frame in range(len(centres)):
+        frame_time = frame / args.fps
+        measured = box(centres[frame] + rng.normal(0, args.noise * args.face_size, 2),
+                       args.face_size * (1 + rng.normal(0, args.noise)))
+        history = (history + [measured])[-5:]
+        start = time.perf_counter()
+        if kalman is None:
+            kalman = BoxKalmanFilter(measured, frame_time)
+        else:
+            kalman.update(measured, frame_time)
+        update_seconds += time.perf_counter() - start
+
+        display = frame + lag
+        if display >= len(centres):
+            break
+        boxes = {
+            "last": measured,
+            "average": tuple(sum(face[i] for face in history) // len(history) for i in range(4)),
+            "kalman": kalman.location(),
+            "predicted": kalman.predict(display / args.fps),
+        }
+        truth = box(centres[display], args.face_size)
+        for method, face_location in boxes.items():
+            scores[method].append(covered(truth, blur_area(face_location)))
+            centre = ((face_location[1] + face_location[3]) / 2, (face_location[0] + face_location[2]) / 2)
+            errors[method].append(float(np.hypot(centre[0] - centres[display][0], centre[1] - centres[display][1])))
+
+    results = {"settings": vars(args), "update_us": update_seconds / len(centres) * 1e6, "methods": {}}
+    print(f"{len(scores['last'])} frames, {lag} frame(s) of latency, Kalman update "
+          f"{results['update_us']:.1f} us\n")
+    print(f"{'method':<10} {'mean_cover':>10} {'exposed':>8} {'error_px':>9}")
+    for method in METHODS:
+        cover = np.array(scores[method])
+        row = {"mean_cover": float(cover.mean()), "exposed": float((cover < 0.95).mean()),
+               "error_px": float(np.mean(errors[method]))}
+        results["methods"][method] = row
+        print(f"{method:<10} {row['mean_cover']:>10.3f} {row['exposed']:>8.1%} {row['error_px']:>9.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Overlay paint benchmark
+Times painting one overlay frame (N face patches) with the QPainter path of the
+overlay window and with the OpenGL renderer from gl_overlay.py, offscreen. QPainter
+paints into a window-sized ARGB32 image the way the window's backing store is painted
+(patch QImages, clear, patches, border); OpenGL uploads the patches into its textures
+and draws them into a framebuffer object, waiting for the GPU to finish. The scaled
+rows paint a frame captured at twice the window size, as on a high-DPI screen.
+
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_paint --resolutions 1080p 4k --faces 1 5 20
+
+OpenGL is skipped when no context can be created (it needs GLX or EGL, e.g. Mesa's
+llvmpipe under Xvfb).
+"""
+
+import argparse
+import json
+
+import numpy as np
+from PyQt6.QtCore import QRect
+from PyQt6.QtGui import QColor, QImage, QPainter, QPen
+from PyQt6.QtWidgets import QApplication
+
+from benchmarks.bench_obfuscation import median_ms
+from face_blur import paint_patches, patch_image
+from obfuscation import MaskCache
+from pipeline import OverlayPatch
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080), "1440p": (2560, 1440), "4k": (3840, 2160)}
+
+
+def make_patches(frame_size, faces: int, face_size: int, renderer_masks: bool, rng) -> list:
+    """Face patches as the processor builds them: blurred pixels plus a feathered mask or its radius"""
+    width, height = frame_size
+    mask_cache = MaskCache()
+    padded = int(face_size * 1.4 * 1.2)  # _expand_face_area(0.2) then 10% padding on each side
+    radius = face_size * 0.7 + 20
+    patches = []
+    for _ in range(faces):
+        top = int(rng.integers(0, height - padded))
+        left = int(rng.integers(0, width - padded))
+        rgba = rng.integers(0, 256, (padded, padded, 4), dtype=np.uint8)
+        if renderer_masks:
+            rgba[:, :, 3] = 255
+            patches.append(OverlayPatch(top, left, rgba, radius, mask_cache.sigma()))
+        else:
+            rgba[:, :, 3] = mask_cache.get(padded, padded, int(radius))
+            patches.append(OverlayPatch(top, left, rgba))
+    return patches
+
+
+def qpainter_paint(target: QImage, patches: list, frame_shape) -> None:
+    """What the window does for a new overlay: wrap the patches, then paintEvent"""
+    current = [(patch, patch_image(patch)) for patch in patches]
+    painter = QPainter(target)
+    painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Clear)
+    painter.fillRect(target.rect(), QColor(0, 0, 0, 0))
+    painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceOver)
+    paint_patches(painter, current, frame_shape, target.width(), target.height())
+    painter.setPen(QPen(QColor(255, 0, 0), 3))
+    painter.drawRect(QRect(1, 1, target.width() - 3, target.height() - 3))
+    painter.end()
+
+
+class OpenGLTarget:
+    """Offscreen context and framebuffer for the OpenGL renderer, None attributes when unavailable"""
+
+    def __init__(self):
+        from PyQt6.QtGui import QOffscreenSurface, QOpenGLContext
+        self.context = QOpenGLContext()
+        self.surface = None
+        self.renderer = None
+        self.error = None
+        if not self.context.create():
+            self.error = "no OpenGL context"
+            return
+        self.surface = QOffscreenSurface()
+        self.surface.setFormat(self.context.format())
+        self.surface.create()
+        if not self.context.makeCurrent(self.surface):
+            self.error = "could not make the OpenGL context current"
+            return
+        from gl_overlay import PatchRenderer
+        self.renderer = PatchRenderer()
+        try:
+            self.renderer.initialize(self.context)
+        except ValueError as e:
+            self.error = str(e)
+            self.renderer = None
+
+    def framebuffer(self, width: int, height: int):
+        from PyQt6.QtOpenGL import QOpenGLFramebufferObject
+        framebuffer = QOpenGLFramebufferObject(width, height)
+        framebuffer.bind()
+        return framebuffer
+
+    def paint(self, width: int, height: int, patches: list, frame_shape) -> None:
+        self.renderer.upload(patches)
+        self.renderer.render(width, height, frame_shape)
+        self.renderer.gl.glFinish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", nargs="+", choices=list(RESOLUTIONS), default=["1080p", "4k"],
+                        help="window sizes")
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--face-size", type=int, default=160, help="face height in frame pixels")
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])  # Painting needs an application object
+    gl_target = OpenGLTarget()
+    if gl_target.renderer is None:
+        print(f"OpenGL skipped: {gl_target.error}\n")
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+    print(f"{'window':>7} {'faces':>5} {'scaled':>6} {'qpainter ms':>12} {'opengl ms':>10}")
+    for name in args.resolutions:
+        width, height = RESOLUTIONS[name]
+        target = QImage(width, height, QImage.Format.Format_ARGB32_Premultiplied)
+        framebuffer = gl_target.framebuffer(width, height) if gl_target.renderer is not None else None
+        for faces in args.faces:
+            for scaled in (False, True):
+                factor = 2 if scaled else 1
+                frame_size = (width * factor, height * factor)
+                frame_shape = (frame_size[1], frame_size[0])
+                cpu_patches = make_patches(frame_size, faces, args.face_size * factor, False, rng)
+                row = {"window": name, "faces": faces, "scaled": scaled,
+                       "qpainter_ms": median_ms(lambda: qpainter_paint(target, cpu_patches, frame_shape),
+                                                args.repeats),
+                       "opengl_ms": None}
+                if framebuffer is not None:
+                    gl_patches = make_patches(frame_size, faces, args.face_size * factor, True, rng)
+                    row["opengl_ms"] = median_ms(lambda: gl_target.paint(width, height, gl_patches, frame_shape),
+                                                 args.repeats)
+                results.append(row)
+                opengl = f"{row['opengl_ms']:>10.2f}" if row["opengl_ms"] is not None else f"{'-':>10}"
+                print(f"{name:>7} {faces:>5} {'yes' if scaled else 'no':>6} {row['qpainter_ms']:>12.2f} {opengl}")
+        if framebuffer is not None:
+            framebuffer.release()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "opengl_error": gl_target.error, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
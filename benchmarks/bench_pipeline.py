@@ -0,0 +1,444 @@
+"""
+Per-frame pipeline benchmark
+Drives a real BlurProcessor headlessly - frames replayed through a capture source into
+process_image(), the way process_video.py runs it - on synthetic scenes (720p, 1080p,
+4K with 0, 1, 5 or 20 planted faces) and optionally on frames of a recorded video. The
+processor's own stage methods are wrapped with timers, so the numbers cover the code
+that runs: change gating, detection crops and ROIs, tracking, encoding, matching,
+smoothing, blurring and overlay assembly. Results are written as JSON with p50/p95/p99
+per stage and can be compared against a saved baseline:
+
+    python -m benchmarks.bench_pipeline --output baseline.json
+    python -m benchmarks.bench_pipeline --baseline baseline.json --output current.json
+
+By default a stub detector reports the planted faces inside every detection crop, so
+the face count stays fixed and the detector's own cost (see bench_detectors.py) doesn't
+drown the rest; --detection-model runs a real backend instead.
+
+Exits with status 1 when a stage got slower than the baseline by more than --tolerance.
+"""
+
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from capture import ReplaySource
+from detectors import DETECTORS, FaceDetector
+
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+FACE_COUNTS = (0, 1, 5, 20)
+# Stages nest: process covers the processor's stages, track includes the smoothing it runs
+STAGES = ("grab", "decode", "change", "resize", "detect", "convert", "encode", "match", "track", "smooth",
+          "blur_mask", "overlay", "process", "qimage", "total")
+RESULTS_VERSION = 2  # 1 timed a copy of the hot path, not BlurProcessor itself
+
+
+# ---------------------------------------------------------------------------
+# Scenes
+# ---------------------------------------------------------------------------
+
+def load_face_crop(path: Optional[str]) -> Tuple[np.ndarray, Tuple[int, int, int, int]]:
+    """An RGB crop around one face and the face box inside it
+
+    Uses scikit-image's astronaut sample when no image is given.
+    """
+    import face_recognition
+
+    if path:
+        image = cv2.imread(path)
+        if image is None:
+            raise ValueError(f"Could not load image: {path}")
+        rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    else:
+        try:
+            from skimage import data
+        except ImportError:
+            raise ValueError("Pass --face-image (or install scikit-image for the default sample face)")
+        rgb_image = data.astronaut()
+
+    face_locations = face_recognition.face_locations(rgb_image)
+    if not face_locations:
+        raise ValueError("No face found in the face image")
+    top, right, bottom, left = max(face_locations, key=lambda f: (f[2] - f[0]) * (f[1] - f[3]))
+    # Keep some context around the face so the detector sees a head, not just a box
+    margin = (bottom - top) // 2
+    crop_top, crop_left = max(0, top - margin), max(0, left - margin)
+    crop_bottom = min(rgb_image.shape[0], bottom + margin)
+    crop_right = min(rgb_image.shape[1], right + margin)
+    crop = np.ascontiguousarray(rgb_image[crop_top:crop_bottom, crop_left:crop_right])
+    return crop, (top - crop_top, right - crop_left, bottom - crop_top, left - crop_left)
+
+
+def synthetic_scene(width: int, height: int, face_count: int, face_crop: Optional[np.ndarray] = None,
+                    face_box: Optional[Tuple] = None, seed: int = 0) -> Tuple[np.ndarray, List[Tuple]]:
+    """A textured RGB frame with face_count copies of the face crop on a grid
+
+    Returns the frame and the planted face boxes (top, right, bottom, left).
+    """
+    rng = np.random.default_rng(seed)
+    noise = rng.integers(0, 256, (height // 8 + 1, width // 8 + 1, 3), dtype=np.uint8)
+    frame = cv2.resize(cv2.GaussianBlur(noise, (5, 5), 0), (width, height), interpolation=cv2.INTER_LINEAR)
+
+    boxes = []
+    if face_count == 0:
+        return frame, boxes
+    cols = int(math.ceil(math.sqrt(face_count * width / height)))
+    rows = int(math.ceil(face_count / cols))
+    cell_width, cell_height = width // cols, height // rows
+    crop_height, crop_width = face_crop.shape[:2]
+    scale = min(cell_width / crop_width, cell_height / crop_height) * 0.9
+    scaled = cv2.resize(face_crop, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    for index in range(face_count):
+        row, col = divmod(index, cols)
+        y = row * cell_height + (cell_height - scaled.shape[0]) // 2
+        x = col * cell_width + (cell_width - scaled.shape[1]) // 2
+        frame[y:y + scaled.shape[0], x:x + scaled.shape[1]] = scaled
+        top, right, bottom, left = face_box
+        boxes.append((y + int(top * scale), x + int(right * scale), y + int(bottom * scale), x + int(left * scale)))
+    return frame, boxes
+
+
+def video_frames(path: str, limit: int) -> List[Tuple[np.ndarray, float]]:
+    """Up to limit frames of a video as (RGB frame, decode seconds)"""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {path}")
+    frames = []
+    try:
+        while len(frames) < limit:
+            start = time.perf_counter()
+            ok, frame_bgr = capture.read()
+            elapsed = time.perf_counter() - start
+            if not ok:
+                break
+            frames.append((cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB), elapsed))
+    finally:
+        capture.release()
+    return frames
+
+
+# ---------------------------------------------------------------------------
+# Timing
+# ---------------------------------------------------------------------------
+
+class StageTimer:
+    """Collects per-stage samples; stages timed several times in one frame are summed"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.current: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.current[stage] = self.current.get(stage, 0.0) + seconds
+
+    def end_frame(self, record: bool = True):
+        if record:
+            for stage, seconds in self.current.items():
+                self.samples.setdefault(stage, []).append(seconds)
+        self.current = {}
+
+    def summary(self) -> dict:
+        """Milliseconds per stage: p50/p95/p99/mean and sample count"""
+        summary = {}
+        for stage in STAGES:
+            if stage not in self.samples:
+                continue
+            samples = np.asarray(self.samples[stage]) * 1000.0
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            summary[stage] = {"p50": float(p50), "p95": float(p95), "p99": float(p99),
+                              "mean": float(samples.mean()), "samples": int(len(samples))}
+        return summary
+
+
+class SceneSource(ReplaySource):
+    """Replays prepared RGB screens as the display, one per grab"""
+
+    def __init__(self, screens: List[np.ndarray]):
+        super().__init__(fps=None)
+        self.screens = screens
+
+    def screen(self, index: int) -> np.ndarray:
+        return self.screens[index % len(self.screens)]
+
+
+class PlantedDetector(FaceDetector):
+    """Stub detector that finds exactly the planted faces inside every detection crop
+
+    BlurProcessor._detection_crop is wrapped to record the (region, scale) of each crop
+    in crops, so the boxes come back in crop coordinates like a real backend's.
+    """
+
+    name = "planted"
+
+    def __init__(self, boxes: List[Tuple]):
+        self.boxes = boxes
+        self.crops = []  # (region, scale) of the crops made since the last detect_batch()
+
+    def detect_batch(self, images):
+        crops, self.crops = self.crops[-len(images):], []
+        found = []
+        for (top, right, bottom, left), scale in crops:
+            found.append([(int((t - top) * scale), int((r - left) * scale), int((b - top) * scale),
+                           int((l - left) * scale))
+                          for t, r, b, l in self.boxes if top <= t and b <= bottom and left <= l and r <= right])
+        return found
+
+
+def instrument(processor, timer: StageTimer):
+    """Wrap the processor's stage methods (on this instance only) to time every call"""
+    def wrap(owner, name: str, stage: str, before=None):
+        function = getattr(owner, name)
+
+        def timed_call(*args, **kwargs):
+            if before is not None:
+                before(*args)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timer.add(stage, time.perf_counter() - start)
+        setattr(owner, name, timed_call)
+
+    detector = processor._ensure_detector()
+
+    def record_crop(img_rgb, region, scale):
+        if isinstance(detector, PlantedDetector):
+            detector.crops.append((region, scale))
+
+    for name, stage in (("_screen_unchanged", "change"), ("_gray", "convert"), ("_encode_faces", "encode"),
+                        ("_track_faces", "track"), ("_smooth_face_position", "smooth"),
+                        ("_blur_face_patch", "blur_mask"), ("_assemble_patches", "overlay")):
+        wrap(processor, name, stage)
+    wrap(processor, "_detection_crop", "resize", record_crop)
+    wrap(processor.gallery, "match", "match")
+    wrap(detector, "detect_batch", "detect")
+
+
+def run_frame(processor, source: SceneSource, area: dict, frame_time: float, timer: StageTimer, grabber=None):
+    """Grab one frame and run it through the instrumented processor"""
+    from face_blur import patch_image
+
+    frame_start = time.perf_counter()
+    if grabber is not None:
+        start = time.perf_counter()
+        grabber(area["width"], area["height"])
+        timer.add("grab", time.perf_counter() - start)
+    img_rgb = source.grab(area)  # The replayed scene stands in for the grabbed pixels
+
+    start = time.perf_counter()
+    overlay = processor.process_image(img_rgb, frame_time)
+    timer.add("process", time.perf_counter() - start)
+    start = time.perf_counter()
+    [patch_image(patch) for patch in overlay or []]
+    timer.add("qimage", time.perf_counter() - start)
+    timer.add("total", time.perf_counter() - frame_start)
+
+
+def make_grabber(source_name: str = "screen"):
+    """Grab of a given size (into the source's reused RGB buffers) and the source used
+
+    "screen" falls back to the synthetic source when there is no display to grab from.
+    """
+    from capture import ScreenSource, SyntheticSource
+
+    if source_name == "screen":
+        try:
+            import mss
+            with mss.mss() as sct:
+                monitor = dict(sct.monitors[1])
+        except Exception:
+            source_name = "synthetic"
+    if source_name == "synthetic":
+        width, height = RESOLUTIONS["4k"]
+        monitor = {"left": 0, "top": 0, "width": width, "height": height}
+        source = SyntheticSource(width, height, fps=None)
+    else:
+        source = ScreenSource()
+
+    def grab(width, height):
+        area = {"left": monitor["left"], "top": monitor["top"],
+                "width": min(width, monitor["width"]), "height": min(height, monitor["height"])}
+        return source.grab(area)
+    return grab, source_name
+
+
+def make_processor(face_crop: Optional[np.ndarray], face_box: Optional[Tuple], boxes: Optional[List[Tuple]], args):
+    """A BlurProcessor matching the planted face (or nothing when there is no face image)
+
+    With the planted detection model the processor uses a PlantedDetector for the boxes;
+    scenes without planted boxes (recorded video) fall back to HOG.
+    """
+    import face_recognition
+    from face_blur import BlurProcessor
+    from face_gallery import FaceGallery
+
+    if face_crop is not None:
+        reference = face_recognition.face_encodings(face_crop, [face_box])[0]
+    else:
+        reference = np.zeros(128, dtype=np.float32)
+    processor = BlurProcessor(FaceGallery.from_encoding(reference))
+    processor.detection_scale = args.detection_scale
+    processor.adaptive_quality = False  # Fixed settings, so runs are comparable
+    if args.detection_model != "planted":
+        processor.detection_model = args.detection_model
+    elif boxes is not None:
+        processor.detector = PlantedDetector(boxes)
+        processor.detection_model = PlantedDetector.name
+    return processor
+
+
+# ---------------------------------------------------------------------------
+# Baselines
+# ---------------------------------------------------------------------------
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta: float) -> List[str]:
+    """Print p50 changes against a baseline and return the regressed scenario/stage names"""
+    regressions = []
+    print(f"\n{'scenario':<16} {'stage':<10} {'base p50':>10} {'p50':>10} {'change':>8}")
+    for name, scenario in results["scenarios"].items():
+        base_scenario = baseline.get("scenarios", {}).get(name)
+        if base_scenario is None:
+            continue
+        for stage, stats in scenario["stages"].items():
+            base_stats = base_scenario["stages"].get(stage)
+            if base_stats is None:
+                continue
+            before, after = base_stats["p50"], stats["p50"]
+            change = (after - before) / before if before > 0 else 0.0
+            regressed = change > tolerance and after - before > min_delta
+            if regressed:
+                regressions.append(f"{name}/{stage}")
+            print(f"{name:<16} {stage:<10} {before:>10.2f} {after:>10.2f} {change:>+7.0%}"
+                  + ("  REGRESSION" if regressed else ""))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", nargs="+", choices=list(RESOLUTIONS), default=list(RESOLUTIONS))
+    parser.add_argument("--faces", type=int, nargs="+", default=list(FACE_COUNTS), help="planted faces per frame")
+    parser.add_argument("--face-image", help="image to take the planted face from (default: scikit-image sample)")
+    parser.add_argument("--video", help="also benchmark frames of this recorded video")
+    parser.add_argument("--video-frames", type=int, default=60, help="frames to read from --video")
+    parser.add_argument("--repeats", type=int, default=20, help="timed frames per scenario")
+    parser.add_argument("--warmup", type=int, default=2, help="untimed frames per scenario")
+    parser.add_argument("--detection-scale", type=float, default=0.5)
+    parser.add_argument("--detection-model", choices=("planted",) + DETECTORS, default="planted",
+                        help="detector backend, or a stub that finds the planted faces (default: %(default)s)")
+    parser.add_argument("--scene-frames", type=int, default=4,
+                        help="synthetic frames per scenario, same faces on different backgrounds")
+    parser.add_argument("--fps", type=float, default=30.0, help="frame times given to the motion model")
+    parser.add_argument("--grab-source", choices=("screen", "synthetic"), default="screen",
+                        help="what the grab stage captures from (default: %(default)s)")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="compare against results saved with --output")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed p50 slowdown (0.15 = 15%%)")
+    parser.add_argument("--min-delta", type=float, default=0.2, help="ignore p50 changes below this many ms")
+    args = parser.parse_args()
+
+    # QPixmap needs a QApplication; without a display use Qt's offscreen platform
+    if not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")) and sys.platform.startswith("linux"):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    face_crop, face_box = None, None
+    if any(count > 0 for count in args.faces):
+        try:
+            face_crop, face_box = load_face_crop(args.face_image)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+    grabber, grab_source = make_grabber(args.grab_source)
+    if grab_source != args.grab_source:
+        print("No display to grab from, timing the grab stage on the synthetic source")
+
+    results = {
+        "version": RESULTS_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "platform": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "system": platform.system(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+        },
+        "settings": {
+            "repeats": args.repeats,
+            "warmup": args.warmup,
+            "detection_scale": args.detection_scale,
+            "detection_model": args.detection_model,
+            "scene_frames": args.scene_frames,
+            "fps": args.fps,
+            "grab_source": grab_source,
+        },
+        "scenarios": {},
+    }
+
+    scenarios = []
+    for resolution in args.resolutions:
+        width, height = RESOLUTIONS[resolution]
+        for face_count in args.faces:
+            # Backgrounds differ between frames, so change gating never skips one
+            frames = [synthetic_scene(width, height, face_count, face_crop, face_box, seed=seed)
+                      for seed in range(max(1, args.scene_frames))]
+            scenarios.append((f"{resolution}/{face_count}", resolution, face_count,
+                              [(frame, None) for frame, _ in frames], frames[0][1]))
+    if args.video:
+        frames = video_frames(args.video, args.video_frames)
+        if frames:
+            height, width = frames[0][0].shape[:2]
+            scenarios.append((f"video/{width}x{height}", f"{width}x{height}", None, frames, None))
+
+    for name, resolution, face_count, frames, boxes in scenarios:
+        processor = make_processor(face_crop, face_box, boxes, args)
+        timer = StageTimer()
+        instrument(processor, timer)
+        source = SceneSource([frame for frame, _ in frames])
+        height, width = frames[0][0].shape[:2]
+        area = {"left": 0, "top": 0, "width": width, "height": height}
+        for index in range(args.warmup + args.repeats):
+            decode_seconds = frames[index % len(frames)][1]
+            if decode_seconds is not None:
+                timer.add("decode", decode_seconds)
+            run_frame(processor, source, area, index / args.fps, timer, grabber)
+            timer.end_frame(record=index >= args.warmup)
+        processor.stop()
+
+        stages = timer.summary()
+        results["scenarios"][name] = {"resolution": resolution, "faces": face_count, "stages": stages}
+        print(f"\n{name}  ({args.repeats} frames, ms)")
+        print(f"  {'stage':<10} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for stage, stats in stages.items():
+            print(f"  {stage:<10} {stats['p50']:>9.2f} {stats['p95']:>9.2f} {stats['p99']:>9.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("version") != RESULTS_VERSION:
+            print(f"\n{args.baseline} was made by another version of this benchmark - save a new baseline")
+            sys.exit(1)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Redaction server load test
+Starts redaction_server.py on a temporary Unix socket (or uses a running server given
+with --socket/--port) and sends it synthetic frames with planted faces from 1, 2, 4, ...
+clients at once, each sending its next frame as soon as it has the answer to the last.
+For every client count it reports the total throughput, the latency percentiles a
+client sees, and the mean number of frames the server batched into one detection pass.
+
+    python -m benchmarks.bench_redaction_server --clients 1 2 4 8 --seconds 10 --resolution 720p
+    python -m benchmarks.bench_redaction_server --transport raw --output-mode patches
+
+The started server matches the planted face; a running server answers with its own
+references (the throughput is the same, the boxes may be empty).
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_pipeline import RESOLUTIONS, load_face_crop, synthetic_scene
+from redaction_server import OUTPUTS, RedactionClient
+
+
+def start_server(socket_path: str, reference_path: str, args) -> subprocess.Popen:
+    """Run the server in its own process and wait until it accepts connections"""
+    command = [sys.executable, "redaction_server.py", "--socket", socket_path, "--reference", reference_path,
+               "--detection-model", args.detection_model, "--detection-scale", str(args.detection_scale),
+               "--max-batch", str(args.max_batch), "--batch-window", str(args.batch_window)]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    server = subprocess.Popen(command, cwd=root, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 120.0  # Loading the models takes a few seconds
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise ValueError(f"Redaction server exited with status {server.returncode}")
+        if os.path.exists(socket_path):
+            try:
+                RedactionClient(socket_path).stats()
+                return server
+            except OSError:
+                pass
+        time.sleep(0.2)
+    server.terminate()
+    raise ValueError("Redaction server did not start within 120s")
+
+
+def run_clients(connect, frames: list, clients: int, seconds: float, output: str) -> dict:
+    """Send frames from this many client threads for a while, returning the latencies and counters"""
+    latencies = [[] for _ in range(clients)]
+    errors = []
+    ready = threading.Barrier(clients + 1)
+    go = threading.Event()
+    stop_at = [0.0]
+
+    def client_loop(index: int):
+        client = connect()
+        frame = frames[index % len(frames)].copy()
+        try:
+            client.redact(frame, output)  # Attach the shared-memory block before measuring
+            ready.wait()
+            go.wait()
+            while time.perf_counter() < stop_at[0]:
+                np.copyto(frame, frames[index % len(frames)])  # frame output redacts it in place
+                start = time.perf_counter()
+                client.redact(frame, output)
+                latencies[index].append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(str(e))
+        finally:
+            client.close()
+
+    stats_client = connect()
+    threads = [threading.Thread(target=client_loop, args=(index,), daemon=True) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    before = stats_client.stats()["counters"]
+    started = time.perf_counter()
+    stop_at[0] = started + seconds
+    go.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    after = stats_client.stats()["counters"]
+    stats_client.close()
+    if errors:
+        raise ValueError(f"Client failed: {errors[0]}")
+
+    samples = np.array([latency for client in latencies for latency in client]) * 1000.0
+    batches = after.get("batches", 0) - before.get("batches", 0)
+    batched_frames = after.get("frames", 0) - before.get("frames", 0)
+    return {
+        "clients": clients,
+        "requests": int(samples.size),
+        "throughput_fps": samples.size / elapsed,
+        "latency_ms": {f"p{q}": float(np.percentile(samples, q)) for q in (50, 95, 99)} if samples.size else {},
+        "mean_batch": batched_frames / batches if batches else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8], help="concurrent client counts")
+    parser.add_argument("--seconds", type=float, default=10.0, help="measuring time per client count")
+    parser.add_argument("--resolution", choices=list(RESOLUTIONS), default="720p")
+    parser.add_argument("--faces", type=int, default=1, help="planted faces per frame")
+    parser.add_argument("--face-image", help="image with the face to plant (default: scikit-image's astronaut)")
+    parser.add_argument("--transport", choices=["shm", "raw"],
+                        help="frames in shared memory (Unix socket only) or in the request body "
+                             "(default: shm on the socket, raw with --port)")
+    parser.add_argument("--output-mode", choices=OUTPUTS, default="boxes", help="what the server returns")
+    parser.add_argument("--socket", help="use the server running on this Unix socket")
+    parser.add_argument("--port", type=int, help="use the server running on 127.0.0.1:PORT")
+    parser.add_argument("--detection-model", default="hog", help="detector of the started server")
+    parser.add_argument("--detection-scale", type=float, default=0.5, help="detection scale of the started server")
+    parser.add_argument("--max-batch", type=int, default=8, help="batch limit of the started server")
+    parser.add_argument("--batch-window", type=float, default=2.0, help="batch window (ms) of the started server")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+    if args.transport is None:
+        args.transport = "raw" if args.port is not None else "shm"
+    elif args.transport == "shm" and args.port is not None:
+        parser.error("--transport shm needs the Unix socket, not --port")
+
+    crop, face_box = load_face_crop(args.face_image)
+    width, height = RESOLUTIONS[args.resolution]
+    frames = [synthetic_scene(width, height, args.faces, crop, face_box, seed=seed)[0] for seed in range(4)]
+    use_shared_memory = args.transport == "shm"
+
+    server = None
+    workdir = tempfile.mkdtemp(prefix="redaction-bench-")
+    socket_path = args.socket
+    if socket_path is None and args.port is None:
+        socket_path = os.path.join(workdir, "redaction.sock")
+        reference_path = os.path.join(workdir, "reference.png")
+        cv2.imwrite(reference_path, cv2.cvtColor(crop, cv2.COLOR_RGB2BGR))
+        print("Starting the redaction server...")
+        server = start_server(socket_path, reference_path, args)
+
+    def connect():
+        return RedactionClient(socket_path, args.port, use_shared_memory=use_shared_memory)
+
+    results = []
+    try:
+        print(f"{args.resolution} frames, {args.faces} face(s), {args.transport}, output {args.output_mode}")
+        print(f"{'clients':>7} {'frames/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'batch':>6}")
+        for clients in args.clients:
+            row = run_clients(connect, frames, clients, args.seconds, args.output_mode)
+            results.append(row)
+            latency = row["latency_ms"]
+            print(f"{clients:>7} {row['throughput_fps']:>9.1f} {latency.get('p50', 0):>8.1f} "
+                  f"{latency.get('p95', 0):>8.1f} {latency.get('p99', 0):>8.1f} {row['mean_batch']:>6.2f}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        for name in os.listdir(workdir):
+            os.remove(os.path.join(workdir, name))
+        os.rmdir(workdir)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Per-frame allocation check
+Runs BlurProcessor's hot path on a synthetic screen with a face drifting across it and
+measures, with tracemalloc, how much memory every frame allocates. After the warm-up
+(buffer pools, mask cache and tracks filled) a frame should allocate next to nothing:
+the frame, its gray copy, the detection crops, the blurred patches and the overlay all
+come from preallocated buffers, only dlib's own working memory (not traced) and a few
+small Python objects are new.
+
+    python -m benchmarks.check_allocations --resolution 1080p --frames 200 --max-kb 64
+
+Columns:
+    transient: peak memory above the frame's starting point, i.e. the largest amount
+               allocated at once while processing it
+    retained:  memory still allocated after the frame (growth over the run)
+
+Exits with status 1 when the median transient allocation exceeds --max-kb, or when
+the processor's buffer pool still allocates after the warm-up (a buffer that stays
+referenced, see buffer_pool.py, is never reused).
+"""
+
+import argparse
+import json
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.bench_pipeline import RESOLUTIONS, load_face_crop
+from capture import SyntheticSource
+
+
+def run_frames(processor, source, area: dict, frames: int, fps: float, start: int = 0):
+    """Grab and process frames, returning each frame's (transient, retained) bytes when tracing"""
+    samples = []
+    for index in range(start, start + frames):
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+        img_rgb = source.grab(area)
+        processor.process_image(img_rgb, index / fps)
+        if tracemalloc.is_tracing():
+            after, peak = tracemalloc.get_traced_memory()
+            samples.append((peak - before, after - before))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolution", choices=list(RESOLUTIONS), default="1080p")
+    parser.add_argument("--face-image", help="image with the face to plant (default: scikit-image's astronaut)")
+    parser.add_argument("--warmup", type=int, default=60, help="frames before measuring")
+    parser.add_argument("--frames", type=int, default=200, help="frames measured")
+    parser.add_argument("--fps", type=float, default=30.0, help="frame times given to the motion model")
+    parser.add_argument("--max-kb", type=float, default=64.0, help="fail above this median transient allocation")
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    import face_recognition
+    from face_blur import BlurProcessor
+
+    crop, face_box = load_face_crop(args.face_image)
+    reference = face_recognition.face_encodings(crop, [face_box])[0]
+    width, height = RESOLUTIONS[args.resolution]
+    source = SyntheticSource(width, height, crop, fps=None, period=240)
+    area = {"top": 0, "left": 0, "width": width, "height": height}
+
+    processor = BlurProcessor(reference)
+    processor.adaptive_quality = False  # Fixed settings, so buffer sizes settle
+
+    run_frames(processor, source, area, args.warmup, args.fps)
+    warm_allocations = processor.buffers.allocations
+    tracemalloc.start()
+    samples = run_frames(processor, source, area, args.frames, args.fps, args.warmup)
+    tracemalloc.stop()
+
+    transient = np.array([sample[0] for sample in samples]) / 1024.0
+    retained = sum(sample[1] for sample in samples) / 1024.0
+    results = {
+        "settings": vars(args),
+        "frame_kb": width * height * 3 / 1024.0,
+        "transient_kb": {"p50": float(np.percentile(transient, 50)), "p95": float(np.percentile(transient, 95)),
+                         "max": float(transient.max())},
+        "retained_kb": retained,
+        "buffer_allocations": processor.buffers.allocations,
+        "buffer_allocations_measured": processor.buffers.allocations - warm_allocations,
+        "capture_allocations": source.buffers.allocations,
+    }
+    print(f"{args.frames} frames at {width}x{height} (one frame is {results['frame_kb']:.0f} KB)")
+    print(f"transient KB per frame: p50 {results['transient_kb']['p50']:.1f}  "
+          f"p95 {results['transient_kb']['p95']:.1f}  max {results['transient_kb']['max']:.1f}")
+    print(f"retained over the run: {retained:.1f} KB")
+    print(f"buffers allocated: processor {results['buffer_allocations']} "
+          f"({results['buffer_allocations_measured']} after the warm-up), capture {results['capture_allocations']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    failed = False
+    if results["transient_kb"]["p50"] > args.max_kb:
+        print(f"FAIL: median transient allocation above {args.max_kb:.0f} KB")
+        failed = True
+    if results["buffer_allocations_measured"]:
+        print("FAIL: the buffer pool kept allocating after the warm-up - something holds on to its buffers")
+        failed = True
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Preallocated scratch buffers for the per-frame hot loop
+Conversions, resizes, blurs and overlay patches are written into reused arrays through
+OpenCV's dst= arguments instead of allocating fresh ones every frame. Buffers are
+keyed by name, hold raw bytes with some headroom, and are handed out as contiguous
+arrays of the requested shape, so a face that moves or grows slightly reuses the same
+buffer. A buffer is only handed out again once nothing else references it (e.g. a
+patch the window is still painting), which makes the pool safe to use from several
+stages as long as each stage uses its own names.
+
+Which references count: the pool's list holds each flat buffer once. Every array
+handed out is a view whose base is that buffer, and so is every view taken of it
+(slices, reshapes, QImages wrapping its memory through the array), so a buffer is free
+exactly when no such array is alive. Anything else holding the flat buffer (a debugger,
+a closure over it) only keeps it busy - the pool then allocates another one, which
+shows up in `allocations` (benchmarks/check_allocations.py fails when that grows after
+the warm-up). The count that means "free" is measured at import with the same lookup
+get() uses, instead of assuming what this interpreter's sys.getrefcount reports.
+"""
+
+import sys
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def _references(buffers: list, index: int) -> int:
+    """sys.getrefcount of buffers[index], looked up the way get() looks at every buffer"""
+    buffer = buffers[index]
+    return sys.getrefcount(buffer)
+
+
+# What _references() reports for a buffer nothing but its list holds
+FREE_REFERENCES = _references([np.empty(1, dtype=np.uint8)], 0)
+
+
+class BufferPool:
+    """Reusable arrays by name, kept until reset() (e.g. when the capture area changes size)
+
+    get() and reset() may be called from different threads (the processing stages and
+    the GUI thread moving the capture area).
+    """
+
+    def __init__(self, max_per_name: int = 32, headroom: float = 1.25):
+        self.max_per_name = max_per_name  # Buffers kept per name; more users at once get unpooled arrays
+        self.headroom = headroom  # New buffers are this much bigger than asked for, so growth reuses them
+        self.buffers = {}  # name -> flat uint8 arrays
+        self.geometry = None  # Frame shape the buffers were sized for
+        self.allocations = 0  # Buffers allocated so far (steady state: no new ones)
+        self.lock = threading.Lock()
+
+    def get(self, name: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """A C-contiguous array of the shape for name, contents undefined"""
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        with self.lock:
+            buffers = self.buffers.setdefault(name, [])
+            outgrown = None
+            for index in range(len(buffers)):
+                if _references(buffers, index) <= FREE_REFERENCES:
+                    if buffers[index].nbytes >= nbytes:
+                        return buffers[index][:nbytes].view(dtype).reshape(shape)
+                    outgrown = index
+            buffer = np.empty(int(nbytes * self.headroom) + dtype.itemsize, dtype=np.uint8)
+            self.allocations += 1
+            if outgrown is not None:
+                buffers[outgrown] = buffer  # Replace a free buffer that is too small
+            elif len(buffers) < self.max_per_name:
+                buffers.append(buffer)
+            return buffer[:nbytes].view(dtype).reshape(shape)
+
+    def reset(self, geometry: Optional[Tuple[int, ...]] = None):
+        """Drop every buffer (arrays still in use stay valid) and start over for a new frame size"""
+        with self.lock:
+            self.buffers = {}
+            self.geometry = geometry
+
+    def nbytes(self) -> int:
+        """Memory held by the pool"""
+        with self.lock:
+            return sum(buffer.nbytes for buffers in self.buffers.values() for buffer in buffers)
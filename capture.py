@@ -0,0 +1,274 @@
+"""
+Capture sources
+Every source grabs an area ({"left", "top", "width", "height"}, screen coordinates) as
+an RGB frame written into a reusable, preallocated buffer instead of a fresh array per
+grab. ScreenSource grabs the display with mss and converts the raw BGRA memory straight
+into the buffer; SyntheticSource and FileSource replay a generated scene or a video as
+if it were the screen, so the live pipeline runs on machines without a display.
+
+    python face_blur.py --source synthetic:face.jpg     # moving face on a textured background
+    python face_blur.py --source recording.mp4          # replay a recording at its frame rate
+"""
+
+import sys
+import time
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Boxes use the face_recognition convention: (top, right, bottom, left)
+Region = Tuple[int, int, int, int]
+
+
+class FrameBuffers:
+    """Pool of preallocated RGB frames, reused once nothing else references them
+
+    Frames are handed out in round-robin order. A frame still held by a later stage
+    (queued, being detected on, or viewed through a crop) is skipped, and a new one
+    is allocated when all are in use, up to max_count kept for reuse.
+    """
+
+    def __init__(self, max_count: int = 4):
+        self.max_count = max_count
+        self.buffers = []
+        self.allocations = 0  # Frames allocated so far (steady state: no new ones)
+
+    def next(self, height: int, width: int) -> np.ndarray:
+        shape = (height, width, 3)
+        if self.buffers and self.buffers[0].shape != shape:
+            self.buffers = []  # Capture area changed size
+        for _ in range(len(self.buffers)):
+            buffer = self.buffers.pop(0)
+            self.buffers.append(buffer)
+            # References: the list, this name and getrefcount's argument - anything more is a user
+            if sys.getrefcount(buffer) <= 3:
+                return buffer
+        buffer = np.zeros(shape, dtype=np.uint8)  # Black where a partial grab leaves gaps
+        self.allocations += 1
+        if len(self.buffers) < self.max_count:
+            self.buffers.append(buffer)
+        return buffer
+
+
+class CaptureSource:
+    """Base class: grab(area) returns the area as an RGB frame from the buffer pool
+
+    With regions ((top, right, bottom, left) boxes inside the area) only those parts
+    are captured; the rest of the frame holds whatever the reused buffer held before.
+    Sources are created, used and closed on the thread that grabs (mss handles
+    must not cross threads).
+    """
+
+    def __init__(self, buffers: int = 4):
+        self.buffers = FrameBuffers(buffers)
+
+    def grab(self, area: dict, regions: Optional[List[Region]] = None) -> np.ndarray:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ScreenSource(CaptureSource):
+    """The display, through mss
+
+    mss returns physical pixels, so on a high-DPI screen a whole-area frame is larger
+    than the area (the overlays scale the patches back down); grabs of regions are
+    scaled to the area's size, the coordinates their regions are given in.
+    """
+
+    def __init__(self, buffers: int = 4):
+        super().__init__(buffers)
+        self.sct = None
+
+    def grab(self, area: dict, regions: Optional[List[Region]] = None) -> np.ndarray:
+        if self.sct is None:
+            import mss
+            self.sct = mss.mss()
+        frame = self.buffers.next(area["height"], area["width"]) if regions else None
+        for top, right, bottom, left in regions or [(0, area["width"], area["height"], 0)]:
+            screenshot = self.sct.grab({"left": area["left"] + left, "top": area["top"] + top,
+                                        "width": right - left, "height": bottom - top})
+            # Wrap mss's BGRA bytes without copying and convert straight into the reused frame
+            bgra = np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(screenshot.height, screenshot.width, 4)
+            if frame is None:
+                # A whole-area grab keeps mss's size: physical pixels on a high-DPI screen
+                frame = self.buffers.next(screenshot.height, screenshot.width)
+                target = frame
+            else:
+                target = frame[top:bottom, left:right]
+                if bgra.shape[:2] != target.shape[:2]:
+                    # Regions are in logical pixels: scale a high-DPI grab down to fit its slot
+                    bgra = cv2.resize(bgra, (target.shape[1], target.shape[0]), interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(bgra, cv2.COLOR_BGRA2RGB, dst=target)
+        return frame
+
+    def close(self):
+        if self.sct is not None:
+            self.sct.close()
+            self.sct = None
+
+
+class ReplaySource(CaptureSource):
+    """A sequence of full-screen frames played back as the display
+
+    With fps set, the frame shown follows the wall clock from the first grab (frames
+    are skipped when grabbing is slower); with fps None every grab advances one frame,
+    which keeps benchmarks deterministic. Parts of the area outside the replayed
+    screen are black.
+    """
+
+    def __init__(self, fps: Optional[float] = 30.0, loop: bool = True, buffers: int = 4):
+        super().__init__(buffers)
+        self.fps = fps
+        self.loop = loop
+        self.start_time = None
+        self.position = 0  # Frames handed out without fps pacing
+        self.frames_shown = 0
+
+    def frame_index(self) -> int:
+        if self.fps is None:
+            self.position += 1
+            return self.position - 1
+        now = time.perf_counter()
+        if self.start_time is None:
+            self.start_time = now
+        return int((now - self.start_time) * self.fps)
+
+    def screen(self, index: int) -> Optional[np.ndarray]:
+        """The full replayed screen for a frame index, None past the end"""
+        raise NotImplementedError
+
+    def grab(self, area: dict, regions: Optional[List[Region]] = None) -> np.ndarray:
+        screen = self.screen(self.frame_index())
+        if screen is None:
+            raise EOFError("Replay source has no more frames")
+        self.frames_shown += 1
+        frame = self.buffers.next(area["height"], area["width"])
+        for top, right, bottom, left in regions or [(0, area["width"], area["height"], 0)]:
+            # Region in screen coordinates, clipped to the replayed screen
+            top, bottom = top + area["top"], bottom + area["top"]
+            left, right = left + area["left"], right + area["left"]
+            src_top, src_left = max(0, top), max(0, left)
+            src_bottom, src_right = min(screen.shape[0], bottom), min(screen.shape[1], right)
+            if src_top > top or src_left > left or src_bottom < bottom or src_right < right:
+                frame[top - area["top"]:bottom - area["top"], left - area["left"]:right - area["left"]] = 0
+            if src_bottom > src_top and src_right > src_left:
+                frame[src_top - area["top"]:src_bottom - area["top"], src_left - area["left"]:src_right - area["left"]] = \
+                    screen[src_top:src_bottom, src_left:src_right]
+        return frame
+
+
+class SyntheticSource(ReplaySource):
+    """A textured background with an optional sprite (e.g. a face) drifting across it"""
+
+    def __init__(self, width: int = 1920, height: int = 1080, sprite: Optional[np.ndarray] = None,
+                 fps: Optional[float] = 30.0, period: int = 120, seed: int = 0, buffers: int = 4):
+        super().__init__(fps, True, buffers)
+        rng = np.random.default_rng(seed)
+        noise = rng.integers(0, 256, (height // 8 + 1, width // 8 + 1, 3), dtype=np.uint8)
+        self.background = cv2.resize(cv2.GaussianBlur(noise, (5, 5), 0), (width, height),
+                                     interpolation=cv2.INTER_LINEAR)
+        if sprite is not None:
+            scale = min(1.0, height / 3 / sprite.shape[0], width / 3 / sprite.shape[1])
+            sprite = cv2.resize(sprite, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        self.sprite = sprite
+        self.period = period  # Frames for one sweep back and forth
+        self.frame = self.background.copy()  # Rendered screen, reused every frame
+        self.sprite_x = None  # Where the sprite was drawn last
+
+    def screen(self, index: int) -> np.ndarray:
+        if self.sprite is not None:
+            height, width = self.sprite.shape[:2]
+            phase = (index % self.period) / self.period
+            travel = 1.0 - abs(2.0 * phase - 1.0)  # 0 -> 1 -> 0
+            x = int(travel * (self.frame.shape[1] - width))
+            y = (self.frame.shape[0] - height) // 2
+            if self.sprite_x is not None:
+                # Only the sprite's previous position needs the background back
+                self.frame[y:y + height, self.sprite_x:self.sprite_x + width] = \
+                    self.background[y:y + height, self.sprite_x:self.sprite_x + width]
+            self.frame[y:y + height, x:x + width] = self.sprite
+            self.sprite_x = x
+        return self.frame
+
+
+class FileSource(ReplaySource):
+    """A video file played back as the display, by default at its own frame rate"""
+
+    def __init__(self, path: str, fps: Optional[float] = 0.0, loop: bool = True, buffers: int = 4):
+        self.path = path
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise ValueError(f"Could not open video: {path}")
+        if fps == 0.0:
+            fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        super().__init__(fps, loop, buffers)
+        self.decoded_index = -1
+        self.bgr = None  # Last decoded frame (reused by VideoCapture.read)
+        self.frame = None  # Its RGB conversion, reused
+
+    def screen(self, index: int) -> Optional[np.ndarray]:
+        if index < self.decoded_index:
+            self._rewind()
+        while self.decoded_index < index:
+            ok, self.bgr = self.capture.read(self.bgr)
+            if not ok:
+                if not self.loop or self.decoded_index < 0:
+                    return None
+                # Loop: replay from the start on the clock's current lap
+                self.start_time = time.perf_counter() if self.fps is not None else None
+                self.position = 1 if self.fps is None else 0
+                index = 0
+                self._rewind()
+                continue
+            self.decoded_index += 1
+        if self.frame is None or self.frame.shape != self.bgr.shape:
+            self.frame = np.empty_like(self.bgr)
+        cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB, dst=self.frame)
+        return self.frame
+
+    def _rewind(self):
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self.decoded_index = -1
+
+    def close(self):
+        self.capture.release()
+
+
+def screen_monitors() -> List[dict]:
+    """Every monitor's area from mss (left, top, width, height), empty without a display"""
+    try:
+        import mss
+        with mss.mss() as sct:
+            return [dict(monitor) for monitor in sct.monitors[1:]]  # monitors[0] is the union
+    except Exception:
+        return []
+
+
+def source_factory(spec: str = "screen") -> Callable[..., CaptureSource]:
+    """Factory for a --source value: "screen", "synthetic[:sprite image]" or a video file
+
+    Returns a callable taking the buffers keyword, to be called on the grabbing thread.
+    Raises ValueError when an image or video can't be opened.
+    """
+    if spec == "screen":
+        return ScreenSource
+    if spec == "synthetic" or spec.startswith("synthetic:"):
+        sprite = None
+        if ":" in spec:
+            path = spec.split(":", 1)[1]
+            image = cv2.imread(path)
+            if image is None:
+                raise ValueError(f"Could not load image: {path}")
+            sprite = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        return lambda buffers=4: SyntheticSource(sprite=sprite, buffers=buffers)
+    FileSource(spec).close()  # Fail now rather than on the capture thread
+    return lambda buffers=4: FileSource(spec, buffers=buffers)
@@ -0,0 +1,207 @@
+"""
+Screen change detection
+Splits the captured area into tiles and compares a cheap downsampled grayscale copy
+against the last processed content, so static screens (paused video, slides, photos)
+don't pay for face detection on every frame.
+"""
+
+import cv2
+import numpy as np
+from typing import List, Tuple
+
+# Regions use the face_recognition box convention: (top, right, bottom, left)
+Region = Tuple[int, int, int, int]
+
+
+class ChangeDetector:
+    """Find the tiles of a frame that changed since they were last processed"""
+
+    def __init__(self, tile_size: int = 64, noise_threshold: float = 6.0, downsample: int = 4):
+        self.tile_size = tile_size  # Tile edge in full-resolution pixels
+        self.noise_threshold = noise_threshold  # Mean absolute gray difference that counts as a change
+        self.downsample = downsample  # Compare at 1/downsample resolution
+        self.reference = None  # Downsampled gray content of the last processed tiles
+        self.frame_shape = None
+        self.accumulated = None  # Tiles changed since take_accumulated() was last called
+        self.scratch = None  # Work arrays for the current frame size, reused every frame
+
+        # Counters
+        self.frames_total = 0
+        self.frames_skipped = 0  # Frames where no tile changed
+        self.tiles_total = 0
+        self.tiles_skipped = 0  # Unchanged tiles
+
+    def reset(self):
+        """Forget the reference content so the next frame counts as fully changed"""
+        self.reference = None
+        self.frame_shape = None
+        self.accumulated = None
+        self.scratch = None
+
+    def update(self, img_rgb: np.ndarray) -> np.ndarray:
+        """Compare a frame with the reference and return the dirty-tile mask
+
+        Returns:
+            np.ndarray: bool array of shape (tile_rows, tile_cols), True where content changed
+            (overwritten by the next call)
+        """
+        if self.scratch is None or self.frame_shape != img_rgb.shape[:2]:
+            # First frame or new capture size - everything is dirty
+            self._allocate(img_rgb.shape[:2])
+            self.reference = self._downsample(img_rgb).copy()
+            self.frame_shape = img_rgb.shape[:2]
+            dirty = self.scratch["dirty"]
+            dirty[...] = True
+            self.accumulated = None
+        else:
+            small = self._downsample(img_rgb)
+            scratch = self.scratch
+            diff = cv2.absdiff(small, self.reference, dst=scratch["diff"])
+            padded = scratch["padded"]  # Zero beyond the frame's edge, only the frame part is written
+            padded[:diff.shape[0], :diff.shape[1]] = diff
+            rows, cols = scratch["dirty"].shape
+            step = self.tile_size // self.downsample
+            tile_means = padded.reshape(rows, step, cols, step).mean(axis=(1, 3), out=scratch["tile_means"])
+            dirty = np.greater(tile_means, self.noise_threshold, out=scratch["dirty"])
+
+            # Only refresh the reference where content changed, so slow drifts still add up
+            if dirty.any():
+                pixel_mask = cv2.resize(dirty.view(np.uint8), (cols * step, rows * step), dst=scratch["pixel_mask"],
+                                        interpolation=cv2.INTER_NEAREST)
+                np.copyto(self.reference, small, where=pixel_mask[:small.shape[0], :small.shape[1]].view(bool))
+
+        if self.accumulated is None:
+            self.accumulated = dirty.copy()
+        else:
+            np.logical_or(self.accumulated, dirty, out=self.accumulated)
+
+        self.frames_total += 1
+        self.tiles_total += dirty.size
+        self.tiles_skipped += int(dirty.size - np.count_nonzero(dirty))
+        if not dirty.any():
+            self.frames_skipped += 1
+        return dirty
+
+    def take_accumulated(self) -> np.ndarray:
+        """Return the tiles changed since the previous call and start accumulating afresh
+
+        Detection may run less often than update(), so it needs every tile that
+        changed since the last detection pass, not just the latest frame's changes.
+        """
+        accumulated = self.accumulated
+        self.accumulated = None if accumulated is None else np.zeros_like(accumulated)
+        return accumulated
+
+    def dirty_regions(self, dirty: np.ndarray, margin: int = 0) -> List[Region]:
+        """Merge connected dirty tiles into frame regions, grown by margin pixels"""
+        if self.frame_shape is None or not dirty.any():
+            return []
+        height, width = self.frame_shape
+        count, _, stats, _ = cv2.connectedComponentsWithStats(dirty.astype(np.uint8), connectivity=8)
+        regions = []
+        for x, y, w, h, _ in stats[1:count]:
+            regions.append((
+                max(0, y * self.tile_size - margin),
+                min(width, (x + w) * self.tile_size + margin),
+                min(height, (y + h) * self.tile_size + margin),
+                max(0, x * self.tile_size - margin),
+            ))
+        return regions
+
+    def stats(self) -> dict:
+        """Counters for skipped frames and tiles"""
+        return {
+            "frames_total": self.frames_total,
+            "frames_skipped": self.frames_skipped,
+            "tiles_total": self.tiles_total,
+            "tiles_skipped": self.tiles_skipped,
+        }
+
+    def _allocate(self, frame_shape: Tuple[int, int]):
+        """Work arrays for a frame size"""
+        height, width = frame_shape
+        small_height, small_width = max(1, height // self.downsample), max(1, width // self.downsample)
+        step = self.tile_size // self.downsample
+        rows, cols = -(-small_height // step), -(-small_width // step)
+        self.scratch = {
+            "small_rgb": np.empty((small_height, small_width, 3), dtype=np.uint8),
+            "small": np.empty((small_height, small_width), dtype=np.uint8),
+            "diff": np.empty((small_height, small_width), dtype=np.uint8),
+            "padded": np.zeros((rows * step, cols * step), dtype=np.float32),
+            "tile_means": np.empty((rows, cols), dtype=np.float32),
+            "dirty": np.empty((rows, cols), dtype=bool),
+            "pixel_mask": np.empty((rows * step, cols * step), dtype=np.uint8),
+        }
+
+    def _downsample(self, img_rgb: np.ndarray) -> np.ndarray:
+        small_rgb, small = self.scratch["small_rgb"], self.scratch["small"]
+        cv2.resize(img_rgb, (small.shape[1], small.shape[0]), dst=small_rgb, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small_rgb, cv2.COLOR_RGB2GRAY, dst=small)
+
+
+def region_area(region: Region) -> int:
+    top, right, bottom, left = region
+    return max(0, bottom - top) * max(0, right - left)
+
+
+def regions_intersect(a: Region, b: Region) -> bool:
+    """Whether two (top, right, bottom, left) boxes overlap"""
+    return a[0] < b[2] and b[0] < a[2] and a[3] < b[1] and b[3] < a[1]
+
+
+def covered_fraction(regions: List[Region], shape) -> float:
+    """Approximate fraction of the frame covered by the regions"""
+    total = shape[0] * shape[1]
+    return min(1.0, sum(region_area(r) for r in regions) / float(total)) if total else 0.0
+
+
+def crop_offset(face_location: Tuple, region: Region, scale: float) -> Tuple[int, int, int, int]:
+    """Map a box found on a scaled crop of region back to frame coordinates"""
+    top, right, bottom, left = face_location
+    return (int(top / scale) + region[0], int(right / scale) + region[3],
+            int(bottom / scale) + region[0], int(left / scale) + region[3])
+
+
+def full_region(shape) -> Region:
+    """Region covering the whole frame"""
+    return (0, shape[1], shape[0], 0)
+
+
+
+def expand_region(box: Region, factor: float, shape, min_size: int = 0) -> Region:
+    """Grow a box by factor times its size on every side (at least to min_size), clipped to the frame"""
+    top, right, bottom, left = box
+    center_y, center_x = (top + bottom) / 2.0, (left + right) / 2.0
+    half_height = max((bottom - top) * (0.5 + factor), min_size / 2.0)
+    half_width = max((right - left) * (0.5 + factor), min_size / 2.0)
+    return (max(0, int(center_y - half_height)), min(shape[1], int(center_x + half_width)),
+            min(shape[0], int(center_y + half_height)), max(0, int(center_x - half_width)))
+
+
+def merge_regions(regions: List[Region]) -> List[Region]:
+    """Replace overlapping regions by their bounding boxes until none overlap"""
+    merged = list(regions)
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(i + 1, len(merged)):
+                if regions_intersect(merged[i], merged[j]):
+                    a, b = merged[i], merged.pop(j)
+                    merged[i] = (min(a[0], b[0]), max(a[1], b[1]), max(a[2], b[2]), min(a[3], b[3]))
+                    changed = True
+                    break
+            if changed:
+                break
+    return merged
+
+
+def clip_regions(regions: List[Region], bounds: List[Region]) -> List[Region]:
+    """The parts of the regions that lie inside any of the bounds, merged"""
+    clipped = []
+    for top, right, bottom, left in regions:
+        for bound_top, bound_right, bound_bottom, bound_left in bounds:
+            part = (max(top, bound_top), min(right, bound_right), min(bottom, bound_bottom), max(left, bound_left))
+            if part[2] > part[0] and part[1] > part[3]:
+                clipped.append(part)
+    return merge_regions(clipped)
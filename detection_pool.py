@@ -0,0 +1,240 @@
+"""
+Multi-process face detection
+Runs face detection (any backend from detectors.py) and face_recognition's encoding in
+a pool of worker processes so the calls use every CPU core. Each worker loads its
+models once, and frames are
+handed over through shared memory so full frames are never pickled.
+"""
+
+import os
+import math
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from detectors import DlibDetector, FaceDetector, create_detector
+from face_tracking import box_iou
+
+# Boxes use the face_recognition convention: (top, right, bottom, left)
+FaceLocation = Tuple[int, int, int, int]
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+_face_recognition = None
+_detectors = {}  # (model, model_dir) -> FaceDetector of this worker
+_attached = OrderedDict()  # Shared memory name -> SharedMemory, most recently used last
+_MAX_ATTACHED = 16
+
+
+def _init_worker():
+    """Load the dlib models once per worker process"""
+    global _face_recognition
+    import face_recognition
+    _face_recognition = face_recognition
+
+
+def _frame_view(name: str, shape: Tuple[int, ...]) -> np.ndarray:
+    """Map a shared-memory frame into this worker without copying it"""
+    segment = _attached.get(name)
+    if segment is None:
+        segment = shared_memory.SharedMemory(name=name)
+        _attached[name] = segment
+        while len(_attached) > _MAX_ATTACHED:
+            _attached.popitem(last=False)[1].close()
+    _attached.move_to_end(name)
+    return np.ndarray(shape, dtype=np.uint8, buffer=segment.buf)
+
+
+def _worker_detector(model: str, upsample: int, model_dir: Optional[str]) -> FaceDetector:
+    detector = _detectors.get((model, model_dir))
+    if detector is None:
+        detector = create_detector(model, upsample, model_dir)
+        _detectors[(model, model_dir)] = detector
+    if isinstance(detector, DlibDetector):
+        detector.upsample = upsample
+    return detector
+
+
+def _detect_task(name: str, shape: Tuple[int, ...], region: FaceLocation, scale: float, model: str,
+                 upsample: int, model_dir: Optional[str] = None) -> List[FaceLocation]:
+    """Detect faces in one region of a shared frame, in frame coordinates"""
+    frame = _frame_view(name, shape)
+    top, right, bottom, left = region
+    crop = frame[top:bottom, left:right]
+    if scale != 1.0:
+        crop = cv2.resize(crop, (0, 0), fx=scale, fy=scale)
+    found = _worker_detector(model, upsample, model_dir).detect(crop)
+    return [(int(t / scale) + top, int(r / scale) + left, int(b / scale) + top, int(l / scale) + left)
+            for (t, r, b, l) in found]
+
+
+def _encode_task(name: str, shape: Tuple[int, ...], face_locations: List[FaceLocation]) -> List[np.ndarray]:
+    """Compute 128-d encodings for some faces of a shared frame"""
+    frame = _frame_view(name, shape)
+    return _face_recognition.face_encodings(frame, face_locations)
+
+
+# ---------------------------------------------------------------------------
+# Parent side
+# ---------------------------------------------------------------------------
+
+class SharedFrame:
+    """A frame copied into a shared-memory slot of a DetectionPool"""
+
+    def __init__(self, pool: "DetectionPool", segment: shared_memory.SharedMemory, shape):
+        self.pool = pool
+        self.segment = segment
+        self.shape = tuple(shape)
+
+    @property
+    def name(self) -> str:
+        return self.segment.name
+
+    def release(self):
+        """Return the slot to the pool once no task needs the frame anymore"""
+        if self.segment is not None:
+            self.pool._release_segment(self.segment)
+            self.segment = None
+
+
+def split_tiles(region: FaceLocation, count: int, overlap: int, min_tile: int) -> List[FaceLocation]:
+    """Cut a region into about count overlapping tiles no smaller than min_tile"""
+    top, right, bottom, left = region
+    height, width = bottom - top, right - left
+    cols = max(1, min(int(math.ceil(math.sqrt(count * width / max(1, height)))), width // min_tile))
+    rows = max(1, min(int(math.ceil(count / cols)), height // min_tile))
+    tiles = []
+    for row in range(rows):
+        for col in range(cols):
+            tile_top = top + row * height // rows
+            tile_bottom = top + (row + 1) * height // rows
+            tile_left = left + col * width // cols
+            tile_right = left + (col + 1) * width // cols
+            tiles.append((max(top, tile_top - overlap), min(right, tile_right + overlap),
+                          min(bottom, tile_bottom + overlap), max(left, tile_left - overlap)))
+    return tiles
+
+
+def merge_duplicate_faces(face_locations: List[FaceLocation], iou_threshold: float = 0.4) -> List[FaceLocation]:
+    """Drop boxes that overlap an earlier box (faces found twice across tile seams)"""
+    merged = []
+    for face_location in face_locations:
+        if all(box_iou(face_location, kept) < iou_threshold for kept in merged):
+            merged.append(face_location)
+    return merged
+
+
+class DetectionPool:
+    """Pool of worker processes for face detection and encoding
+
+    Work is split by tile within a frame (detect/encode) or by frame across a
+    stream (imap_frames). Results always come back in submission order.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.tile_overlap = 64  # Pixels shared by neighbouring tiles so seam faces are seen whole
+        self.min_tile_size = 320  # Never cut regions into tiles smaller than this
+
+        # spawn keeps the workers free of the parent's Qt and capture threads
+        context = multiprocessing.get_context("spawn")
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                            initializer=_init_worker)
+        self.free_segments = []
+        self.all_segments = []
+
+    def share(self, img_rgb: np.ndarray) -> SharedFrame:
+        """Copy a frame into a free shared-memory slot"""
+        segment = self._acquire_segment(img_rgb.nbytes)
+        view = np.ndarray(img_rgb.shape, dtype=np.uint8, buffer=segment.buf)
+        view[...] = img_rgb
+        return SharedFrame(self, segment, img_rgb.shape)
+
+    def submit_detect(self, frame: SharedFrame, regions: Optional[List[FaceLocation]], scale: float,
+                      model: str = "hog", upsample: int = 1, model_dir: Optional[str] = None) -> list:
+        """Queue detection of the regions (whole frame if None), tiled across the workers"""
+        if regions is None:
+            regions = [(0, frame.shape[1], frame.shape[0], 0)]
+        per_region = max(1, self.workers // max(1, len(regions)))
+        futures = []
+        for region in regions:
+            for tile in split_tiles(region, per_region, self.tile_overlap, self.min_tile_size):
+                futures.append(self.executor.submit(_detect_task, frame.name, frame.shape, tile,
+                                                    scale, model, upsample, model_dir))
+        return futures
+
+    def detect(self, frame: SharedFrame, regions: Optional[List[FaceLocation]] = None, scale: float = 1.0,
+               model: str = "hog", upsample: int = 1, model_dir: Optional[str] = None) -> List[FaceLocation]:
+        """Detect faces in parallel tiles and merge the results in tile order"""
+        found = []
+        for future in self.submit_detect(frame, regions, scale, model, upsample, model_dir):
+            found.extend(future.result())
+        return merge_duplicate_faces(found)
+
+    def encode(self, frame: SharedFrame, face_locations: List[FaceLocation]) -> List[np.ndarray]:
+        """Encode faces split across the workers, returned in the order given"""
+        if not face_locations:
+            return []
+        chunk = max(1, -(-len(face_locations) // self.workers))
+        futures = [self.executor.submit(_encode_task, frame.name, frame.shape, face_locations[i:i + chunk])
+                   for i in range(0, len(face_locations), chunk)]
+        encodings = []
+        for future in futures:
+            encodings.extend(future.result())
+        return encodings
+
+    def imap_frames(self, frames: Iterable[np.ndarray], scale: float = 1.0, model: str = "hog",
+                    upsample: int = 1, max_in_flight: Optional[int] = None) -> Iterator[Tuple[np.ndarray, List[FaceLocation]]]:
+        """Detect faces on a stream of frames, several frames at a time, yielding in order"""
+        max_in_flight = max_in_flight or self.workers * 2
+        pending = deque()
+        for img_rgb in frames:
+            frame = self.share(img_rgb)
+            pending.append((img_rgb, frame, self.submit_detect(frame, None, scale, model, upsample)))
+            if len(pending) >= max_in_flight:
+                yield self._collect(pending.popleft())
+        while pending:
+            yield self._collect(pending.popleft())
+
+    def close(self):
+        """Stop the workers and free the shared memory"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        for segment in self.all_segments:
+            segment.close()
+            segment.unlink()
+        self.all_segments = []
+        self.free_segments = []
+
+    def _collect(self, entry) -> Tuple[np.ndarray, List[FaceLocation]]:
+        img_rgb, frame, futures = entry
+        try:
+            found = []
+            for future in futures:
+                found.extend(future.result())
+            return img_rgb, merge_duplicate_faces(found)
+        finally:
+            frame.release()
+
+    def _acquire_segment(self, size: int) -> shared_memory.SharedMemory:
+        for segment in list(self.free_segments):
+            self.free_segments.remove(segment)
+            if segment.size >= size:
+                return segment
+            # Capture area grew - this slot is too small to ever be reused
+            self.all_segments.remove(segment)
+            segment.close()
+            segment.unlink()
+        segment = shared_memory.SharedMemory(create=True, size=size)
+        self.all_segments.append(segment)
+        return segment
+
+    def _release_segment(self, segment: shared_memory.SharedMemory):
+        self.free_segments.append(segment)
@@ -0,0 +1,206 @@
+"""
+Face detector backends
+One interface over dlib's HOG and CNN detectors (through face_recognition), OpenCV's
+DNN face detectors (the res10 SSD and YuNet) and Haar cascades. Every backend takes
+RGB images, returns face_recognition-style (top, right, bottom, left) boxes, declares
+the input size it works best at and can detect on a batch of images (tiles of one
+frame or several frames) in one call.
+
+The DNN and Haar backends load their models from local files, by default from
+DEFAULT_MODEL_DIR:
+
+    face_detection_yunet_2023mar.onnx                  YuNet (opencv_zoo)
+    deploy.prototxt, res10_300x300_ssd_iter_140000.caffemodel   SSD (OpenCV samples)
+    haarcascade_frontalface_default.xml                Haar (falls back to cv2.data)
+"""
+
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+# Boxes use the face_recognition convention: (top, right, bottom, left)
+FaceLocation = Tuple[int, int, int, int]
+
+DETECTORS = ("hog", "cnn", "ssd", "yunet", "haar")
+DEFAULT_MODEL_DIR = os.path.join(os.path.expanduser("~"), ".face_blur", "models")
+
+YUNET_MODEL = "face_detection_yunet_2023mar.onnx"
+SSD_CONFIG = "deploy.prototxt"
+SSD_MODEL = "res10_300x300_ssd_iter_140000.caffemodel"
+HAAR_CASCADE = "haarcascade_frontalface_default.xml"
+
+
+def clip_box(box: FaceLocation, shape) -> FaceLocation:
+    top, right, bottom, left = box
+    height, width = shape[:2]
+    return max(0, top), min(width, right), min(height, bottom), max(0, left)
+
+
+def model_path(model_dir: Optional[str], filename: str) -> str:
+    """Path of a model file, raising ValueError when it is missing"""
+    path = os.path.join(model_dir or DEFAULT_MODEL_DIR, filename)
+    if not os.path.isfile(path):
+        raise ValueError(f"Detector model not found: {path}")
+    return path
+
+
+class FaceDetector:
+    """Base class: detect() on one RGB image, detect_batch() on several"""
+
+    name = ""
+    input_size = None  # (width, height) the backend resizes to itself (the processor then skips detection_scale)
+
+    def detect(self, image: np.ndarray) -> List[FaceLocation]:
+        return self.detect_batch([image])[0]
+
+    def detect_batch(self, images: Sequence[np.ndarray]) -> List[List[FaceLocation]]:
+        """Faces of every image, in image order (backends override this to batch)"""
+        return [self.detect(image) for image in images]
+
+
+class DlibDetector(FaceDetector):
+    """face_recognition's HOG or CNN detector
+
+    CNN batches same-sized images through dlib in one call; HOG has no batch path.
+    """
+
+    def __init__(self, model: str = "hog", upsample: int = 1, batch_size: int = 32):
+        import face_recognition
+        self._face_recognition = face_recognition
+        self.name = model
+        self.model = model
+        self.upsample = upsample  # Times dlib upsamples the image to find small faces
+        self.batch_size = batch_size
+
+    def detect(self, image: np.ndarray) -> List[FaceLocation]:
+        return self._face_recognition.face_locations(np.ascontiguousarray(image), model=self.model,
+                                                     number_of_times_to_upsample=self.upsample)
+
+    def detect_batch(self, images: Sequence[np.ndarray]) -> List[List[FaceLocation]]:
+        if self.model != "cnn" or len(images) < 2:
+            return [self.detect(image) for image in images]
+        # dlib only batches images of one size
+        results = [None] * len(images)
+        by_shape = {}
+        for index, image in enumerate(images):
+            by_shape.setdefault(image.shape, []).append(index)
+        for indexes in by_shape.values():
+            batch = [np.ascontiguousarray(images[i]) for i in indexes]
+            found = self._face_recognition.batch_face_locations(batch, self.upsample, self.batch_size)
+            for index, faces in zip(indexes, found):
+                results[index] = faces
+        return results
+
+
+class SsdDetector(FaceDetector):
+    """OpenCV's res10 SSD (Caffe) face detector
+
+    Every image is resized to the 300x300 network input, so a whole batch runs as a
+    single forward pass.
+    """
+
+    name = "ssd"
+    input_size = (300, 300)
+
+    def __init__(self, model_dir: Optional[str] = None, confidence: float = 0.5):
+        if not hasattr(cv2.dnn, "readNetFromCaffe"):
+            raise ValueError(f"OpenCV {cv2.__version__} has no Caffe importer for the SSD model (use yunet)")
+        self.net = cv2.dnn.readNetFromCaffe(model_path(model_dir, SSD_CONFIG), model_path(model_dir, SSD_MODEL))
+        self.confidence = confidence
+
+    def detect_batch(self, images: Sequence[np.ndarray]) -> List[List[FaceLocation]]:
+        if not images:
+            return []
+        # The model was trained on BGR input with these channel means
+        blob = cv2.dnn.blobFromImages([cv2.cvtColor(image, cv2.COLOR_RGB2BGR) for image in images], 1.0,
+                                      self.input_size, (104.0, 177.0, 123.0))
+        self.net.setInput(blob)
+        detections = self.net.forward().reshape(-1, 7)  # image_id, label, score, x1, y1, x2, y2
+        results = [[] for _ in images]
+        for image_id, _, score, x1, y1, x2, y2 in detections:
+            if score < self.confidence or image_id < 0:
+                continue
+            image = images[int(image_id)]
+            height, width = image.shape[:2]
+            box = clip_box((int(y1 * height), int(x2 * width), int(y2 * height), int(x1 * width)), image.shape)
+            if box[2] > box[0] and box[1] > box[3]:
+                results[int(image_id)].append(box)
+        return results
+
+
+class YuNetDetector(FaceDetector):
+    """OpenCV's YuNet face detector (cv2.FaceDetectorYN)
+
+    Images are scaled so their longer side matches the preferred input size. YuNet
+    takes one image per call, so batches run image by image on one network.
+    """
+
+    name = "yunet"
+    input_size = (320, 320)
+
+    def __init__(self, model_dir: Optional[str] = None, score_threshold: float = 0.7,
+                 nms_threshold: float = 0.3):
+        self.detector = cv2.FaceDetectorYN.create(model_path(model_dir, YUNET_MODEL), "", self.input_size,
+                                                  score_threshold, nms_threshold)
+
+    def detect(self, image: np.ndarray) -> List[FaceLocation]:
+        height, width = image.shape[:2]
+        scale = min(1.0, max(self.input_size) / max(height, width))
+        if scale < 1.0:
+            image = cv2.resize(image, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        self.detector.setInputSize((image.shape[1], image.shape[0]))
+        _, faces = self.detector.detect(cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
+        if faces is None:
+            return []
+        boxes = []
+        for x, y, w, h in faces[:, :4]:
+            box = clip_box((int(y / scale), int((x + w) / scale), int((y + h) / scale), int(x / scale)),
+                           (height, width))
+            if box[2] > box[0] and box[1] > box[3]:
+                boxes.append(box)
+        return boxes
+
+
+class HaarDetector(FaceDetector):
+    """Viola-Jones Haar cascade: fast, frontal faces only, more false positives"""
+
+    name = "haar"
+
+    def __init__(self, model_dir: Optional[str] = None, scale_factor: float = 1.1, min_neighbors: int = 5,
+                 min_size: int = 24):
+        if not hasattr(cv2, "CascadeClassifier"):
+            raise ValueError(f"OpenCV {cv2.__version__} has no Haar cascade support (moved to opencv-contrib)")
+        path = os.path.join(model_dir or DEFAULT_MODEL_DIR, HAAR_CASCADE)
+        if not os.path.isfile(path) and hasattr(cv2, "data"):
+            path = os.path.join(cv2.data.haarcascades, HAAR_CASCADE)  # Bundled with opencv-python 4.x
+        self.cascade = cv2.CascadeClassifier(path)
+        if self.cascade.empty():
+            raise ValueError(f"Could not load Haar cascade: {path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+
+    def detect(self, image: np.ndarray) -> List[FaceLocation]:
+        gray = cv2.equalizeHist(cv2.cvtColor(image, cv2.COLOR_RGB2GRAY))
+        found = self.cascade.detectMultiScale(gray, self.scale_factor, self.min_neighbors,
+                                              minSize=(self.min_size, self.min_size))
+        return [(int(y), int(x + w), int(y + h), int(x)) for x, y, w, h in found]
+
+
+def create_detector(name: str = "hog", upsample: int = 1, model_dir: Optional[str] = None) -> FaceDetector:
+    """Build one of DETECTORS
+
+    Raises:
+        ValueError: unknown backend or a missing model file
+    """
+    if name in ("hog", "cnn"):
+        return DlibDetector(name, upsample)
+    if name == "ssd":
+        return SsdDetector(model_dir)
+    if name == "yunet":
+        return YuNetDetector(model_dir)
+    if name == "haar":
+        return HaarDetector(model_dir)
+    raise ValueError(f"Unknown face detector: {name}")
@@ -0,0 +1,178 @@
+"""
+Bulk reference enrollment
+Walks a directory with one subfolder per identity, detects and encodes the faces of
+every image in a pool of worker processes, rejects unusable images with a report, and
+writes the encodings into a reference store the overlay can start from:
+
+    python enroll_faces.py photos/ --workers 8 --centroid
+    python face_blur.py --use-store
+
+photos/
+    alice/  holiday.jpg  badge.png ...
+    bob/    ...
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+from reference_store import DEFAULT_STORE_PATH, ReferenceStore, encode_image, file_sha256, pick_face
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".webp")
+
+
+def find_images(root: str) -> List[Tuple[str, str]]:
+    """(identity, image_path) for every image below root, identity = first-level folder"""
+    images = []
+    for identity in sorted(os.listdir(root)):
+        identity_dir = os.path.join(root, identity)
+        if not os.path.isdir(identity_dir):
+            continue
+        for dirpath, _, filenames in os.walk(identity_dir):
+            for filename in sorted(filenames):
+                if filename.lower().endswith(IMAGE_EXTENSIONS):
+                    images.append((identity, os.path.join(dirpath, filename)))
+    return images
+
+
+def enroll_image(task: Tuple[str, str, dict]) -> dict:
+    """Worker: detect, quality-check and encode one image"""
+    identity, path, options = task
+    result = {"identity": identity, "path": path, "status": "rejected", "reason": None, "encoding": None}
+    try:
+        rgb_image, face_locations, face_encodings = encode_image(
+            path, options["detection_model"], options["landmark_model"],
+            options["num_jitters"], options["max_dimension"])
+    except Exception as e:
+        result["reason"] = f"unreadable: {e}"
+        return result
+
+    if not face_locations:
+        result["reason"] = "no face detected"
+        return result
+    if len(face_locations) > 1 and not options["allow_multi"]:
+        result["reason"] = f"{len(face_locations)} faces"
+        return result
+
+    index = pick_face(face_locations, rgb_image.shape, options["pick"])
+    top, right, bottom, left = face_locations[index]
+    face_size = min(bottom - top, right - left)
+    if face_size < options["min_face_size"]:
+        result["reason"] = f"face too small ({face_size}px)"
+        return result
+
+    # Variance of the Laplacian is a cheap focus measure; low values mean a blurry face
+    face_gray = cv2.cvtColor(rgb_image[top:bottom, left:right], cv2.COLOR_RGB2GRAY)
+    sharpness = float(cv2.Laplacian(face_gray, cv2.CV_64F).var())
+    if sharpness < options["min_sharpness"]:
+        result["reason"] = f"blurry (sharpness {sharpness:.0f})"
+        return result
+    brightness = float(face_gray.mean())
+    if not options["min_brightness"] <= brightness <= 255 - options["min_brightness"]:
+        result["reason"] = f"badly exposed (brightness {brightness:.0f})"
+        return result
+
+    result.update(status="ok", reason=None, encoding=face_encodings[index], sha256=file_sha256(path),
+                  face_size=face_size, sharpness=sharpness, faces=len(face_locations))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="folder with one subfolder of photos per identity")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH, help="reference store to write (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="processes encoding photos in parallel (default: all cores but one)")
+    parser.add_argument("--pick", choices=("largest", "central", "first"), default="largest",
+                        help="face to use when an image has several (with --allow-multi)")
+    parser.add_argument("--allow-multi", action="store_true", help="accept images with several faces")
+    parser.add_argument("--min-face-size", type=int, default=80, help="smallest accepted face side in pixels")
+    parser.add_argument("--min-sharpness", type=float, default=30.0, help="minimum Laplacian variance of the face")
+    parser.add_argument("--min-brightness", type=float, default=30.0,
+                        help="reject faces darker than this or brighter than 255 minus this")
+    parser.add_argument("--max-dimension", type=int, default=1600, help="downscale larger photos before detection")
+    parser.add_argument("--centroid", action="store_true", help="also store an averaged encoding per identity")
+    parser.add_argument("--tolerance", type=float, default=None, help="match tolerance for the enrolled identities")
+    parser.add_argument("--append", action="store_true",
+                        help="keep existing encodings of the enrolled identities instead of replacing them")
+    parser.add_argument("--report", help="write a JSON report of accepted and rejected images")
+    args = parser.parse_args()
+
+    images = find_images(args.directory)
+    if not images:
+        print(f"No images found below {args.directory} (expected one subfolder per identity)")
+        sys.exit(1)
+
+    store = ReferenceStore(args.store)
+    if store.exists():
+        store.load(refresh=False)
+    options = {
+        "detection_model": store.detection_model,
+        "landmark_model": store.landmark_model,
+        "num_jitters": store.num_jitters,
+        "max_dimension": args.max_dimension,
+        "allow_multi": args.allow_multi,
+        "pick": args.pick,
+        "min_face_size": args.min_face_size,
+        "min_sharpness": args.min_sharpness,
+        "min_brightness": args.min_brightness,
+    }
+
+    print(f"Enrolling {len(images)} images with {args.workers} workers...")
+    start = time.perf_counter()
+    results = []
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as executor:
+        tasks = [(identity, path, options) for identity, path in images]
+        chunksize = max(1, len(tasks) // (args.workers * 4))
+        for result in executor.map(enroll_image, tasks, chunksize=chunksize):
+            results.append(result)
+            if result["status"] != "ok":
+                print(f"  rejected {result['path']}: {result['reason']}")
+    elapsed = time.perf_counter() - start
+
+    # Write the accepted encodings, grouped by identity
+    accepted = {}
+    for result in results:
+        if result["status"] == "ok":
+            accepted.setdefault(result["identity"], []).append(result)
+    for identity, identity_results in accepted.items():
+        if not args.append:
+            store.entries = [entry for entry in store.entries if entry["label"] != identity]
+        for result in identity_results:
+            store.add(identity, [result["encoding"]], result["path"], args.pick, result["sha256"])
+        if args.centroid:
+            centroid = np.mean([result["encoding"] for result in identity_results], axis=0)
+            store.add(identity, [centroid], None, "centroid")
+        if args.tolerance is not None:
+            store.tolerances[identity] = args.tolerance
+    store.save()
+
+    accepted_count = sum(len(r) for r in accepted.values())
+    print(f"\nAccepted {accepted_count}/{len(results)} images for {len(accepted)} identities "
+          f"in {elapsed:.1f}s ({len(results) / elapsed:.1f} images/s)")
+    for identity in sorted({identity for identity, _ in images}):
+        total = sum(1 for r in results if r["identity"] == identity)
+        print(f"  {identity}: {len(accepted.get(identity, []))}/{total}")
+    print(f"Saved to {store.meta_path}")
+
+    if args.report:
+        report = {
+            "images_per_second": len(results) / elapsed,
+            "elapsed_seconds": elapsed,
+            "images": [{key: value for key, value in result.items() if key != "encoding"} for result in results],
+        }
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,31 +6,55 @@ to selectively blur specific faces on your screen.
 
 import sys
 import os
+import argparse
+import threading
+import time
+from typing import Callable, Optional, List, Tuple, Union
+
+from startup import ModelWarmup, StartupTimer
+
+# Heavy modules are imported through the timer so the startup report shows their cost.
+# face_recognition (which loads the dlib models) and PIL are imported where first
+# needed, face_recognition on ModelWarmup's background thread
+startup_timer = StartupTimer()
+startup_timer.import_modules("numpy", "cv2", "PyQt6.QtWidgets")
+
 import cv2
 import numpy as np
-import face_recognition #this is the library that is used to detect and recognize faces
-import mss
-import gc
-import time
-from typing import Optional, List, Tuple
-from PIL import Image, ImageTk
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QPushButton, QFrame, QMessageBox)
-from PyQt6.QtCore import (Qt, QThread, pyqtSignal, QTimer, QRect, QPoint, 
+from PyQt6.QtCore import (Qt, QObject, QThread, pyqtSignal, QTimer, QRect, QRectF, QPoint, 
                          QSize, QPropertyAnimation, QEasingCurve)
 from PyQt6.QtGui import (QPainter, QPen, QPixmap, QImage, QFont, QColor, 
                         QCursor, QBrush, QPalette)
 
+from face_tracking import FaceTracker, TrackManager
+from change_detection import (ChangeDetector, clip_regions, crop_offset, expand_region, full_region,
+                              merge_regions, region_area, regions_intersect)
+from pipeline import FaceResult, FramePacket, LatestFrameQueue, OverlayFrame, OverlayPatch, route_patches
+from capture import ScreenSource, screen_monitors, source_factory
+from detection_pool import DetectionPool, merge_duplicate_faces
+from detectors import DETECTORS, DlibDetector, FaceDetector, create_detector
+from face_gallery import FaceGallery
+from reference_store import DEFAULT_STORE_PATH, ReferenceStore
+from telemetry import JsonLinesExporter, MetricsServer, Telemetry
+from frame_scheduler import DecisionLog, FrameScheduler, QualityController
+from obfuscation import ENGINES, MaskCache, obfuscate
+from buffer_pool import BufferPool
+from tile_scheduler import TileScheduler
+
 
 class FaceSelector: # this is for the window that pops up to select the face
     """Face selection dialog for choosing reference face"""
     
-    def __init__(self):
+    def __init__(self, warmup: Optional[ModelWarmup] = None):
         self.selected_encoding = None
+        self.selected_path = None  # Image the encoding came from
         self.root = None
+        self.warmup = warmup  # Background model loading to wait for before the first detection
     
     def select_face(self) -> Optional[np.ndarray]:
         """Show face selection dialog and return face encoding"""
@@ -88,6 +112,7 @@ class FaceSelector: # this is for the window that pops up to select the face
         self.ok_button = ok_button
         
         self.root.protocol("WM_DELETE_WINDOW", self._on_cancel)
+        self.root.after_idle(startup_timer.mark, "selector_shown")
         self.root.mainloop()
         
         return self.selected_encoding #this is the face encoding that is selected
@@ -128,6 +153,13 @@ class FaceSelector: # this is for the window that pops up to select the face
             #In the context of using the face_recognition library, converting an image to RGB format is an important step 
             #because the library expects images to be in RGB color space for accurate face detection and recognition.
 
+            # The models load in the background while the dialog is open
+            if self.warmup is not None and not self.warmup.ready():
+                self.status_label.config(text="Loading face models...", foreground="orange")
+                self.root.update()
+                self.warmup.wait()
+            import face_recognition #this is the library that is used to detect and recognize faces
+            
             # Detect faces
             #the return value of face_locations is a list of tuples, each tuple contains the coordinates of a face in the image
             face_locations = face_recognition.face_locations(rgb_image)
@@ -151,6 +183,7 @@ class FaceSelector: # this is for the window that pops up to select the face
                 return
             
             self.selected_encoding = face_encodings[0]
+            self.selected_path = file_path
             
             # Display image with face detection
             self._display_image_with_faces(rgb_image, face_locations)
@@ -201,6 +234,7 @@ class FaceSelector: # this is for the window that pops up to select the face
         # Convert to PIL and display 
         # PIL is a library that is used to create and manipulate images
         #ImageTk is a library that is used to display images in a tkinter window, and it is used to display the image in the face selection dialog
+        from PIL import Image, ImageTk
         pil_image = Image.fromarray(display_image) 
         photo = ImageTk.PhotoImage(pil_image) 
         
@@ -218,58 +252,146 @@ class FaceSelector: # this is for the window that pops up to select the face
 class BlurProcessor(QThread):
     """Thread for processing screen capture and face detection"""
     "(Only blur the part where face is detecedt. This logic is that, there will be latency, but the face not move like spaceship on screen. so even though you blur the face area that you detect maybe 0.01s ago, the face will still be there. This way, it will avoid the latency of whole screen playing)"
-    frame_ready = pyqtSignal(object)  # Processed frame ready
-    status_update = pyqtSignal(str)   # Status update
+    frame_ready = pyqtSignal()  # A new OverlayFrame is waiting in display_queue (take_overlay)
+    status_update = pyqtSignal(str)   # Status text, emitted when it changes
     error_occurred = pyqtSignal(str)      # Error message
     
-    def __init__(self, reference_encoding: np.ndarray):
+    def __init__(self, reference: Union[np.ndarray, FaceGallery]):
         super().__init__()
-        self.reference_encoding = reference_encoding
         self.capture_area = None
+        self.capture_regions = None  # Parts of the capture area to grab and search (None = all)
+        self.capture_layout = None  # (capture_area, capture_regions), swapped as one for the capture thread
+        self.frame_regions = None  # capture_regions of the frame being processed
         self.running = False
         
-        # Face tracking for smooth, continuous blur
-        self.last_face_pos = None  # Store last known face position
-        self.face_history = []     # Keep history for smoothing
-        self.max_history = 5       # Number of frames to average
+        # Face tracks with stable IDs and cached match verdicts, so a face is only
+        # re-encoded after track_manager.verify_ttl or a big appearance change
+        self.track_manager = TrackManager()
+        
+        # Motion model: every track runs a constant-velocity Kalman filter, and boxes are
+        # predicted forward to when the overlay reaches the screen (capture time plus the
+        # measured capture-to-emit latency plus one display frame)
+        self.motion_prediction = True
+        self.frame_time = None  # Capture time (time.perf_counter) of the frame being processed
+        self.latency_estimate = 0.0  # Smoothed capture-to-emit latency in seconds
+        self.prediction_horizon = 0.0  # Seconds past capture the boxes are predicted to
         
         # Processing parameters - EXACT copy from reference
         self.detection_scale = 0.5  # Scale down for faster detection
-        self.detection_model = "hog"  # Use HOG model for speed
+        self.detection_model = "hog"  # Detector backend: "hog", "cnn", "ssd", "yunet" or "haar"
+        self.detector_model_dir = None  # Model files for ssd/yunet/haar (None = ~/.face_blur/models)
+        self.detector = None  # Built on first use from detection_model
+        self.detector_fallback = None  # (detection_model that failed to load, backend used in its place)
+        self.detection_upsample = 1  # Times dlib upsamples the image to find small faces
         self.blur_strength = 31  # Must be odd number
+        self.blur_engine = "downscale"  # "downscale", "gaussian", "box", "pixelate" or "solid"
+        self.mask_cache = MaskCache(capacity=64, bucket=16)  # Feathered masks by size bucket
+        self.renderer_masks = False  # The window's renderer draws the masks (OpenGL) - patches only carry radii
         self.tolerance = 0.4  # Face matching tolerance
         
-        # Initialize screen capture - EXACT copy from reference
-        self.sct = mss.mss()
+        # Reference faces: a single encoding becomes a one-face gallery using self.tolerance
+        if isinstance(reference, FaceGallery):
+            self.gallery = reference
+        else:
+            self.gallery = FaceGallery.from_encoding(reference, tolerance=self.tolerance)
+        
+        # Detect-then-track mode: full detection + recognition only every N frames,
+        # matched faces are followed by cheap CPU trackers in between
+        self.tracking_enabled = True
+        self.tracker_method = "flow"  # "flow" (optical flow), "kcf" or "csrt"
+        self.detection_interval = 5  # Run full detection at least every N frames
+        self.min_tracking_confidence = 0.5  # Re-detect when a tracker drops below this
+        self.redetect_on_lost = True  # Re-detect on the next frame when a tracker loses its face
+        self.redetect_on_area_change = True  # Re-detect when the capture area moves or resizes
+        self.tracked_faces = []  # Matched FaceTracks currently followed by a FaceTracker
+        self.frames_since_detection = 0
+        self.force_detection = True
+        self.last_frame_mode = "detected"  # "detected", "tracked" or "unchanged", shown in the status label
+        
+        # Dirty-region gating: skip frames whose content didn't change and only run
+        # detection on the tiles that changed since the last detection pass
+        self.change_gating_enabled = True
+        self.change_detector = ChangeDetector(tile_size=64, noise_threshold=6.0)
+        self.dirty_margin = 96  # Pixels added around changed tiles so faces on tile edges are found
+        self.full_scan_fraction = 0.5  # Scan the whole frame once more than this changed
+        self.tile_scheduler = None  # TileScheduler: scan large areas (whole monitors) a few tiles per pass
+        self.last_processed_frame = None
+        
+        # Region-of-interest detection: between full scans only search windows around the
+        # matched faces, scaled so those faces are about roi_face_size pixels tall
+        self.roi_enabled = True
+        self.roi_expansion = 0.75  # ROI grows by this many face sizes on every side
+        self.roi_min_size = 160  # Smallest ROI edge in pixels
+        self.roi_face_size = 100  # Face height to scale ROIs to (never above full resolution)
+        self.roi_full_scan_interval = 1.0  # Seconds between full scans, 0 scans fully every pass
+        self.last_full_scan = 0.0
+        
+        # Pipelined mode: capture, detection and composition run as separate stages
+        # connected by latest-frame-wins queues (pipelined = False for the serial loop)
+        self.pipelined = True
+        self.detect_queue = LatestFrameQueue()
+        self.compose_queue = LatestFrameQueue()
+        self.latest_faces = None  # FaceResult from the most recent detection/tracking pass
+        
+        # Handoff to the GUI thread: the newest overlay waits in a one-slot queue and
+        # frame_ready is only emitted when the slot was empty, so a busy GUI (dragging,
+        # resizing) gets one queued event and paints the newest overlay, and the ones
+        # it never saw are counted as dropped instead of piling up
+        self.display_queue = LatestFrameQueue()
+        self.last_status = None  # Status text last emitted
+        
+        # Multi-process detection: detection and encoding run in a pool of worker
+        # processes when detection_workers > 0 (0 keeps them on the detection thread)
+        self.detection_workers = 0
+        self.detection_pool = None
+        
+        # Deadline-based frame pacing (scheduler.target_fps is set to the display refresh
+        # rate, power-save rate when no face is visible) and detection quality adapted
+        # to the measured stage times
+        self.decision_log = DecisionLog()
+        self.scheduler = FrameScheduler(target_fps=60, log=self.decision_log)
+        self.adaptive_quality = True
+        self.quality = QualityController(log=self.decision_log)
+        
+        # Per-stage timings, rates and queue state for the HUD and the exporters
+        self.telemetry = Telemetry()
+        self.telemetry.add_source(self._telemetry_gauges)
+        
+        # Capture source, created on the grabbing thread (mss handles are per thread).
+        # Frames come from a pool of reused buffers, enough for every pipeline stage
+        self.capture_factory = ScreenSource  # Called with buffers=capture_buffers
+        self.capture_buffers = 6
+        self.source = None
         self.frame_count = 0
         
-        self.sct = mss.mss()
-        
-    def _smooth_face_position(self, face_locations):
-        """Smooth face positions to prevent gaps and jitter"""
-        if not face_locations:
-            return face_locations
-            
-        # Take the first (most confident) face
-        current_face = face_locations[0]
-        
-        # Add to history
-        self.face_history.append(current_face)
-        if len(self.face_history) > self.max_history:
-            self.face_history.pop(0)
-        
-        # If we have enough history, smooth the position
-        if len(self.face_history) >= 2:
-            # Average the positions for smooth movement
-            avg_top = sum(face[0] for face in self.face_history) // len(self.face_history)
-            avg_right = sum(face[1] for face in self.face_history) // len(self.face_history)
-            avg_bottom = sum(face[2] for face in self.face_history) // len(self.face_history)
-            avg_left = sum(face[3] for face in self.face_history) // len(self.face_history)
-            
-            smoothed_face = (avg_top, avg_right, avg_bottom, avg_left)
-            return [smoothed_face]
+        # Scratch buffers for the per-frame work (gray frames, detection crops, blurred
+        # patches): written through OpenCV's dst= arguments and reused, so the steady
+        # state allocates nothing. Rebuilt when the capture area changes size
+        self.buffers = BufferPool()
+        
+    def _telemetry_gauges(self) -> dict:
+        """Queue and tracking state polled by the telemetry snapshots"""
+        return {
+            "detect_queue_depth": self.detect_queue.depth(),
+            "compose_queue_depth": self.compose_queue.depth(),
+            "detect_queue_dropped": self.detect_queue.dropped,
+            "compose_queue_dropped": self.compose_queue.dropped,
+            "display_dropped": self.display_queue.dropped,
+            "tracks": len(self.track_manager.tracks),
+            "tracked_faces": len(self.tracked_faces),
+            "quality_level": self.quality.level,
+            "power_save": int(self.scheduler.idle),
+            "late_frames": self.scheduler.late_frames,
+        }
+    
+    def _smooth_face_position(self, tracks):
+        """Filtered face positions, predicted to when the overlay will be on screen
         
-        return face_locations
+        Each track has its own motion model, so faces never mix.
+        """
+        if not self.motion_prediction or self.frame_time is None:
+            return [track.smoothed_location() for track in tracks]
+        return [track.predicted_location(self.frame_time + self.prediction_horizon) for track in tracks]
         
     def _expand_face_area(self, face_location, expansion_factor=0.3):
         """Expand face area for better coverage and gap prevention"""
@@ -289,198 +411,816 @@ class BlurProcessor(QThread):
             max(0, left - expand_w)
         )
     
-    def set_capture_area(self, x: int, y: int, width: int, height: int):
-        """Set the area to capture and process - EXACT copy from reference"""
+    def set_capture_area(self, x: int, y: int, width: int, height: int, regions: Optional[List[Tuple]] = None):
+        """Set the area to capture and process - EXACT copy from reference
+        
+        regions limits capture and detection to (top, right, bottom, left) parts of the
+        area, e.g. the overlay windows inside their bounding box.
+        """
+        if self.redetect_on_area_change and (self.capture_area != {
+                "top": y, "left": x, "width": width, "height": height} or self.capture_regions != regions):
+            self.force_detection = True
+            self.last_full_scan = 0.0  # Old face positions mean nothing in the new area
+            self.scheduler.wake()
         self.capture_area = {
             "top": y,
             "left": x, 
             "width": width,
             "height": height
         }
+        self.capture_regions = regions
+        self.capture_layout = (self.capture_area, regions)
+        if self.buffers.geometry != (height, width):
+            self.buffers.reset((height, width))
     
     def stop(self):
         """Stop the processing thread"""
         self.running = False
+        self.detect_queue.close()
+        self.compose_queue.close()
         self.wait()  # Wait for thread to finish
-        if hasattr(self, 'sct'):
-            self.sct.close()
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+        if self.detection_pool is not None:
+            self.detection_pool.close()
+            self.detection_pool = None
     
     def run(self):
         """Main processing loop"""
         self.running = True
-        
+        if self.pipelined:
+            self._run_pipelined()
+        else:
+            self._run_serial()
+    
+    def _run_serial(self):
+        """Grab, detect, blur and emit one frame at a time"""
+        if self.source is None:
+            self.source = self.capture_factory(buffers=self.capture_buffers)
         while self.running:
             try:
-                if not hasattr(self, 'capture_area'):
+                if self.capture_layout is None:
                     time.sleep(0.001)
                     continue
+                area, self.frame_regions = self.capture_layout
                 
-                # Capture screen - EXACT copy from reference
-                screenshot = self.sct.grab(self.capture_area)
-                img_array = np.array(screenshot)
+                timestamps = {"capture": time.perf_counter()}
+                self.frame_time = timestamps["capture"]
                 
-                # Convert BGRA to RGB - EXACT copy from reference
-                img_rgb = cv2.cvtColor(img_array, cv2.COLOR_BGRA2RGB)
+                # Capture screen as RGB into a reused frame buffer
+                img_rgb = self.source.grab(area, self.frame_regions)
+                timestamps["captured"] = time.perf_counter()
+                self.telemetry.record("capture", timestamps["captured"] - timestamps["capture"])
+                self.telemetry.count("captured")
                 
                 # DEBUG: Show capture info every 30 frames
                 # if self.frame_count % 30 == 0:
                 #     print(f"DEBUG: Capture area: {self.capture_area}")
                 #     print(f"DEBUG: Frame size: {img_rgb.shape}")
                 
-                # Process frame
-                processed_frame = self._process_frame(img_rgb)
+                # Process frame, unless nothing under the overlay changed
+                if self._screen_unchanged(img_rgb):
+                    self.last_frame_mode = "unchanged"
+                    self.telemetry.count("unchanged")
+                    processed_frame = self.last_processed_frame
+                else:
+                    timestamps["detect_capture"] = timestamps["capture"]
+                    timestamps["detect_start"] = time.perf_counter()
+                    processed_frame = self._process_frame(img_rgb)
+                    timestamps["compose_end"] = time.perf_counter()
+                    self.telemetry.record("process", timestamps["compose_end"] - timestamps["detect_start"])
+                    self.telemetry.count(self.last_frame_mode)
+                    self.last_processed_frame = processed_frame
+                    # None tells the window no face was detected; an unchanged
+                    # screen emits nothing so the window keeps the previous overlay
+                    self._emit_overlay(OverlayFrame(processed_frame, img_rgb.shape, self.frame_count, timestamps, area))
                 
                 if processed_frame is not None:
-                    self.frame_ready.emit(processed_frame)
-                    self.status_update.emit("Blurring Face")
+                    self._emit_status(f"Blurring Face ({self.last_frame_mode})")
                 else:
-                    # Emit None to indicate no face detected
-                    self.frame_ready.emit(None)
-                    self.status_update.emit("No Face Detected")
+                    self._emit_status(f"No Face Detected ({self.last_frame_mode})")
                 
-                # Control frame rate (30 FPS) - EXACT copy from reference
-                time.sleep(1/60)
+                # Wait for the next frame deadline (the processing time counts against it)
+                self.scheduler.wait(lambda: self.running)
                 
-                # Periodic cleanup
                 self.frame_count += 1
-                if self.frame_count % 30 == 0:
-                    gc.collect()
                 
             except Exception as e:
                 self.error_occurred.emit(f"Processing error: {str(e)}")
                 time.sleep(0.0001)  # Prevent rapid error loops
     
-    def _process_frame(self, img_rgb: np.ndarray) -> Optional[np.ndarray]:
+    def _run_pipelined(self):
+        """Run capture and detection on their own threads and compose in this one
+        
+        Capture samples at the scheduler's rate, detection/tracking always works on the newest
+        frame, and composition applies the latest face boxes to the newest pixels.
+        Queues hold a single frame, so stale frames are dropped instead of adding lag.
+        """
+        self.detect_queue = LatestFrameQueue()
+        self.compose_queue = LatestFrameQueue()
+        self.latest_faces = None
+        workers = [threading.Thread(target=self._capture_loop, name="blur-capture", daemon=True),
+                   threading.Thread(target=self._detection_loop, name="blur-detect", daemon=True)]
+        for worker in workers:
+            worker.start()
+        
+        try:
+            self._compose_loop()
+        finally:
+            self.running = False
+            self.detect_queue.close()
+            self.compose_queue.close()
+            for worker in workers:
+                worker.join()
+    
+    def _capture_loop(self):
+        """Capture stage: grab the capture area at display rate"""
+        # mss handles must be used on the thread that created them
+        with self.capture_factory(buffers=self.capture_buffers) as source:
+            frame_id = 0
+            while self.running:
+                try:
+                    layout = self.capture_layout
+                    if layout is None:
+                        time.sleep(0.001)
+                        continue
+                    capture_area, regions = layout
+                    
+                    start = time.perf_counter()
+                    img_rgb = source.grab(capture_area, regions)
+                    packet = FramePacket(frame_id, img_rgb, {"capture": start, "captured": time.perf_counter()},
+                                         capture_area, regions)
+                    frame_id += 1
+                    self.telemetry.record("capture", packet.timestamps["captured"] - start)
+                    self.telemetry.count("captured")
+                    
+                    self.detect_queue.put(packet)
+                    self.compose_queue.put(packet)
+                    
+                    self.scheduler.wait(lambda: self.running)
+                        
+                except Exception as e:
+                    self.error_occurred.emit(f"Capture error: {str(e)}")
+                    time.sleep(0.01)  # Prevent rapid error loops
+    
+    def _detection_loop(self):
+        """Detection stage: detect or track faces on the newest captured frame"""
+        while self.running:
+            packet = self.detect_queue.get(timeout=0.1)
+            if packet is None:
+                continue
+            try:
+                self.frame_regions = packet.regions
+                self.frame_time = packet.timestamps["capture"]
+                if self._screen_unchanged(packet.image):
+                    # Keep the current face boxes, but stop moving them: nothing on screen moves
+                    faces = self.latest_faces
+                    if faces is not None and faces.motions:
+                        self.latest_faces = FaceResult(faces.frame_id, [motion.location() for motion in faces.motions],
+                                                       faces.shape, faces.timestamps)
+                    self.last_frame_mode = "unchanged"
+                    self.telemetry.count("unchanged")
+                    continue
+                
+                detect_start = time.perf_counter()
+                face_locations = self._locate_matching_faces(packet.image)
+                motions = [track.motion.copy() for track in self.tracked_faces] if self.motion_prediction else None
+                self.latest_faces = FaceResult(packet.frame_id, face_locations, packet.image.shape, {
+                    "detect_capture": packet.timestamps["capture"],
+                    "detect_start": detect_start,
+                    "detect_end": time.perf_counter(),
+                }, motions)
+                self.telemetry.record(self.last_frame_mode, self.latest_faces.timestamps["detect_end"] - detect_start)
+                self.telemetry.count(self.last_frame_mode)
+                self.telemetry.set_gauge("faces", len(face_locations))
+            except Exception as e:
+                self.error_occurred.emit(f"Detection error: {str(e)}")
+    
+    def _compose_loop(self):
+        """Composition stage: blur the latest face boxes on the newest captured pixels
+        
+        When the boxes and the pixels under the last overlay's patches are unchanged,
+        nothing is composed or emitted and the window keeps showing that overlay.
+        """
+        last_emitted_empty = False
+        composed = None  # (face boxes, [(patch box, copy of the pixels it was blurred from)]) of the last overlay
+        while self.running:
+            packet = self.compose_queue.get(timeout=0.1)
+            if packet is None:
+                continue
+            try:
+                faces = self.latest_faces
+                face_locations = []
+                if faces is not None and faces.shape == packet.image.shape:
+                    face_locations = faces.face_locations
+                    if faces.motions and len(faces.motions) == len(face_locations):
+                        # Move the boxes on to this frame, so they follow the face between detections
+                        display_time = packet.timestamps["capture"] + self.prediction_horizon
+                        face_locations = [motion.predict(display_time) for motion in faces.motions]
+                
+                if face_locations and self._overlay_current(composed, face_locations, packet.image):
+                    self.telemetry.count("reused")
+                elif face_locations:
+                    timestamps = dict(packet.timestamps)
+                    timestamps.update(faces.timestamps)
+                    timestamps["compose_start"] = time.perf_counter()
+                    overlay = self._render_overlay(packet.image, face_locations)
+                    timestamps["compose_end"] = time.perf_counter()
+                    self.telemetry.record("compose", timestamps["compose_end"] - timestamps["compose_start"])
+                    self._emit_overlay(OverlayFrame(overlay, packet.image.shape, packet.frame_id, timestamps,
+                                                    packet.area))
+                    self._emit_status(f"Blurring Face ({self.last_frame_mode})")
+                    last_emitted_empty = False
+                    composed = (face_locations, [(patch.box(), packet.image[patch.top:patch.top + patch.height,
+                                                                           patch.left:patch.left + patch.width].copy())
+                                                 for patch in overlay or []])
+                elif not last_emitted_empty:
+                    # Only tell the window once that there is nothing to blur
+                    self._emit_overlay(OverlayFrame(None, packet.image.shape, packet.frame_id, dict(packet.timestamps),
+                                                    packet.area))
+                    self._emit_status(f"No Face Detected ({self.last_frame_mode})")
+                    last_emitted_empty = True
+                    composed = None
+                
+                self.frame_count += 1
+                    
+            except Exception as e:
+                self.error_occurred.emit(f"Processing error: {str(e)}")
+    
+    @staticmethod
+    def _overlay_current(composed: Optional[tuple], face_locations: List[Tuple], img_rgb: np.ndarray) -> bool:
+        """Whether the last composed overlay still fits: same boxes, same pixels under its patches"""
+        if composed is None or composed[0] != face_locations:
+            return False
+        for (top, right, bottom, left), pixels in composed[1]:
+            if pixels.shape != img_rgb[top:bottom, left:right].shape or \
+                    not np.array_equal(pixels, img_rgb[top:bottom, left:right]):
+                return False
+        return True
+    
+    def _emit_overlay(self, overlay_frame: OverlayFrame):
+        overlay_frame.stamp("emit")
+        latency = overlay_frame.latency()
+        if latency is not None:
+            self.telemetry.record("latency", latency)
+            self.latency_estimate += 0.1 * (latency - self.latency_estimate)
+            self.prediction_horizon = self.latency_estimate + 1.0 / self.scheduler.target_fps
+        face_age = overlay_frame.stage_durations().get("face_age")
+        if face_age is not None:
+            self.telemetry.record("face_age", face_age)
+        self.telemetry.count("emitted")
+        if self.display_queue.put(overlay_frame):
+            self.frame_ready.emit()
+    
+    def take_overlay(self) -> Optional[OverlayFrame]:
+        """The newest overlay for the GUI, None when a previous frame_ready already took it"""
+        return self.display_queue.get(timeout=0)
+    
+    def _emit_status(self, status: str):
+        """Send the status text, only when it changed"""
+        if status != self.last_status:
+            self.last_status = status
+            self.status_update.emit(status)
+    
+    def process_image(self, img_rgb: np.ndarray, frame_time: Optional[float] = None) -> Optional[List[OverlayPatch]]:
+        """Blur the matching faces of one frame outside the capture loop (e.g. video files)
+        
+        Frames are expected in order, so tracking and change gating carry over between
+        calls. frame_time is the frame's time in seconds (e.g. its video timestamp) for
+        the motion model, wall-clock time by default. Returns the overlay patches, or
+        None when no matching face is visible.
+        """
+        self.frame_time = time.perf_counter() if frame_time is None else frame_time
+        if self._screen_unchanged(img_rgb):
+            self.last_frame_mode = "unchanged"
+            return self.last_processed_frame
+        self.last_processed_frame = self._process_frame(img_rgb)
+        self.frame_count += 1
+        return self.last_processed_frame
+    
+    def _process_frame(self, img_rgb: np.ndarray) -> Optional[List[OverlayPatch]]:
         """Process a single frame to detect and blur matching faces - EXACT copy from reference
         
         Returns:
-            np.ndarray: Processed frame with only blurred face areas visible
+            List[OverlayPatch]: Blurred face areas, the rest of the overlay is transparent
             None: When no matching face is found (for transparency)
         """
         try:
-            # Use smaller image for faster face detection
-            small_img = cv2.resize(img_rgb, (0, 0), fx=self.detection_scale, fy=self.detection_scale)
-            face_locations = face_recognition.face_locations(small_img, model=self.detection_model, number_of_times_to_upsample=1)
-            
-            # print(f"DEBUG: Detected {len(face_locations)} faces in frame (scale={self.detection_scale})")
+            start = time.perf_counter()
+            face_locations = self._locate_matching_faces(img_rgb)
+            # The stage names the pipelined path records, so the HUD reads the same in both modes
+            self.telemetry.record(self.last_frame_mode, time.perf_counter() - start)
+            self.telemetry.set_gauge("faces", len(face_locations))
             
             if not face_locations:
-                return None  # No faces detected - make window transparent
+                return None  # No matching faces - make window transparent
+            
+            start = time.perf_counter()
+            overlay = self._render_overlay(img_rgb, face_locations)
+            self.telemetry.record("compose", time.perf_counter() - start)
+            return overlay
+                            
+        except Exception as e:
+            print(f"Frame processing error: {e}")
+            return None
+    
+    def _locate_matching_faces(self, img_rgb: np.ndarray) -> List[Tuple]:
+        """Find the matching faces on this frame
+        
+        Full detection + recognition runs on detection frames; in tracking mode the
+        matched faces are followed by FaceTrackers on the frames in between.
+        """
+        start = time.perf_counter()
+        self.frames_since_detection += 1
+        if self._should_run_detection():
+            face_locations = self._detect_matching_faces(img_rgb)
+            self._start_trackers(img_rgb)
+            self.last_frame_mode = "detected"
+        else:
+            face_locations = self._track_faces(img_rgb)
+            self.last_frame_mode = "tracked"
+        self._adapt_quality(time.perf_counter() - start, face_locations)
+        return face_locations
+    
+    def _adapt_quality(self, seconds: float, face_locations: List[Tuple]):
+        """Feed the scheduler and quality controller and apply a changed quality level"""
+        self.scheduler.note_faces(len(face_locations))
+        if not self.adaptive_quality:
+            return
+        settings = self.quality.observe(self.last_frame_mode, seconds, 1.0 / self.scheduler.target_fps,
+                                        self.tracking_enabled,
+                                        face_heights=[bottom - top for top, _, bottom, _ in face_locations])
+        if settings is not None:
+            self.detection_scale = settings["detection_scale"]
+            self.detection_upsample = settings["upsample"]
+            self.detection_interval = settings["detection_interval"]
+    
+    def _screen_unchanged(self, img_rgb: np.ndarray) -> bool:
+        """Feed the change detector and report whether no tile changed since it was processed"""
+        if not self.change_gating_enabled:
+            return False
+        dirty = self.change_detector.update(img_rgb)
+        if dirty.any():
+            return False
+        self.scheduler.note_faces(None)  # Power-save still kicks in on a static screen
+        return True
+    
+    def _detection_regions(self, img_rgb: np.ndarray) -> Tuple[List[Tuple], float, bool]:
+        """Regions to search on this detection pass, their detection scale, and whether they are ROIs"""
+        roi = self._roi_regions(img_rgb)
+        if roi is not None:
+            return roi[0], roi[1], True
+        self.last_full_scan = time.monotonic()
+        return self._changed_regions(img_rgb), self._detection_scale(), False
+    
+    def _roi_regions(self, img_rgb: np.ndarray) -> Optional[Tuple[List[Tuple], float]]:
+        """Windows around the matched faces and their scale, or None when a full scan is due"""
+        if not self.roi_enabled or not self.tracked_faces:
+            return None
+        if time.monotonic() - self.last_full_scan >= self.roi_full_scan_interval:
+            return None
+        boxes = [track.face_location for track in self.tracked_faces]
+        regions = merge_regions([expand_region(box, self.roi_expansion, img_rgb.shape, self.roi_min_size)
+                                 for box in boxes])
+        if self.frame_regions:
+            regions = clip_regions(regions, self.frame_regions)
+        if self._search_fraction(regions, img_rgb.shape) > self.full_scan_fraction:
+            return None  # Faces fill the frame - ROIs would not save anything
+        smallest_face = min(bottom - top for top, _, bottom, _ in boxes)
+        scale = min(1.0, max(self._detection_scale(), self.roi_face_size / max(1, smallest_face)))
+        return regions, scale
+    
+    def _changed_regions(self, img_rgb: np.ndarray) -> List[Tuple]:
+        """Regions that changed since the last full scan (all searched regions if most did)"""
+        search_regions = self._search_regions(img_rgb.shape)
+        if self.tile_scheduler is not None:
+            return self._scheduled_tiles(search_regions)
+        if not self.change_gating_enabled:
+            return search_regions
+        dirty = self.change_detector.take_accumulated()
+        if dirty is None or dirty.all():
+            return search_regions
+        regions = self.change_detector.dirty_regions(dirty, self.dirty_margin)
+        if self.frame_regions:
+            regions = clip_regions(regions, self.frame_regions)
+        if self._search_fraction(regions, img_rgb.shape) > self.full_scan_fraction:
+            return search_regions
+        return regions
+    
+    def _full_scan_regions(self, img_rgb: np.ndarray) -> List[Tuple]:
+        """Everything there is to search, whatever changed (every tile with a tile scheduler)"""
+        search_regions = self._search_regions(img_rgb.shape)
+        if self.change_gating_enabled:
+            self.change_detector.take_accumulated()  # All of it is scanned now
+        if self.tile_scheduler is None:
+            return search_regions
+        if self.tile_scheduler.regions != search_regions:
+            self.tile_scheduler.layout(search_regions)
+        tiles = self.tile_scheduler.select_all()
+        self.telemetry.set_gauge("tile_backlog", 0)
+        return tiles
+    
+    def _scheduled_tiles(self, search_regions: List[Tuple]) -> List[Tuple]:
+        """The tiles the tile scheduler wants scanned next, changed tiles first"""
+        if self.tile_scheduler.regions != search_regions:
+            self.tile_scheduler.layout(search_regions)
+        changed = None
+        if self.change_gating_enabled:
+            dirty = self.change_detector.take_accumulated()
+            if dirty is not None:
+                changed = self.change_detector.dirty_regions(dirty)
+        tiles = self.tile_scheduler.select(changed)
+        self.telemetry.set_gauge("tile_backlog", self.tile_scheduler.backlog())
+        return tiles
+    
+    def _search_regions(self, shape) -> List[Tuple]:
+        """What a full scan covers: the captured regions, or the whole frame"""
+        return list(self.frame_regions) if self.frame_regions else [full_region(shape)]
+    
+    def _search_fraction(self, regions: List[Tuple], shape) -> float:
+        """Approximate fraction of the searchable area covered by the regions"""
+        total = sum(region_area(region) for region in self._search_regions(shape))
+        return min(1.0, sum(region_area(region) for region in regions) / float(total)) if total else 0.0
+    
+    def _should_run_detection(self) -> bool:
+        """Decide whether this frame needs full detection + recognition"""
+        if not self.tracking_enabled or self.force_detection:
+            return True
+        return self.frames_since_detection >= self.detection_interval
+    
+    def _detect_matching_faces(self, img_rgb: np.ndarray) -> List[Tuple]:
+        """Run detection + recognition and return locations of faces matching the target"""
+        # With a worker pool the frame is copied to shared memory once for detection and encoding
+        shared_frame = self.detection_pool.share(img_rgb) if self._ensure_detection_pool() else None
+        try:
+            regions, scale, roi_pass = self._detection_regions(img_rgb)
+            face_locations = self._find_faces(img_rgb, regions, shared_frame, scale)
             
-            # Scale face locations back to original size
-            face_locations = [(int(top/self.detection_scale), int(right/self.detection_scale), 
-                             int(bottom/self.detection_scale), int(left/self.detection_scale)) 
-                            for (top, right, bottom, left) in face_locations]
+            if roi_pass and not all(any(regions_intersect(track.face_location, found) for found in face_locations)
+                                    for track in self.tracked_faces):
+                # An ROI lost its face - scan the frame right away instead of waiting for the cadence
+                self.telemetry.count("roi_scans")
+                self.telemetry.count("detection_pixels", int(sum(region_area(r) for r in regions) * scale * scale))
+                regions, scale, roi_pass = self._full_scan_regions(img_rgb), self._detection_scale(), False
+                self.last_full_scan = time.monotonic()
+                face_locations = self._find_faces(img_rgb, regions, shared_frame, scale)
+            self.telemetry.count("roi_scans" if roi_pass else "full_scans")
+            self.telemetry.count("detection_pixels", int(sum(region_area(r) for r in regions) * scale * scale))
             
-            # Apply smoothing for continuous coverage
-            face_locations = self._smooth_face_position(face_locations)
+            # print(f"DEBUG: Detected {len(face_locations)} faces in {len(regions)} region(s) (scale={scale})")
             
-            # Get face encodings for detected faces
-            face_encodings = face_recognition.face_encodings(img_rgb, face_locations)
+            # Faces outside the searched regions are still where they were last seen
+            measured = [True] * len(face_locations)
+            if regions != self._search_regions(img_rgb.shape):
+                carried = [track.face_location for track in self.track_manager.tracks.values()
+                           if track.missed == 0 and not any(regions_intersect(track.face_location, r) for r in regions)]
+                face_locations.extend(carried)
+                measured.extend([False] * len(carried))  # Not seen again - leave their motion models alone
             
-            # print(f"DEBUG: Generated {len(face_encodings)} face encodings")
+            # Continue existing tracks (this also ages out faces that disappeared)
+            now = time.monotonic()
+            tracks = self.track_manager.associate(face_locations, now, self.frame_time, measured)
             
-            # Create transparent overlay (RGBA format)
-            overlay = np.zeros((img_rgb.shape[0], img_rgb.shape[1], 4), dtype=np.uint8)
-            face_found = False
+            if not tracks:
+                self.tracked_faces = []
+                return []  # No faces detected - make window transparent
             
-            # Check each face against target
-            for i, ((top, right, bottom, left), face_encoding) in enumerate(zip(face_locations, face_encodings)):
-                # Compare with target face
-                matches = face_recognition.compare_faces([self.reference_encoding], 
-                                                       face_encoding, tolerance=self.tolerance)
+            # Only encode faces whose cached verdict expired or whose appearance changed
+            gray = self._gray(img_rgb)
+            pending = [track for track in tracks if self.track_manager.needs_verification(track, gray, now)]
+            
+            if pending:
+                # Get face encodings for the faces that need (re-)verification
+                face_encodings = self._encode_faces(img_rgb, [track.face_location for track in pending], shared_frame)
                 
-                # Calculate distance for debugging
-                distances = face_recognition.face_distance([self.reference_encoding], face_encoding)
+                # print(f"DEBUG: Generated {len(face_encodings)} face encodings")
                 
-                # print(f"DEBUG: Face {i+1} - Match: {matches[0]}, Tolerance: {self.tolerance}, Distance: {distances[0]:.4f}")
+                # Check every face against every reference in one batch
+                matches = self.gallery.match(face_encodings)
                 
-                if matches[0]:  # Face matches target
-                    face_found = True
-                    
-                    # Expand face area for gap-free coverage
-                    expanded_face = self._expand_face_area((top, right, bottom, left), 0.2)
-                    top, right, bottom, left = expanded_face
-                    
-                    # print(f"DEBUG: MATCH FOUND! Face coordinates: top={top}, right={right}, bottom={bottom}, left={left}")
-                    # print(f"DEBUG: Face size: width={right-left}, height={bottom-top}")
-                    # print(f"DEBUG: Image size: width={img_rgb.shape[1]}, height={img_rgb.shape[0]}")
-                    
-                    # Ensure coordinates are within bounds
-                    top = max(0, top)
-                    left = max(0, left)
-                    bottom = min(img_rgb.shape[0], bottom)
-                    right = min(img_rgb.shape[1], right)
+                for track, face_encoding, match in zip(pending, face_encodings, matches):
+                    # print(f"DEBUG: Track {track.track_id} - Match: {match}")
                     
-                    # print(f"DEBUG: Bounded coordinates: top={top}, right={right}, bottom={bottom}, left={left}")
-                    # print(f"DEBUG: Bounded face size: width={right-left}, height={bottom-top}")
-                    
-                    # Extract and blur face region with padding for continuity
-                    face_region = img_rgb[top:bottom, left:right]
-                    if face_region.size > 0:
-                        blurred_face = cv2.GaussianBlur(face_region, 
-                                                      (self.blur_strength, self.blur_strength), 0)
-                        
-                        # Expand blur area for continuous coverage
-                        face_height = bottom - top
-                        face_width = right - left
-                        
-                        # Add padding for gap-free coverage (20% larger)
-                        padding_h = int(face_height * 0.1)
-                        padding_w = int(face_width * 0.1)
-                        
-                        # Expand coordinates with padding
-                        padded_top = max(0, top - padding_h)
-                        padded_left = max(0, left - padding_w)
-                        padded_bottom = min(img_rgb.shape[0], bottom + padding_h)
-                        padded_right = min(img_rgb.shape[1], right + padding_w)
-                        
-                        # Extract larger region for blur
-                        padded_region = img_rgb[padded_top:padded_bottom, padded_left:padded_right]
-                        blurred_padded = cv2.GaussianBlur(padded_region, 
-                                                        (self.blur_strength, self.blur_strength), 0)
-                        
-                        # Create circular mask for smooth, continuous coverage
-                        padded_height = padded_bottom - padded_top
-                        padded_width = padded_right - padded_left
-                        
-                        # Use circular mask that's 110% of face size for overlap
-                        mask = np.zeros((padded_height, padded_width), dtype=np.uint8)
-                        center_x, center_y = padded_width // 2, padded_height // 2
-                        radius = max(face_width, face_height) // 2 + 20  # Extra radius for continuity
-                        
-                        cv2.circle(mask, (center_x, center_y), radius, 255, -1)
-                        
-                        # Apply strong gaussian blur for seamless edges
-                        mask = cv2.GaussianBlur(mask, (41, 41), 0)  # Larger blur for smoother transitions
-                        
-                        # Apply the blurred region with smooth mask
-                        for c in range(3):  # RGB channels
-                            overlay[padded_top:padded_bottom, padded_left:padded_right, c] = blurred_padded[:, :, c]
-                        
-                        # Use the smooth mask as alpha channel
-                        overlay[padded_top:padded_bottom, padded_left:padded_right, 3] = mask
-            
-            if not face_found:
-                return None  # No matching faces - make window transparent
-            
-            # Return only the RGBA overlay (with transparency)
-            # The paintEvent will handle displaying only the non-transparent parts
-            return overlay
-                            
-        except Exception as e:
-            print(f"Frame processing error: {e}")
+                    label, distance = match if match is not None else (None, None)
+                    self.track_manager.record_verification(track, face_encoding, match is not None,
+                                                           distance, gray, now, label)
+        finally:
+            if shared_frame is not None:
+                shared_frame.release()
+        
+        self.tracked_faces = [track for track in tracks if track.matched]
+        
+        # Apply smoothing for continuous coverage
+        return self._smooth_face_position(self.tracked_faces)
+    
+    def _ensure_detection_pool(self) -> bool:
+        """Start the worker pool on first use when detection_workers is set"""
+        if self.detection_workers and self.detection_pool is None:
+            self.detection_pool = DetectionPool(self.detection_workers)
+        return self.detection_pool is not None
+    
+    def _find_faces(self, img_rgb: np.ndarray, regions: List[Tuple], shared_frame=None,
+                    scale: Optional[float] = None) -> List[Tuple]:
+        """Detect faces inside the regions, split across the worker pool when one is running"""
+        scale = self._detection_scale() if scale is None else scale
+        if shared_frame is not None:
+            # Falls back here rather than failing in every worker
+            detection_model = self._ensure_detector().name
+            return self.detection_pool.detect(shared_frame, regions, scale, detection_model,
+                                              self.detection_upsample, self.detector_model_dir)
+        
+        # Use smaller images for faster face detection, all regions in one batch
+        crops = [self._detection_crop(img_rgb, region, scale) for region in regions]
+        found = self._ensure_detector().detect_batch(crops)
+        
+        # Scale face locations back to original size and frame position
+        face_locations = []
+        for region, locations in zip(regions, found):
+            face_locations.extend(crop_offset(location, region, scale) for location in locations)
+        # Overlapping regions (e.g. tiles) see faces on their seams twice
+        return merge_duplicate_faces(face_locations) if len(regions) > 1 else face_locations
+    
+    def _detection_scale(self) -> float:
+        """detection_scale, or 1.0 for backends that resize to their fixed input size themselves"""
+        return 1.0 if self._ensure_detector().input_size is not None else self.detection_scale
+    
+    def _detection_crop(self, img_rgb: np.ndarray, region: Tuple, scale: float) -> np.ndarray:
+        """A region scaled for detection, in a pooled contiguous buffer unless it already is one"""
+        top, right, bottom, left = region
+        crop = img_rgb[top:bottom, left:right]
+        if scale != 1.0:
+            size = (max(1, int(round((right - left) * scale))), max(1, int(round((bottom - top) * scale))))
+            return cv2.resize(crop, size, dst=self.buffers.get("detect_crop", (size[1], size[0], 3)))
+        if not crop.flags.c_contiguous:
+            # The detector needs contiguous images
+            contiguous = self.buffers.get("detect_crop", crop.shape)
+            np.copyto(contiguous, crop)
+            return contiguous
+        return crop
+    
+    def redact_batch(self, images: List[np.ndarray],
+                     render: Optional[List[bool]] = None) -> List[Tuple[List[Tuple], list, Optional[List[OverlayPatch]]]]:
+        """Detect, match and blur faces on independent frames, all frames in one pass
+        
+        The frames may come from different sources (e.g. the clients of the redaction
+        server): tracking, change gating and ROIs are neither used nor changed. Detection
+        runs as one detector batch and all faces are matched against the gallery at once.
+        Not for use while the processor's own loop is running.
+        
+        Returns:
+            Per frame (face_locations, matches, patches): every detected face with its
+            gallery match (None when it isn't a reference face), and the blurred patches
+            of the matched faces - None for frames whose render flag is False.
+        """
+        scale = self._detection_scale()
+        regions = [full_region(image.shape) for image in images]
+        crops = [self._detection_crop(image, region, scale) for image, region in zip(images, regions)]
+        found = self._ensure_detector().detect_batch(crops)
+        face_locations = [[crop_offset(location, region, scale) for location in locations]
+                          for region, locations in zip(regions, found)]
+        
+        encodings = []
+        for image, locations in zip(images, face_locations):
+            encodings.extend(self._encode_faces(image, locations) if locations else [])
+        all_matches = self.gallery.match(encodings)
+        
+        results = []
+        offset = 0
+        for index, (image, locations) in enumerate(zip(images, face_locations)):
+            matches = all_matches[offset:offset + len(locations)]
+            offset += len(locations)
+            patches = None
+            if render is None or render[index]:
+                matched = [location for location, match in zip(locations, matches) if match is not None]
+                patches = self._render_overlay(image, matched)
+            results.append((locations, matches, patches))
+        self.telemetry.count("detection_pixels", int(sum(region_area(region) for region in regions) * scale * scale))
+        return results
+    
+    def _ensure_detector(self) -> FaceDetector:
+        """The detector for detection_model
+        
+        When the backend's model can't be loaded, the fast Haar cascade (or HOG, when the
+        cascade is missing too) stands in for it: detection_model keeps the configured name,
+        detector_fallback records the substitution and error_occurred reports it once.
+        """
+        if self.detector is not None and self.detector.name == self.detection_model:
+            self.detector_fallback = None  # e.g. a warmed detector handed in, or the option changed back
+        elif self.detector is None or self.detector_fallback != (self.detection_model, self.detector.name):
+            self.detector_fallback = None
+            try:
+                self.detector = create_detector(self.detection_model, self.detection_upsample,
+                                                self.detector_model_dir)
+            except ValueError as e:
+                self.detector = self._fallback_detector(e)
+        if isinstance(self.detector, DlibDetector):
+            self.detector.upsample = self.detection_upsample  # Changed by the quality controller
+        return self.detector
+    
+    def _fallback_detector(self, error: ValueError) -> FaceDetector:
+        """Haar, else HOG, in place of detection_model whose model couldn't be loaded"""
+        for fallback in ("haar", "hog"):
+            if fallback == self.detection_model:
+                continue
+            try:
+                detector = create_detector(fallback, self.detection_upsample, self.detector_model_dir)
+            except ValueError:
+                continue
+            self.detector_fallback = (self.detection_model, fallback)
+            self.error_occurred.emit(f"{error} - using the {fallback} detector instead of {self.detection_model}")
+            return detector
+        raise error
+    
+    def _encode_faces(self, img_rgb: np.ndarray, face_locations: List[Tuple], shared_frame=None) -> List[np.ndarray]:
+        """Compute face encodings, split across the worker pool when one is running"""
+        if shared_frame is not None:
+            return self.detection_pool.encode(shared_frame, face_locations)
+        import face_recognition
+        return face_recognition.face_encodings(img_rgb, face_locations)
+    
+    def _gray(self, img_rgb: np.ndarray) -> np.ndarray:
+        """The frame in grayscale, in a pooled buffer (trackers keep the previous frame's)"""
+        return cv2.cvtColor(img_rgb, cv2.COLOR_RGB2GRAY, dst=self.buffers.get("gray", img_rgb.shape[:2]))
+    
+    def _start_trackers(self, img_rgb: np.ndarray):
+        """Reset the detection counters and start a tracker on every matched face"""
+        self.frames_since_detection = 0
+        self.force_detection = False
+        if not self.tracking_enabled or not self.tracked_faces:
+            return
+        
+        gray = self._gray(img_rgb)
+        active_tracks = []
+        for track in self.tracked_faces:
+            track.tracker = FaceTracker(self.tracker_method)
+            if track.tracker.init(img_rgb, track.face_location, gray):
+                active_tracks.append(track)
+            else:
+                track.tracker = None
+                if self.redetect_on_lost:
+                    # Not enough texture to track this face - detect again next frame
+                    self.force_detection = True
+        self.tracked_faces = active_tracks
+    
+    def _track_faces(self, img_rgb: np.ndarray) -> List[Tuple]:
+        """Follow matched faces with the trackers and flag re-detection when confidence drops"""
+        if not self.tracked_faces:
+            return []
+        
+        gray = self._gray(img_rgb)
+        now = time.monotonic()
+        active_tracks = []
+        for track in self.tracked_faces:
+            face_location, confidence = track.tracker.update(img_rgb, gray)
+            if face_location is None:
+                track.tracker = None
+                if self.redetect_on_lost:
+                    self.force_detection = True
+                continue
+            if confidence < self.min_tracking_confidence:
+                self.force_detection = True
+            track.observe(face_location, now, self.frame_time)
+            active_tracks.append(track)
+        
+        self.tracked_faces = active_tracks
+        return self._smooth_face_position(self.tracked_faces)
+    
+    def _render_overlay(self, img_rgb: np.ndarray, face_locations: List[Tuple]) -> List[OverlayPatch]:
+        """Blur the given face areas into sparse RGBA overlay patches"""
+        patches = [self._blur_face_patch(img_rgb, face_location) for face_location in face_locations]
+        return self._assemble_patches(patches)
+    
+    def _assemble_patches(self, patches: list) -> List[OverlayPatch]:
+        """Turn blurred face areas and their masks into RGBA patches
+        
+        Only the face areas are allocated; the window paints them at their positions
+        on its transparent background.
+        """
+        overlay_patches = []
+        for patch in patches:
+            if patch is None:
+                continue
+            (padded_top, padded_right, padded_bottom, padded_left), blurred_padded, mask, radius = patch
+            rgba = cv2.cvtColor(blurred_padded, cv2.COLOR_RGB2RGBA,
+                                dst=self.buffers.get("patch", blurred_padded.shape[:2] + (4,)))
+            if mask is None:
+                # The renderer feathers the circle itself
+                overlay_patches.append(OverlayPatch(padded_top, padded_left, rgba, radius, self.mask_cache.sigma()))
+                continue
+            # Use the smooth mask as alpha channel
+            rgba[:, :, 3] = mask
+            overlay_patches.append(OverlayPatch(padded_top, padded_left, rgba))
+        return overlay_patches
+    
+    def _blur_face_patch(self, img_rgb: np.ndarray, face_location: Tuple):
+        """Blur one face area and build its soft circular mask
+        
+        Returns:
+            ((top, right, bottom, left), blurred RGB patch, alpha mask, mask radius), or
+            None if the face lies outside the frame. The mask is None when the renderer
+            draws it (renderer_masks).
+        """
+        # Expand face area for gap-free coverage
+        expanded_face = self._expand_face_area(face_location, 0.2)
+        top, right, bottom, left = expanded_face
+        
+        # print(f"DEBUG: MATCH FOUND! Face coordinates: top={top}, right={right}, bottom={bottom}, left={left}")
+        # print(f"DEBUG: Face size: width={right-left}, height={bottom-top}")
+        # print(f"DEBUG: Image size: width={img_rgb.shape[1]}, height={img_rgb.shape[0]}")
+        
+        # Ensure coordinates are within bounds
+        top = max(0, top)
+        left = max(0, left)
+        bottom = min(img_rgb.shape[0], bottom)
+        right = min(img_rgb.shape[1], right)
+        
+        # print(f"DEBUG: Bounded coordinates: top={top}, right={right}, bottom={bottom}, left={left}")
+        # print(f"DEBUG: Bounded face size: width={right-left}, height={bottom-top}")
+        
+        # Skip faces that lie outside the frame
+        if bottom <= top or right <= left:
             return None
+        
+        # Expand blur area for continuous coverage
+        face_height = bottom - top
+        face_width = right - left
+        
+        # Add padding for gap-free coverage (20% larger)
+        padding_h = int(face_height * 0.1)
+        padding_w = int(face_width * 0.1)
+        
+        # Expand coordinates with padding
+        padded_top = max(0, top - padding_h)
+        padded_left = max(0, left - padding_w)
+        padded_bottom = min(img_rgb.shape[0], bottom + padding_h)
+        padded_right = min(img_rgb.shape[1], right + padding_w)
+        
+        # Extract larger region for blur
+        padded_region = img_rgb[padded_top:padded_bottom, padded_left:padded_right]
+        blurred_padded = obfuscate(padded_region, self.blur_engine, self.blur_strength,
+                                   self.buffers.get("blur", padded_region.shape), self.buffers)
+        
+        # Create circular mask for smooth, continuous coverage
+        padded_height = padded_bottom - padded_top
+        padded_width = padded_right - padded_left
+        
+        # Use circular mask that's 110% of face size for overlap, feathered with a
+        # 41x41 Gaussian for seamless edges (cached, so only new sizes are blurred)
+        radius = max(face_width, face_height) // 2 + 20  # Extra radius for continuity
+        mask = None if self.renderer_masks else self.mask_cache.get(padded_height, padded_width, radius)
+        
+        return (padded_top, padded_right, padded_bottom, padded_left), blurred_padded, mask, radius
+
+
+def patch_image(patch: OverlayPatch) -> QImage:
+    """Wrap an overlay patch in a QImage without copying its pixels
+    
+    The QImage shares the patch's buffer, so the patch must outlive it.
+    """
+    rgba = patch.rgba
+    return QImage(rgba.data, rgba.shape[1], rgba.shape[0], rgba.strides[0], QImage.Format.Format_RGBA8888)
+
+
+def paint_patches(painter: QPainter, patches: list, frame_shape: Tuple[int, int], width: int, height: int):
+    """Paint (OverlayPatch, QImage) pairs, scaling only when the frame and window sizes differ
+    (e.g. a capture in physical pixels on a high-DPI screen)"""
+    frame_height, frame_width = frame_shape
+    if (frame_width, frame_height) == (width, height):
+        for patch, image in patches:
+            painter.drawImage(QPoint(patch.left, patch.top), image)
+        return
+    
+    scale_x = width / frame_width
+    scale_y = height / frame_height
+    painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+    for patch, image in patches:
+        target = QRectF(patch.left * scale_x, patch.top * scale_y,
+                        patch.width * scale_x, patch.height * scale_y)
+        painter.drawImage(target, image)
 
 
 class EnhancedBlurWindow(QMainWindow):
     """Main overlay window with enhanced controls"""
     
-    def __init__(self, reference_encoding: np.ndarray):
+    def __init__(self, reference_encoding: Union[np.ndarray, FaceGallery], show_hud: bool = False,
+                 capture_factory: Optional[Callable] = None, service: Optional["SharedBlurService"] = None,
+                 renderer: str = "qpainter", configure: Optional[Callable[["BlurProcessor"], None]] = None):
         super().__init__()
-        self.reference_encoding = reference_encoding
+        self.reference_encoding = reference_encoding  # Single encoding or a FaceGallery
+        self.renderer = renderer  # "qpainter", or "opengl" to draw the patches with gl_overlay
+        self.gl_view = None  # GLOverlayWidget over the window when the OpenGL renderer is running
+        self.capture_factory = capture_factory  # None captures the screen
+        self.service = service  # Shared processor of several windows, None = own processor
+        self.configure = configure  # Applies the command line options to the own processor before it starts
         self.processor = None
-        self.current_pixmap = None  # Store current blurred content
+        self.current_patches = []  # (OverlayPatch, QImage) of the current blurred faces
+        self.frame_shape = None  # (height, width) of the frame the patches belong to
+        self.status_text = None  # Last status from the processor
+        
+        # Telemetry HUD, toggled by double-clicking the window
+        self.show_hud = show_hud
+        self.hud_lines = []
         
         # Window properties
         self.border_width = 8
@@ -525,7 +1265,7 @@ class EnhancedBlurWindow(QMainWindow):
         
         # Status label positioned at top
         self.status_label = QLabel(self)
-        self.status_label.setGeometry(10, 10, 200, 30)
+        self.status_label.setGeometry(10, 10, 260, 30)
         self.status_label.setStyleSheet("""
             QLabel {
                 background-color: rgba(0, 0, 0, 200);
@@ -542,13 +1282,61 @@ class EnhancedBlurWindow(QMainWindow):
         
         # Enable mouse tracking
         self.setMouseTracking(True)
+        
+        if self.renderer == "opengl":
+            self.setup_gl_view()
+    
+    def setup_gl_view(self):
+        """Lay an OpenGL view over the window to draw the patches, if OpenGL works here"""
+        try:
+            from gl_overlay import GLOverlayWidget, opengl_available
+        except ImportError as e:
+            print(f"OpenGL renderer not available ({e}) - painting with QPainter")
+            return
+        if not opengl_available():
+            print("Could not create an OpenGL context - painting with QPainter")
+            return
+        self.gl_view = GLOverlayWidget(self)
+        self.gl_view.setGeometry(self.rect())
+        self.gl_view.failed.connect(self.fall_back_to_qpainter)
+        self.gl_view.show()
+    
+    def fall_back_to_qpainter(self, reason: str):
+        """Drop the OpenGL view when it couldn't initialize"""
+        print(f"OpenGL renderer failed ({reason}) - painting with QPainter")
+        if self.gl_view is not None:
+            self.gl_view.hide()
+            self.gl_view.deleteLater()
+            self.gl_view = None
+        if self.service is not None:
+            self.service.update_renderer_masks()  # The other windows may still use OpenGL
+        elif self.processor is not None:
+            self.processor.renderer_masks = False
     
     def setup_processor(self):
         """Setup the blur processor thread"""
+        if self.service is not None:
+            # The service captures for every window and routes each its own patches
+            self.processor = self.service.processor
+            self.processor.status_update.connect(self.update_status_text)
+            self.processor.error_occurred.connect(self.handle_error)
+            self.service.add_window(self)
+            return
+        
         self.processor = BlurProcessor(self.reference_encoding)
-        self.processor.frame_ready.connect(self.update_frame)
+        self.processor.renderer_masks = self.gl_view is not None  # The shader feathers the patches
+        self.processor.frame_ready.connect(self.receive_frame)
         self.processor.status_update.connect(self.update_status_text)
         self.processor.error_occurred.connect(self.handle_error)
+        if self.capture_factory is not None:
+            self.processor.capture_factory = self.capture_factory
+        
+        # Sample the screen at the display refresh rate
+        refresh_rate = self.screen().refreshRate() if self.screen() else 0
+        if refresh_rate > 0:
+            self.processor.scheduler.target_fps = refresh_rate
+        if self.configure is not None:
+            self.configure(self.processor)  # Before start, so the first frame uses the options
         
         # Set capture area and start processing
         self.update_processor_capture_rect()
@@ -564,9 +1352,9 @@ class EnhancedBlurWindow(QMainWindow):
         painter.fillRect(self.rect(), QColor(0, 0, 0, 0))
         painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceOver)
         
-        # Draw the blurred content if available
-        if self.current_pixmap:
-            painter.drawPixmap(0, 0, self.current_pixmap)
+        # Draw the blurred face patches where they belong
+        if self.current_patches:
+            self.draw_patches(painter)
         
         # Draw red border around the entire window for visibility
         pen = QPen(QColor(255, 0, 0), 3)  # Red border, 3px thick
@@ -574,6 +1362,26 @@ class EnhancedBlurWindow(QMainWindow):
         painter.setBrush(QBrush(QColor(0, 0, 0, 0)))  # Transparent fill
         rect = self.rect().adjusted(1, 1, -2, -2)  # Adjust for border width
         painter.drawRect(rect)
+        
+        if self.show_hud and self.hud_lines:
+            self.draw_hud(painter)
+    
+    def draw_patches(self, painter: QPainter):
+        """Paint the overlay patches at their positions"""
+        paint_patches(painter, self.current_patches, self.frame_shape, self.width(), self.height())
+    
+    def draw_hud(self, painter: QPainter):
+        """Draw the telemetry lines in a dark box below the status label"""
+        painter.setFont(QFont("Monospace", 9))
+        line_height = painter.fontMetrics().height()
+        width = max(painter.fontMetrics().horizontalAdvance(line) for line in self.hud_lines) + 16
+        hud_rect = QRect(10, 45, width, line_height * len(self.hud_lines) + 10)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(QBrush(QColor(0, 0, 0, 180)))
+        painter.drawRoundedRect(hud_rect, 6, 6)
+        painter.setPen(QColor(255, 255, 255))
+        for i, line in enumerate(self.hud_lines):
+            painter.drawText(hud_rect.left() + 8, hud_rect.top() + 5 + line_height * (i + 1) - 3, line)
     
     def mousePressEvent(self, event):
         """Handle mouse press events"""
@@ -658,7 +1466,7 @@ class EnhancedBlurWindow(QMainWindow):
         """Check if position is in draggable area"""
         margin = self.resize_margin
         # Exclude status label area from dragging
-        status_area = QRect(5, 5, 210, 40)
+        status_area = QRect(5, 5, 270, 40)
         if status_area.contains(pos):
             return False
         return (margin < pos.x() < self.width() - margin and 
@@ -719,66 +1527,95 @@ class EnhancedBlurWindow(QMainWindow):
     
     def update_processor_capture_rect(self):
         """Update processor's capture rectangle"""
-        if self.processor:
+        if self.service is not None:
+            self.service.update_layout()
+        elif self.processor:
             # Capture entire window area (no border offset)
             self.processor.set_capture_area(self.x(), self.y(), self.width(), self.height())
     
-    def update_frame(self, processed_frame):
+    def receive_frame(self):
+        """Take the newest overlay from the processor (skipped ones were dropped there)"""
+        overlay_frame = self.processor.take_overlay()
+        if overlay_frame is not None:
+            self.update_frame(overlay_frame)
+    
+    def update_frame(self, overlay_frame: OverlayFrame):
         """Update window with new processed frame"""
-        if processed_frame is not None:
-            # Check if the frame has the correct dimensions
-            if len(processed_frame.shape) != 3:
-                print(f"DEBUG: Invalid frame shape: {processed_frame.shape}, size: {processed_frame.size}, type: {type(processed_frame)}")
-                self.current_pixmap = None
-                self.update()
-                return
-                
-            # Convert RGBA numpy array to QImage with transparency
-            height, width, channels = processed_frame.shape
-            
-            # Ensure we have 4 channels (RGBA)
-            if channels != 4:
-                print(f"Invalid channel count: {channels}, expected 4 (RGBA)")
-                self.current_pixmap = None
-                self.update()
-                return
-                
-            bytes_per_line = channels * width
-            
-            # Ensure the array is contiguous
-            processed_frame_contiguous = np.ascontiguousarray(processed_frame)
-            
-            # Create QImage from RGBA data
-            q_image = QImage(processed_frame_contiguous.data.tobytes(),
-                           width, height, bytes_per_line, QImage.Format.Format_RGBA8888)
-            
-            # Convert to QPixmap and scale to window size
-            self.current_pixmap = QPixmap.fromImage(q_image).scaled(
-                self.size(), Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation)
+        patches = overlay_frame.patches
+        if "first_blur" not in startup_timer.marks:
+            startup_timer.mark("first_overlay")
+            if patches:
+                startup_timer.mark("first_blur")
+        if self.gl_view is not None:
+            # Only the OpenGL view repaints; it uploads the patches itself
+            self.gl_view.show_patches(patches, overlay_frame.shape)
+            if patches:
+                self.processor.telemetry.count("displayed")
+                if not self.isVisible():
+                    self.show()
+            return
+        if patches:
+            convert_start = time.perf_counter()
+            self.current_patches = [(patch, patch_image(patch)) for patch in patches]
+            self.frame_shape = overlay_frame.shape
+            self.processor.telemetry.record("display", time.perf_counter() - convert_start)
+            self.processor.telemetry.count("displayed")
             
             # Make window visible
             if not self.isVisible():
                 self.show()
         else:
             # No face detected - make transparent
-            self.current_pixmap = None
+            self.current_patches = []
         
         # Trigger repaint
         self.update()
     
     def update_status_text(self, status: str):
         """Update status text"""
+        self.status_text = status
         size_text = f" • {self.width()}×{self.height()}"
         self.status_label.setText(f"{status}{size_text}")
     
     def update_status(self):
         """Periodic status update"""
         if hasattr(self, 'processor') and self.processor:
-            # This will be updated by processor signals
-            pass
+            # The status text comes from processor signals; refresh the HUD here
+            if self.show_hud:
+                self.hud_lines = self.format_hud(self.processor.telemetry.snapshot())
+                self.update()
         else:
             self.status_label.setText("Initializing...")
     
+    def format_hud(self, snapshot: dict) -> List[str]:
+        """Telemetry snapshot as short HUD lines"""
+        rates, gauges, stages = snapshot["rates"], snapshot["gauges"], snapshot["stages"]
+        
+        def p50_p95(stage):
+            stats = stages.get(stage)
+            if not stats or "p50" not in stats:
+                return "-"
+            return f"{stats['p50']:.1f}/{stats['p95']:.1f}"
+        
+        lines = [
+            f"capture {rates.get('captured', 0):5.1f} fps  display {rates.get('displayed', 0):5.1f} fps",
+            f"dropped {gauges.get('detect_queue_dropped', 0)}/{gauges.get('compose_queue_dropped', 0)}"
+            f"/{gauges.get('display_dropped', 0)}"
+            f"  queues {gauges.get('detect_queue_depth', 0)}/{gauges.get('compose_queue_depth', 0)}"
+            f"  faces {gauges.get('faces', len(self.processor.tracked_faces))}",
+            f"latency {p50_p95('latency')} ms  face age {p50_p95('face_age')} ms",
+            f"detect {p50_p95('detected')}  track {p50_p95('tracked')}  compose {p50_p95('compose')} ms",
+        ]
+        if snapshot["rss_bytes"] is not None:
+            lines.append(f"RSS {snapshot['rss_bytes'] / (1 << 20):.0f} MB")
+        return lines
+    
+    def mouseDoubleClickEvent(self, event):
+        """Toggle the telemetry HUD"""
+        self.show_hud = not self.show_hud
+        self.update_status()
+        self.update()
+    
 
     
     def resizeEvent(self, event):
@@ -786,7 +1623,11 @@ class EnhancedBlurWindow(QMainWindow):
         super().resizeEvent(event)
         if hasattr(self, 'status_label'):
             # Keep status label in top-left corner
-            self.status_label.setGeometry(10, 10, 200, 30)
+            self.status_label.setGeometry(10, 10, 260, 30)
+        if self.gl_view is not None:
+            self.gl_view.setGeometry(self.rect())
+            if self.status_text is not None:
+                self.update_status_text(self.status_text)  # Statuses only arrive on change - refresh the size
         
         # CRITICAL: Update capture area immediately on any resize
         if hasattr(self, 'processor') and self.processor:
@@ -800,42 +1641,234 @@ class EnhancedBlurWindow(QMainWindow):
     
     def closeEvent(self, event):
         """Handle window close event"""
-        if self.processor:
+        if self.service is not None:
+            self.service.remove_window(self)  # Stops the processor with the last window
+        elif self.processor:
             self.processor.stop()
         if hasattr(self, 'status_timer'):
             self.status_timer.stop()
         event.accept()
 
 
+class MonitorOverlay(EnhancedBlurWindow):
+    """Click-through overlay covering one whole monitor (desktop mode)"""
+    
+    def __init__(self, reference_encoding: Union[np.ndarray, FaceGallery], monitor: dict,
+                 service: "SharedBlurService", show_hud: bool = False, renderer: str = "qpainter"):
+        self.monitor = monitor  # mss-style area: left, top, width, height
+        super().__init__(reference_encoding, show_hud=show_hud, service=service, renderer=renderer)
+    
+    def setup_ui(self):
+        """Frameless, input-transparent and sized to the monitor"""
+        super().setup_ui()
+        self.setWindowFlags(self.windowFlags() | Qt.WindowType.WindowTransparentForInput | Qt.WindowType.Tool)
+        self.setGeometry(self.monitor["left"], self.monitor["top"], self.monitor["width"], self.monitor["height"])
+        self.status_label.hide()
+    
+    def paintEvent(self, event):
+        """Paint only the blurred faces and the HUD - no border on a full-screen overlay"""
+        painter = QPainter(self)
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_Clear)
+        painter.fillRect(self.rect(), QColor(0, 0, 0, 0))
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceOver)
+        if self.current_patches:
+            self.draw_patches(painter)
+        if self.show_hud and self.hud_lines:
+            self.draw_hud(painter)
+
+
+class SharedBlurService(QObject):
+    """One capture and detection pass shared by several overlay windows
+    
+    The processor captures the windows' rectangles inside their bounding box (where
+    windows overlap, once) and only searches those, so the cost follows the screen
+    area covered rather than the number of windows. Each window gets the face patches
+    that fall inside it, in its own coordinates.
+    """
+    
+    def __init__(self, reference: Union[np.ndarray, FaceGallery], capture_factory: Optional[Callable] = None,
+                 configure: Optional[Callable[[BlurProcessor], None]] = None):
+        super().__init__()
+        self.processor = BlurProcessor(reference)
+        if capture_factory is not None:
+            self.processor.capture_factory = capture_factory
+        self.processor.frame_ready.connect(self.receive_frame)
+        self.configure = configure  # Applies the command line options when the processor starts
+        self.windows = []
+    
+    def add_window(self, window: "EnhancedBlurWindow"):
+        """Start serving a window, starting the processor with the first one"""
+        self.windows.append(window)
+        self.update_layout()
+        self.update_renderer_masks()
+        if not self.processor.isRunning():
+            # Sample the screen at the display refresh rate
+            refresh_rate = window.screen().refreshRate() if window.screen() else 0
+            if refresh_rate > 0:
+                self.processor.scheduler.target_fps = refresh_rate
+            if self.configure is not None:
+                self.configure(self.processor)  # After the refresh rate, so --target-fps wins
+            self.processor.start()
+    
+    def remove_window(self, window: "EnhancedBlurWindow"):
+        """Stop serving a window, stopping the processor with the last one"""
+        if window in self.windows:
+            self.windows.remove(window)
+        if self.windows:
+            self.update_layout()
+            self.update_renderer_masks()
+        else:
+            self.processor.stop()
+    
+    def update_renderer_masks(self):
+        """Leave the masks to the renderer only when every window draws with OpenGL
+        
+        The patches are shared by all windows, so one QPainter window needs them all
+        to carry their masks (the OpenGL views draw those as they are).
+        """
+        self.processor.renderer_masks = all(window.gl_view is not None for window in self.windows)
+    
+    def update_layout(self):
+        """Capture the bounding box of all windows, grabbing and searching only the windows"""
+        if not self.windows:
+            return
+        rects = [(w.y(), w.x() + w.width(), w.y() + w.height(), w.x()) for w in self.windows]
+        top, left = min(r[0] for r in rects), min(r[3] for r in rects)
+        width, height = max(r[1] for r in rects) - left, max(r[2] for r in rects) - top
+        regions = merge_regions([(t - top, r - left, b - top, l - left) for t, r, b, l in rects])
+        if regions == [(0, width, height, 0)]:
+            regions = None  # The windows fill their bounding box
+        self.processor.set_capture_area(left, top, width, height, regions)
+    
+    def receive_frame(self):
+        """Take the newest overlay from the processor and route it"""
+        overlay_frame = self.processor.take_overlay()
+        if overlay_frame is not None:
+            self.route_frame(overlay_frame)
+    
+    def route_frame(self, overlay_frame: OverlayFrame):
+        """Hand every window the patches inside it"""
+        area = overlay_frame.area
+        if area is not None:
+            # Frame pixels per screen pixel: above 1 for a high-DPI capture in physical pixels
+            scale_y = overlay_frame.shape[0] / area["height"]
+            scale_x = overlay_frame.shape[1] / area["width"]
+        for window in self.windows:
+            if area is None:
+                window.update_frame(overlay_frame)
+                continue
+            # Window position in frame coordinates, where it is now
+            top, left = round((window.y() - area["top"]) * scale_y), round((window.x() - area["left"]) * scale_x)
+            height, width = round(window.height() * scale_y), round(window.width() * scale_x)
+            patches = route_patches(overlay_frame.patches, (top, left + width, top + height, left))
+            window.update_frame(OverlayFrame(patches or None, (height, width),
+                                             overlay_frame.frame_id, overlay_frame.timestamps))
+
+
 class FaceBlurApplication:
     """Main application class"""
     
-    def __init__(self):
+    def __init__(self, store_path: str = DEFAULT_STORE_PATH, use_store: bool = False,
+                 qt_args: Optional[List[str]] = None, show_hud: bool = False,
+                 telemetry_log: Optional[str] = None, telemetry_interval: float = 5.0,
+                 metrics_port: Optional[int] = None, target_fps: Optional[float] = None,
+                 idle_fps: float = 5.0, adaptive_quality: bool = True, scheduler_log: Optional[str] = None,
+                 blur_engine: str = "downscale", detection_model: str = "hog",
+                 detector_model_dir: Optional[str] = None, capture_source: str = "screen",
+                 window_count: int = 1, desktop: bool = False, detection_workers: Optional[int] = None,
+                 renderer: str = "qpainter", startup_report: Optional[str] = None,
+                 scheduler_verbose: bool = False):
         self.app = None
         self.main_window = None
+        self.windows = []
+        self.window_count = window_count  # Overlay windows; more than one share a SharedBlurService
+        self.desktop = desktop  # One click-through overlay per monitor, scanned in tiles
+        self.detection_workers = detection_workers  # None: 0, or all cores but one in desktop mode
+        self.renderer = renderer  # "qpainter" or "opengl"
+        self.service = None
+        self.store = ReferenceStore(store_path)
+        self.use_store = use_store  # Start from the saved references and skip the dialog
+        self.qt_args = qt_args if qt_args is not None else sys.argv
+        
+        # Telemetry surfaces
+        self.show_hud = show_hud
+        self.telemetry_log = telemetry_log  # JSON lines file, written every telemetry_interval seconds
+        self.telemetry_interval = telemetry_interval
+        self.metrics_port = metrics_port  # Local Prometheus endpoint
+        self.exporters = []
+        
+        # Frame scheduling and adaptive quality
+        self.target_fps = target_fps  # None keeps the display refresh rate
+        self.idle_fps = idle_fps
+        self.adaptive_quality = adaptive_quality
+        self.scheduler_log = scheduler_log  # JSON lines file of scheduler/quality decisions
+        self.scheduler_verbose = scheduler_verbose  # Also print every decision
+        self.blur_engine = blur_engine
+        self.detection_model = detection_model
+        self.detector_model_dir = detector_model_dir
+        self.capture_source = capture_source  # "screen", "synthetic[:image]" or a video file
+        
+        # Startup: the face models load and warm up on a background thread while the
+        # selection dialog is open; startup_report ("" prints it, a path also writes
+        # JSON) is produced once the first blurred frame reaches the window, or at exit
+        self.warmup = None
+        self.startup_report = startup_report
+        self.startup_reported = False
     
     def run(self):
         """Run the complete application flow"""
-        # Start directly with face selection
-        face_selector = FaceSelector()
-        reference_encoding = face_selector.select_face()
+        self.warmup = ModelWarmup(startup_timer, self.detection_model, self.detector_model_dir)
+        self.warmup.start()
+        
+        reference = None
+        if self.use_store:
+            if self.store.exists():
+                self.warmup.wait()  # dlib's models are shared and must not be used from two threads at once
+                reference = self.store.load()  # Re-encodes source images that changed
+                print(f"Loaded {len(reference)} reference encoding(s) from {self.store.meta_path}")
+            else:
+                print(f"No saved references at {self.store.meta_path}, opening face selection")
         
-        if reference_encoding is None:
-            messagebox.showinfo("Cancelled", "Face selection cancelled. Application will exit.")
-            return
+        if reference is None:
+            # Start directly with face selection
+            face_selector = FaceSelector(self.warmup)
+            reference = face_selector.select_face()
+            
+            if reference is None:
+                messagebox.showinfo("Cancelled", "Face selection cancelled. Application will exit.")
+                return
+            
+            # Remember the selection so the next launch can skip the dialog
+            try:
+                self.store.set_identity("target", [reference], face_selector.selected_path)
+                self.store.save()
+            except OSError as e:
+                print(f"Could not save reference store: {e}")
+        startup_timer.mark("reference_ready")
+        self.warmup.wait()  # Normally done already - the dialog waited for it
         
         # Create PyQt application
-        self.app = QApplication(sys.argv)
+        self.app = QApplication(self.qt_args)
         self.app.setQuitOnLastWindowClosed(True)
         
         # Create and show main window
-        self.main_window = EnhancedBlurWindow(reference_encoding)
-        self.main_window.show()
+        self.windows = self.create_windows(reference, source_factory(self.capture_source))
+        self.main_window = self.windows[0]
+        for window in self.windows:
+            window.show()
+        startup_timer.mark("windows_shown")
+        if self.startup_report is not None:
+            self.main_window.processor.frame_ready.connect(self.report_startup)
+        self.start_exporters(self.main_window.processor.telemetry)
         
         # Handle application shutdown
         def cleanup():
-            if self.main_window:
-                self.main_window.close()
+            self.report_startup(final=True)
+            for exporter in self.exporters:
+                exporter.stop()
+            self.exporters = []
+            for window in self.windows:
+                window.close()
         
         self.app.aboutToQuit.connect(cleanup)
         
@@ -845,12 +1878,141 @@ class FaceBlurApplication:
         except KeyboardInterrupt:
             cleanup()
             sys.exit(0)
+    
+    def report_startup(self, final: bool = False):
+        """Print the startup report once the first blurred frame arrived (or at exit when none did)"""
+        if self.startup_report is None or self.startup_reported:
+            return
+        if "first_blur" not in startup_timer.marks and not final:
+            return
+        self.startup_reported = True
+        self.main_window.processor.frame_ready.disconnect(self.report_startup)
+        print(startup_timer.format())
+        if self.startup_report:
+            try:
+                startup_timer.write(self.startup_report)
+            except OSError as e:
+                print(f"Could not write startup report: {e}")
+    
+    def create_windows(self, reference, capture_factory: Callable) -> List[EnhancedBlurWindow]:
+        """The overlay window(s): one per monitor in desktop mode, otherwise window_count"""
+        if self.desktop:
+            monitors = screen_monitors()
+            if not monitors:
+                # No mss display (e.g. a replayed source) - cover Qt's screens instead
+                monitors = [{"left": g.x(), "top": g.y(), "width": g.width(), "height": g.height()}
+                            for g in (screen.geometry() for screen in self.app.screens())]
+            self.service = SharedBlurService(reference, capture_factory, self.configure_processor)
+            self.service.processor.tile_scheduler = TileScheduler()
+            windows = [MonitorOverlay(reference, monitor, self.service, self.show_hud, self.renderer)
+                       for monitor in monitors]
+            print(f"Desktop mode: {len(monitors)} monitor(s), "
+                  f"{self.service.processor.detection_workers} detection worker(s)")
+            return windows
+        
+        if self.window_count > 1:
+            self.service = SharedBlurService(reference, capture_factory, self.configure_processor)
+            windows = []
+            for index in range(self.window_count):
+                window = EnhancedBlurWindow(reference, show_hud=self.show_hud, service=self.service,
+                                            renderer=self.renderer)
+                window.move(100 + 80 * index, 100 + 80 * index)  # Cascade so every window can be grabbed
+                windows.append(window)
+            self.service.update_layout()
+            return windows
+        
+        window = EnhancedBlurWindow(reference, show_hud=self.show_hud, capture_factory=capture_factory,
+                                    renderer=self.renderer, configure=self.configure_processor)
+        return [window]
+    
+    def configure_processor(self, processor: BlurProcessor):
+        """Apply the frame rate, quality, detector and blur options to a processor"""
+        if self.target_fps:
+            processor.scheduler.target_fps = self.target_fps
+        processor.scheduler.idle_fps = self.idle_fps
+        processor.adaptive_quality = self.adaptive_quality
+        processor.decision_log.path = self.scheduler_log
+        processor.decision_log.echo = self.scheduler_verbose
+        processor.blur_engine = self.blur_engine
+        processor.detection_model = self.detection_model
+        processor.detector_model_dir = self.detector_model_dir
+        detector = self.warmup.take_detector(self.detection_model) if self.warmup is not None else None
+        if detector is not None:
+            processor.detector = detector  # Warmed up on a dummy frame while the dialog was open
+        if self.detection_workers is not None:
+            processor.detection_workers = self.detection_workers
+        elif self.desktop:
+            processor.detection_workers = max(0, (os.cpu_count() or 1) - 1)
+    
+    def start_exporters(self, telemetry: Telemetry):
+        """Start the JSON lines and Prometheus exporters that were asked for"""
+        if self.telemetry_log:
+            exporter = JsonLinesExporter(telemetry, self.telemetry_log, self.telemetry_interval)
+            exporter.start()
+            self.exporters.append(exporter)
+        if self.metrics_port is not None:
+            server = MetricsServer(telemetry, self.metrics_port)
+            try:
+                server.start()
+            except OSError as e:
+                print(f"Could not start metrics endpoint on port {self.metrics_port}: {e}")
+                return
+            print(f"Serving metrics on http://{server.host}:{server.port}/metrics")
+            self.exporters.append(server)
 
 
 def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="Selective real-time face blur overlay")
+    parser.add_argument("--use-store", action="store_true",
+                        help="start from the saved reference encodings and skip the selection dialog")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH,
+                        help="reference store path (default: %(default)s)")
+    parser.add_argument("--hud", action="store_true",
+                        help="show the telemetry HUD (double-click the window to toggle)")
+    parser.add_argument("--telemetry-log", help="append telemetry snapshots to this JSON lines file")
+    parser.add_argument("--telemetry-interval", type=float, default=5.0,
+                        help="seconds between telemetry log lines (default: %(default)s)")
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve Prometheus-style metrics on 127.0.0.1:PORT/metrics")
+    parser.add_argument("--target-fps", type=float,
+                        help="frame rate to aim for (default: the display refresh rate)")
+    parser.add_argument("--idle-fps", type=float, default=5.0,
+                        help="frame rate while no face has been seen for a while (default: %(default)s)")
+    parser.add_argument("--no-adaptive", action="store_true",
+                        help="keep detection scale, upsampling and interval fixed")
+    parser.add_argument("--scheduler-log", help="append scheduler and quality decisions to this JSON lines file")
+    parser.add_argument("--scheduler-verbose", action="store_true",
+                        help="print scheduler and quality decisions to the console")
+    parser.add_argument("--blur-engine", choices=ENGINES, default="downscale",
+                        help="how faces are hidden (default: %(default)s; gaussian is the original full blur)")
+    parser.add_argument("--detector", choices=DETECTORS, default="hog",
+                        help="face detector backend (default: %(default)s)")
+    parser.add_argument("--model-dir", help="directory with the ssd/yunet/haar model files "
+                                            "(default: ~/.face_blur/models)")
+    parser.add_argument("--source", default="screen",
+                        help="capture source: screen, synthetic, synthetic:IMAGE (moving image on a test "
+                             "background) or a video file to replay (default: %(default)s)")
+    parser.add_argument("--windows", type=int, default=1,
+                        help="open this many overlay windows sharing one capture and detection pass")
+    parser.add_argument("--desktop", action="store_true",
+                        help="cover every monitor with a click-through overlay, scanned in tiles")
+    parser.add_argument("--detection-workers", type=int,
+                        help="detection worker processes (default: 0, all cores but one with --desktop)")
+    parser.add_argument("--renderer", choices=("qpainter", "opengl"), default="qpainter",
+                        help="draw the overlay with QPainter or OpenGL (default: %(default)s)")
+    parser.add_argument("--startup-report", nargs="?", const="", metavar="FILE",
+                        help="print import and startup milestone times once the first overlay frame "
+                             "arrives, and write them to FILE as JSON when given")
+    args, qt_args = parser.parse_known_args()
+    
     try:
-        app = FaceBlurApplication()
+        app = FaceBlurApplication(args.store, args.use_store, sys.argv[:1] + qt_args, args.hud,
+                                  args.telemetry_log, args.telemetry_interval, args.metrics_port,
+                                  args.target_fps, args.idle_fps, not args.no_adaptive, args.scheduler_log,
+                                  args.blur_engine, args.detector, args.model_dir,
+                                  args.source, max(1, args.windows), args.desktop, args.detection_workers,
+                                  args.renderer, args.startup_report, args.scheduler_verbose)
         app.run()
     except KeyboardInterrupt:
         print("\nApplication interrupted by user")
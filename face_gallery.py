@@ -0,0 +1,135 @@
+"""
+Reference face gallery
+Holds every reference encoding in one contiguous float32 matrix with per-identity
+labels and tolerances, and matches all detected faces against all references in a
+single batched distance computation.
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+ENCODING_SIZE = 128  # dlib face descriptor length
+
+# (label, distance) of the best reference within tolerance, or None
+GalleryMatch = Optional[Tuple[str, float]]
+
+
+class FaceGallery:
+    """Reference faces to blur, grouped by identity
+
+    Matching computes exact distances to every reference with one matrix product. A
+    cosine top-k prefilter and a KD-tree were tried and lost to it at every size
+    benchmarks/bench_gallery.py measures (the KD-tree badly, 128 dimensions are too many).
+    """
+
+    def __init__(self, default_tolerance: float = 0.4):
+        self.default_tolerance = default_tolerance
+
+        self._encodings = np.empty((0, ENCODING_SIZE), dtype=np.float32)
+        self._pending: List[np.ndarray] = []  # Rows added since the matrix was last stacked
+        self.labels: List[str] = []  # Identity of each row
+        self.tolerances: Dict[str, float] = {}  # Identity -> match tolerance
+
+        # Derived arrays, rebuilt lazily after changes
+        self._row_tolerances = None
+        self._squared_norms = None
+
+    @classmethod
+    def from_encoding(cls, encoding: np.ndarray, label: str = "target",
+                      tolerance: float = 0.4) -> "FaceGallery":
+        """Gallery with a single reference face"""
+        gallery = cls(default_tolerance=tolerance)
+        gallery.add(label, [encoding])
+        return gallery
+
+    @classmethod
+    def from_matrix(cls, encodings: np.ndarray, labels: Sequence[str], tolerances: Optional[Dict[str, float]] = None,
+                    default_tolerance: float = 0.4) -> "FaceGallery":
+        """Gallery on an existing (references, 128) float32 matrix, e.g. a memory-mapped store, without copying it
+
+        Adding or removing references later copies the matrix into memory.
+        """
+        gallery = cls(default_tolerance=default_tolerance)
+        gallery.encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        gallery.labels = list(labels)
+        for label in gallery.labels:
+            if label not in gallery.tolerances:
+                gallery.tolerances[label] = (tolerances or {}).get(label, default_tolerance)
+        return gallery
+
+    @property
+    def encodings(self) -> np.ndarray:
+        """The (references, 128) float32 matrix; rows added since the last use are stacked in once"""
+        if self._pending:
+            self._encodings = np.ascontiguousarray(np.vstack([self._encodings] + self._pending))
+            self._pending = []
+        return self._encodings
+
+    @encodings.setter
+    def encodings(self, encodings: np.ndarray):
+        self._encodings = encodings
+        self._pending = []
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def identities(self) -> List[str]:
+        """Identity labels in the order they were added"""
+        return list(dict.fromkeys(self.labels))
+
+    def add(self, label: str, encodings: Sequence[np.ndarray], tolerance: Optional[float] = None):
+        """Add one or more reference encodings for an identity"""
+        rows = np.array(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)  # A copy the caller can't change
+        self._pending.append(rows)  # Stacked on first use, so adding one at a time stays linear
+        self.labels.extend([label] * len(rows))
+        if tolerance is not None or label not in self.tolerances:
+            self.tolerances[label] = self.default_tolerance if tolerance is None else tolerance
+        self._invalidate()
+
+    def remove(self, label: str):
+        """Drop every reference of an identity"""
+        keep = np.array([row_label != label for row_label in self.labels], dtype=bool)
+        self.encodings = np.ascontiguousarray(self.encodings[keep])
+        self.labels = [row_label for row_label in self.labels if row_label != label]
+        self.tolerances.pop(label, None)
+        self._invalidate()
+
+    def set_tolerance(self, label: str, tolerance: float):
+        self.tolerances[label] = tolerance
+        self._row_tolerances = None
+
+    def distances(self, face_encodings: Sequence[np.ndarray]) -> np.ndarray:
+        """Euclidean distances, shape (faces, references)"""
+        faces = np.asarray(face_encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE)
+        self._build()
+        # |a - b|^2 = |a|^2 + |b|^2 - 2 a.b, one matrix product for all pairs
+        squared = (np.einsum("ij,ij->i", faces, faces)[:, None] + self._squared_norms[None, :]
+                   - 2.0 * faces @ self.encodings.T)
+        return np.sqrt(np.maximum(squared, 0.0))
+
+    def match(self, face_encodings: Sequence[np.ndarray]) -> List[GalleryMatch]:
+        """Best matching identity for every face, or None when no reference is within tolerance"""
+        if len(face_encodings) == 0:
+            return []
+        if len(self) == 0:
+            return [None] * len(face_encodings)
+        distances = self.distances(face_encodings)
+
+        # Closest reference among those inside their identity's tolerance
+        masked = np.where(distances <= self._row_tolerances[None, :], distances, np.inf)
+        best = masked.argmin(axis=1)
+        best_distances = masked[np.arange(len(best)), best]
+        return [(self.labels[int(row)], float(distance)) if np.isfinite(distance) else None
+                for row, distance in zip(best, best_distances)]
+
+    def _build(self):
+        """Precompute norms and per-row tolerances"""
+        if self._row_tolerances is None:
+            self._row_tolerances = np.array([self.tolerances[label] for label in self.labels],
+                                            dtype=np.float32)
+        if self._squared_norms is None:
+            self._squared_norms = np.einsum("ij,ij->i", self.encodings, self.encodings)
+
+    def _invalidate(self):
+        self._row_tolerances = None
+        self._squared_norms = None
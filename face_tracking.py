@@ -0,0 +1,461 @@
+"""
+Face tracking helpers
+Cheap CPU trackers that follow matched faces between full detection passes, so the
+expensive HOG detection and dlib encoding only have to run every few frames, a
+per-face Kalman motion model that smooths the boxes and predicts where each face will
+be, and a track manager that caches each face's match verdict so it is not re-encoded
+every pass.
+"""
+
+import cv2
+import numpy as np
+from collections import OrderedDict
+from typing import Optional, List, Tuple
+
+# Face boxes use the face_recognition convention: (top, right, bottom, left)
+FaceLocation = Tuple[int, int, int, int]
+
+TRACKER_METHODS = ("flow", "kcf", "csrt")
+
+_warned_methods = set()  # Unavailable tracker methods we already reported
+
+
+def _create_opencv_tracker(method: str):
+    """Create an OpenCV KCF/CSRT tracker, or None if this OpenCV build lacks it"""
+    factory_name = "TrackerKCF_create" if method == "kcf" else "TrackerCSRT_create"
+    # Newer builds only ship these trackers in the contrib package under cv2.legacy
+    for namespace in (cv2, getattr(cv2, "legacy", None)):
+        factory = getattr(namespace, factory_name, None) if namespace is not None else None
+        if factory is not None:
+            return factory()
+    return None
+
+
+class FaceTracker:
+    """Follow a single face box between detection frames
+
+    The default "flow" method tracks corner features inside the face box with
+    pyramidal Lucas-Kanade optical flow and a forward-backward consistency check.
+    Its confidence is the fraction of features that survived since the last detection.
+    "kcf" and "csrt" use OpenCV's correlation trackers when available (confidence is
+    then 1.0 or 0.0) and fall back to optical flow otherwise.
+    """
+
+    def __init__(self, method: str = "flow"):
+        if method not in TRACKER_METHODS:
+            raise ValueError(f"Unknown tracker method: {method}")
+        self.method = method
+        self.face_location = None
+        self.confidence = 0.0
+        self.lost = True
+
+        # Optical flow state
+        self.prev_gray = None
+        self.points = None
+        self.initial_point_count = 0
+        self.max_points = 40  # Feature points sampled inside the face box
+        self.min_points = 6  # Fewer surviving points than this means the face is lost
+        self.max_fb_error = 1.0  # Forward-backward error in pixels to accept a point
+
+        # OpenCV tracker state
+        self.cv_tracker = None
+        if method != "flow":
+            self.cv_tracker = _create_opencv_tracker(method)
+            if self.cv_tracker is None:
+                if method not in _warned_methods:
+                    print(f"Tracker '{method}' not available in this OpenCV build, using optical flow")
+                    _warned_methods.add(method)
+                self.method = "flow"
+
+    def init(self, img_rgb: np.ndarray, face_location: FaceLocation,
+             gray: Optional[np.ndarray] = None) -> bool:
+        """Start tracking a face box on the given frame"""
+        self.face_location = tuple(int(v) for v in face_location)
+        self.confidence = 1.0
+        self.lost = False
+
+        if self.method != "flow":
+            top, right, bottom, left = self.face_location
+            self.cv_tracker.init(img_rgb, (left, top, right - left, bottom - top))
+            return True
+
+        if gray is None:
+            gray = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2GRAY)
+        self.prev_gray = gray
+        self.points = self._sample_points(gray, self.face_location)
+        self.initial_point_count = 0 if self.points is None else len(self.points)
+        if self.initial_point_count < self.min_points:
+            self.lost = True
+            self.confidence = 0.0
+        return not self.lost
+
+    def update(self, img_rgb: np.ndarray,
+               gray: Optional[np.ndarray] = None) -> Tuple[Optional[FaceLocation], float]:
+        """Advance the tracker by one frame
+
+        Returns:
+            (face_location, confidence): face_location is None once the face is lost
+        """
+        if self.lost:
+            return None, 0.0
+
+        if self.method != "flow":
+            ok, (x, y, w, h) = self.cv_tracker.update(img_rgb)
+            if not ok:
+                return self._mark_lost()
+            self.face_location = self._clip((int(y), int(x + w), int(y + h), int(x)), img_rgb.shape)
+            self.confidence = 1.0
+            return self.face_location, self.confidence
+
+        if gray is None:
+            gray = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2GRAY)
+        if self.prev_gray is None or self.prev_gray.shape != gray.shape:
+            return self._mark_lost()
+
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.points, None)
+        back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, new_points, None)
+        fb_error = np.linalg.norm((self.points - back_points).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < self.max_fb_error)
+
+        if good.sum() < self.min_points:
+            return self._mark_lost()
+
+        old_good = self.points.reshape(-1, 2)[good]
+        new_good = new_points.reshape(-1, 2)[good]
+
+        # Translate by the median displacement and rescale by the median spread ratio
+        dx, dy = np.median(new_good - old_good, axis=0)
+        old_spread = np.linalg.norm(old_good - old_good.mean(axis=0), axis=1)
+        new_spread = np.linalg.norm(new_good - new_good.mean(axis=0), axis=1)
+        valid = old_spread > 1e-3
+        scale = float(np.median(new_spread[valid] / old_spread[valid])) if valid.any() else 1.0
+
+        top, right, bottom, left = self.face_location
+        center_x = (left + right) / 2 + dx
+        center_y = (top + bottom) / 2 + dy
+        half_w = (right - left) * scale / 2
+        half_h = (bottom - top) * scale / 2
+        self.face_location = self._clip((int(center_y - half_h), int(center_x + half_w),
+                                         int(center_y + half_h), int(center_x - half_w)), gray.shape)
+
+        self.prev_gray = gray
+        self.points = new_good.reshape(-1, 1, 2).astype(np.float32)
+        self.confidence = len(new_good) / max(1, self.initial_point_count)
+        return self.face_location, self.confidence
+
+    def _sample_points(self, gray: np.ndarray, face_location: FaceLocation) -> Optional[np.ndarray]:
+        """Pick trackable corner features inside the face box"""
+        top, right, bottom, left = face_location
+        top, left = max(0, top), max(0, left)
+        # Search the box itself rather than masking the whole frame
+        points = cv2.goodFeaturesToTrack(gray[top:bottom, left:right], self.max_points, 0.01, 5)
+        if points is not None:
+            points += np.array([left, top], dtype=np.float32)
+        return points
+
+    def _mark_lost(self) -> Tuple[None, float]:
+        self.lost = True
+        self.confidence = 0.0
+        return None, 0.0
+
+    @staticmethod
+    def _clip(face_location: FaceLocation, shape) -> FaceLocation:
+        """Clamp a face box to the frame bounds"""
+        top, right, bottom, left = face_location
+        height, width = shape[:2]
+        return (max(0, top), min(width, right), min(height, bottom), max(0, left))
+
+
+def box_iou(a: FaceLocation, b: FaceLocation) -> float:
+    """Intersection over union of two (top, right, bottom, left) boxes"""
+    inter_h = min(a[2], b[2]) - max(a[0], b[0])
+    inter_w = min(a[1], b[1]) - max(a[3], b[3])
+    if inter_h <= 0 or inter_w <= 0:
+        return 0.0
+    intersection = inter_h * inter_w
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return intersection / float(area_a + area_b - intersection)
+
+
+def appearance_signature(gray: np.ndarray, face_location: FaceLocation, size: int = 16) -> Optional[np.ndarray]:
+    """Tiny normalized grayscale thumbnail of a face, used to notice appearance changes"""
+    top, right, bottom, left = face_location
+    patch = gray[max(0, top):bottom, max(0, left):right]
+    if patch.size == 0:
+        return None
+    thumb = cv2.resize(patch, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+    thumb -= thumb.mean()
+    norm = np.linalg.norm(thumb)
+    return thumb / norm if norm > 1e-6 else thumb
+
+
+class BoxKalmanFilter:
+    """Constant-velocity Kalman filter over one face box
+
+    The state is the box centre, its width and height (pixels) and the centre's
+    velocity (pixels per second). Measurements are timestamped, so the filter copes
+    with uneven frame intervals and can extrapolate the box to any later time, e.g.
+    to when the overlay will actually be on screen. Noise is relative to the face
+    size, so small and large faces are smoothed alike.
+    """
+
+    def __init__(self, face_location: FaceLocation, timestamp: float, acceleration_noise: float = 16.0,
+                 size_noise: float = 0.5, measurement_noise: float = 0.05, max_prediction: float = 0.25):
+        self.acceleration_noise = acceleration_noise  # Face sizes per second^2 the centre may accelerate
+        self.size_noise = size_noise  # Face sizes per second the box may grow or shrink
+        self.measurement_noise = measurement_noise  # Detector jitter as a fraction of the face size
+        self.max_prediction = max_prediction  # Seconds to extrapolate past the last measurement at most
+        self.reset(face_location, timestamp)
+
+    def reset(self, face_location: FaceLocation, timestamp: float):
+        """Start over at a box, at rest"""
+        self.state = np.zeros(6)  # centre x, centre y, width, height, velocity x, velocity y
+        self.state[:4] = self._measurement(face_location)
+        size = self._size()
+        self.covariance = np.diag([(self.measurement_noise * size) ** 2] * 4 + [size ** 2] * 2)
+        self.timestamp = timestamp
+
+    def update(self, face_location: FaceLocation, timestamp: float):
+        """Fold in a measured box seen at timestamp (seconds, any clock used consistently)"""
+        dt = max(0.0, timestamp - self.timestamp)
+        if dt > 4 * self.max_prediction:
+            self.reset(face_location, timestamp)  # Too long unseen - the old velocity means nothing
+            return
+        self._predict(dt)
+        self.timestamp = max(self.timestamp, timestamp)
+
+        size = self._size()
+        residual = self._measurement(face_location) - self.state[:4]
+        innovation = self.covariance[:4, :4] + np.eye(4) * (self.measurement_noise * size) ** 2
+        gain = self.covariance[:, :4] @ np.linalg.inv(innovation)
+        self.state += gain @ residual
+        self.covariance -= gain @ self.covariance[:4, :]
+
+    def location(self) -> FaceLocation:
+        """The filtered box at the last measurement"""
+        return self._box(self.state)
+
+    def predict(self, timestamp: float) -> FaceLocation:
+        """The box extrapolated to timestamp (at most max_prediction past the last measurement)"""
+        dt = min(max(0.0, timestamp - self.timestamp), self.max_prediction)
+        state = self.state.copy()
+        state[:2] += state[4:] * dt
+        return self._box(state)
+
+    def copy(self) -> "BoxKalmanFilter":
+        """Independent snapshot, safe to predict from on another thread"""
+        snapshot = BoxKalmanFilter.__new__(BoxKalmanFilter)
+        snapshot.__dict__.update(self.__dict__)
+        snapshot.state = self.state.copy()
+        snapshot.covariance = self.covariance.copy()
+        return snapshot
+
+    def _predict(self, dt: float):
+        if dt <= 0.0:
+            return
+        transition = np.eye(6)
+        transition[0, 4] = transition[1, 5] = dt
+        size = self._size()
+        # Piecewise white acceleration for the centre, random walk for the box size
+        acceleration = (self.acceleration_noise * size) ** 2
+        noise = np.zeros((6, 6))
+        for position, velocity in ((0, 4), (1, 5)):
+            noise[position, position] = acceleration * dt ** 4 / 4
+            noise[position, velocity] = noise[velocity, position] = acceleration * dt ** 3 / 2
+            noise[velocity, velocity] = acceleration * dt ** 2
+        noise[2, 2] = noise[3, 3] = (self.size_noise * size) ** 2 * dt
+        self.state = transition @ self.state
+        self.covariance = transition @ self.covariance @ transition.T + noise
+
+    def _size(self) -> float:
+        return max(1.0, float(self.state[2] + self.state[3]) / 2)
+
+    @staticmethod
+    def _measurement(face_location: FaceLocation) -> np.ndarray:
+        top, right, bottom, left = face_location
+        return np.array([(left + right) / 2, (top + bottom) / 2, right - left, bottom - top], dtype=np.float64)
+
+    @staticmethod
+    def _box(state: np.ndarray) -> FaceLocation:
+        center_x, center_y, width, height = state[:4]
+        return (int(round(center_y - height / 2)), int(round(center_x + width / 2)),
+                int(round(center_y + height / 2)), int(round(center_x - width / 2)))
+
+
+class FaceTrack:
+    """A face followed across frames together with its cached verification result"""
+
+    def __init__(self, track_id: int, face_location: FaceLocation, motion_options: Optional[dict] = None):
+        self.track_id = track_id
+        self.face_location = face_location  # Last measured box
+        self.motion = None  # BoxKalmanFilter, started by the first observation
+        self.motion_options = motion_options or {}  # BoxKalmanFilter noise settings
+        self.missed = 0  # Detection passes in a row without this face
+        self.last_seen = 0.0
+
+        # Cached verification
+        self.encoding = None
+        self.matched = False
+        self.label = None  # Gallery identity the face matched
+        self.distance = None
+        self.verified_at = None  # time.monotonic() of the last encoding
+        self.appearance = None  # Signature captured at verification time
+
+        # Tracker following the face between detection passes
+        self.tracker = None
+
+    def observe(self, face_location: FaceLocation, now: float, frame_time: Optional[float] = None,
+                measured: bool = True):
+        """Record a new position for this face
+
+        frame_time is when the frame was captured (defaults to now). measured=False
+        keeps the track alive without feeding the motion model, for a box that was
+        carried over rather than seen again.
+        """
+        timestamp = now if frame_time is None else frame_time
+        if self.motion is None:
+            self.motion = BoxKalmanFilter(face_location, timestamp, **self.motion_options)
+        elif measured:
+            self.motion.update(face_location, timestamp)
+        self.face_location = face_location
+        self.missed = 0
+        self.last_seen = now
+
+    def smoothed_location(self) -> FaceLocation:
+        """Filtered box at the last measurement, without the detector's jitter"""
+        return self.motion.location() if self.motion is not None else self.face_location
+
+    def predicted_location(self, timestamp: float) -> FaceLocation:
+        """Filtered box moved on to timestamp along the face's measured velocity"""
+        return self.motion.predict(timestamp) if self.motion is not None else self.face_location
+
+
+class TrackManager:
+    """Give each face a stable track ID and cache its match verdict and encoding
+
+    Detections are associated with existing tracks by IoU, falling back to centroid
+    distance for small or fast-moving faces. A track is only re-encoded when its
+    verdict is older than verify_ttl seconds or its appearance changed noticeably.
+    Tracks that disappear are kept for a few detection passes (so a one-frame miss
+    keeps the cached verdict) and evicted least-recently-seen first.
+    """
+
+    def __init__(self):
+        self.tracks = OrderedDict()  # track_id -> FaceTrack, least recently seen first
+        self.next_track_id = 1
+
+        self.iou_threshold = 0.3  # Minimum IoU to continue a track
+        self.max_centroid_shift = 0.5  # Fallback: centroid shift as a fraction of box size
+        self.verify_ttl = 2.0  # Seconds before a cached verdict is re-checked
+        self.min_appearance_similarity = 0.6  # Re-verify when the face thumbnail correlates less
+        self.max_missed = 10  # Detection passes a track survives without being seen
+        self.max_tracks = 32  # LRU capacity
+        self.motion_options = {}  # BoxKalmanFilter settings for new tracks (noise, max_prediction)
+
+        # Counters
+        self.encodings_computed = 0
+        self.encodings_reused = 0
+
+    def associate(self, face_locations: List[FaceLocation], now: float, frame_time: Optional[float] = None,
+                  measured: Optional[List[bool]] = None) -> List[FaceTrack]:
+        """Match detections to tracks, creating tracks for new faces
+
+        With frame_time (capture time of the frame) detections are compared with where
+        each track's motion model expects the face by then, so fast faces keep their
+        track. measured flags which boxes are real detections (default: all of them).
+
+        Returns:
+            List[FaceTrack]: one track per detection, in the same order
+        """
+        candidates = list(self.tracks.values())
+        expected = {track.track_id: track.face_location if frame_time is None else
+                    track.predicted_location(frame_time) for track in candidates}
+        assigned = [None] * len(face_locations)
+        used = set()
+
+        # Greedy IoU assignment, best overlaps first
+        pairs = []
+        for det_index, face_location in enumerate(face_locations):
+            for track in candidates:
+                iou = box_iou(face_location, expected[track.track_id])
+                if iou >= self.iou_threshold:
+                    pairs.append((iou, det_index, track.track_id))
+        for iou, det_index, track_id in sorted(pairs, reverse=True):
+            if assigned[det_index] is None and track_id not in used:
+                assigned[det_index] = self.tracks[track_id]
+                used.add(track_id)
+
+        # Centroid fallback for detections that overlap nothing
+        for det_index, face_location in enumerate(face_locations):
+            if assigned[det_index] is not None:
+                continue
+            best_track, best_shift = None, self.max_centroid_shift
+            for track in candidates:
+                if track.track_id in used:
+                    continue
+                shift = self._centroid_shift(face_location, expected[track.track_id])
+                if shift < best_shift:
+                    best_track, best_shift = track, shift
+            if best_track is not None:
+                assigned[det_index] = best_track
+                used.add(best_track.track_id)
+
+        for det_index, face_location in enumerate(face_locations):
+            track = assigned[det_index]
+            if track is None:
+                track = FaceTrack(self.next_track_id, face_location, self.motion_options)
+                self.next_track_id += 1
+                self.tracks[track.track_id] = track
+                used.add(track.track_id)
+            track.observe(face_location, now, frame_time, measured is None or measured[det_index])
+            self.tracks.move_to_end(track.track_id)
+            assigned[det_index] = track
+
+        # Age the tracks that were not seen and evict the stale ones
+        for track in candidates:
+            if track.track_id not in used:
+                track.missed += 1
+                track.tracker = None
+                if track.missed > self.max_missed:
+                    del self.tracks[track.track_id]
+        while len(self.tracks) > self.max_tracks:
+            self.tracks.popitem(last=False)
+
+        return assigned
+
+    def needs_verification(self, track: FaceTrack, gray: np.ndarray, now: float) -> bool:
+        """Whether the track's cached verdict has expired or its appearance changed"""
+        if track.verified_at is None or now - track.verified_at > self.verify_ttl:
+            return True
+        signature = appearance_signature(gray, track.face_location)
+        if signature is None or track.appearance is None:
+            return True
+        if float(np.sum(signature * track.appearance)) < self.min_appearance_similarity:
+            return True
+        self.encodings_reused += 1
+        return False
+
+    def record_verification(self, track: FaceTrack, encoding: np.ndarray, matched: bool,
+                            distance: Optional[float], gray: np.ndarray, now: float,
+                            label: Optional[str] = None):
+        """Cache a fresh verdict and encoding on the track"""
+        track.encoding = encoding
+        track.matched = bool(matched)
+        track.label = label
+        track.distance = None if distance is None else float(distance)
+        track.verified_at = now
+        track.appearance = appearance_signature(gray, track.face_location)
+        self.encodings_computed += 1
+
+    def clear(self):
+        """Forget every track (e.g. when the reference face changes)"""
+        self.tracks.clear()
+
+    @staticmethod
+    def _centroid_shift(a: FaceLocation, b: FaceLocation) -> float:
+        """Distance between box centres relative to the size of box b"""
+        ax, ay = (a[1] + a[3]) / 2, (a[0] + a[2]) / 2
+        bx, by = (b[1] + b[3]) / 2, (b[0] + b[2]) / 2
+        size = max(b[1] - b[3], b[2] - b[0], 1)
+        return float(np.hypot(ax - bx, ay - by)) / size
@@ -0,0 +1,246 @@
+"""
+Frame scheduling and adaptive quality
+FrameScheduler paces capture against absolute deadlines for a frame budget (instead of
+sleeping a fixed time after each frame) and drops to a low power-saving rate when no
+face has been seen for a while. QualityController adjusts detection scale, upsampling
+and the detection interval from measured stage times so the amortized per-frame cost
+stays within the budget. Every decision goes to a DecisionLog for tuning.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+# Quality levels from best to cheapest: (detection_scale, upsample, detection_interval)
+QUALITY_LEVELS = (
+    (1.0, 1, 2),
+    (0.75, 1, 3),
+    (0.5, 1, 5),  # The fixed settings used before adaptive quality
+    (0.5, 0, 5),
+    (0.4, 0, 8),
+    (0.33, 0, 12),
+)
+DEFAULT_QUALITY_LEVEL = 2
+
+
+class DecisionLog:
+    """Recent scheduler/controller decisions, optionally appended to a JSON lines file"""
+
+    def __init__(self, path: Optional[str] = None, maxlen: int = 256, echo: bool = False):
+        self.entries = deque(maxlen=maxlen)
+        self.path = path
+        self.echo = echo  # Print each decision to the console
+
+    def record(self, kind: str, **fields):
+        entry = {"time": time.time(), "kind": kind}
+        entry.update(fields)
+        self.entries.append(entry)
+        if self.echo:
+            details = ", ".join(f"{key}={value}" for key, value in fields.items())
+            print(f"Scheduler: {kind} ({details})")
+        if self.path:
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print(f"Could not write scheduler log: {e}")
+                self.path = None
+
+
+class FrameScheduler:
+    """Deadline-based pacing at target_fps, or idle_fps while no face is visible
+
+    Deadlines advance by the frame budget from the previous deadline, so the time a
+    frame took to process is part of its budget. A frame that overruns its deadline
+    starts the next one immediately instead of trying to catch up with a burst.
+    """
+
+    def __init__(self, target_fps: float = 60.0, idle_fps: float = 5.0, idle_after: float = 3.0,
+                 log: Optional[DecisionLog] = None):
+        self.target_fps = target_fps  # Set to the display refresh rate by the window
+        self.idle_fps = idle_fps  # Capture rate in power-save mode
+        self.idle_after = idle_after  # Seconds without a face before power-save mode
+        self.power_save_enabled = True
+        self.log = log if log is not None else DecisionLog()
+
+        self.idle = False
+        self.face_count = 0  # Faces seen on the last processed frame
+        self.last_face_time = time.monotonic()
+        self.next_deadline = None
+        self.late_frames = 0  # Frames that finished after their deadline
+        self.lock = threading.Lock()  # wake() and note_faces() reset the deadline from other threads
+
+    def budget(self) -> float:
+        """Seconds available for the current frame"""
+        return 1.0 / (self.idle_fps if self.idle else self.target_fps)
+
+    def note_faces(self, face_count: Optional[int] = None, now: Optional[float] = None):
+        """Enter power-save mode after idle_after seconds without faces, leave it on the first face
+
+        face_count None means the frame wasn't processed (unchanged screen) and the
+        previous count still holds.
+        """
+        now = time.monotonic() if now is None else now
+        if face_count is None:
+            face_count = self.face_count
+        self.face_count = face_count
+        if face_count:
+            self.last_face_time = now
+            if self.idle:
+                with self.lock:
+                    self.idle = False
+                    self.next_deadline = None  # Don't wait out the long idle deadline
+                self.log.record("power_save_off", faces=face_count)
+        elif (self.power_save_enabled and not self.idle
+              and now - self.last_face_time >= self.idle_after):
+            self.idle = True
+            self.log.record("power_save_on", idle_seconds=round(now - self.last_face_time, 1),
+                            fps=self.idle_fps)
+
+    def wake(self):
+        """Leave power-save mode without waiting for a face (e.g. the capture area moved)"""
+        self.last_face_time = time.monotonic()
+        if self.idle:
+            with self.lock:
+                self.idle = False
+                self.next_deadline = None
+            self.log.record("power_save_off", reason="wake")
+
+    def wait(self, should_continue=None):
+        """Sleep until the next frame deadline
+
+        should_continue is polled during long waits so a stop request or a wake-up is
+        not delayed by a whole idle period.
+        """
+        now = time.perf_counter()
+        with self.lock:
+            deadline = now if self.next_deadline is None else self.next_deadline
+            deadline += self.budget()
+            if deadline <= now:
+                self.late_frames += 1
+                self.next_deadline = now
+                return
+            self.next_deadline = deadline
+        while True:
+            deadline = self.next_deadline  # wake() may clear it from another thread
+            if deadline is None:
+                return
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return
+            if should_continue is not None and not should_continue():
+                return
+            time.sleep(min(remaining, 0.05))
+
+
+class QualityController:
+    """Pick a quality level whose amortized per-frame cost fits the frame budget
+
+    Detection and tracking times are smoothed with an exponential moving average. The
+    amortized cost of a detection cycle (one detection frame plus interval - 1 tracked
+    frames) is compared with the budget: above high_water the controller steps to a
+    cheaper level, below low_water to a better one, at most once per cooldown.
+
+    Recall comes first: the controller doesn't step down to levels that would shrink
+    the smallest face seen in the last face_memory seconds below min_face_pixels in the
+    detection image, and steps up when a smaller face shows up. While such a face is
+    remembered, detection passes that found nothing don't count as cheap passes.
+    """
+
+    def __init__(self, level: int = DEFAULT_QUALITY_LEVEL, log: Optional[DecisionLog] = None):
+        self.level = level
+        self.log = log if log is not None else DecisionLog()
+        self.smoothing = 0.2  # EWMA weight of the newest sample
+        self.high_water = 1.0  # Step down above this fraction of the budget
+        self.low_water = 0.4  # Step up below this fraction of the budget
+        self.cooldown = 2.0  # Seconds between level changes
+        self.min_samples = 3  # Detection samples needed at a level before judging it
+        self.min_face_pixels = 80  # Smallest face height the detector finds (dlib's 80 px window)
+        self.face_memory = 10.0  # Seconds a face's size keeps constraining the level after it was last seen
+
+        self.detect_time = None  # Smoothed seconds per detection frame
+        self.track_time = None  # Smoothed seconds per tracked frame
+        self.samples = 0
+        self.last_change = time.monotonic()
+        self.smallest_face = None  # Height in frame pixels of the smallest face on the last frame with faces
+        self.last_face_time = None
+
+    def settings(self) -> dict:
+        detection_scale, upsample, detection_interval = QUALITY_LEVELS[self.level]
+        return {"detection_scale": detection_scale, "upsample": upsample,
+                "detection_interval": detection_interval}
+
+    def max_level(self, now: float) -> int:
+        """Cheapest level at which the remembered smallest face is still detectable"""
+        if self.smallest_face is None or now - self.last_face_time > self.face_memory:
+            return len(QUALITY_LEVELS) - 1
+        # Levels get cheaper monotonically; level 0 is the best there is even for tinier faces
+        for level in range(len(QUALITY_LEVELS) - 1, 0, -1):
+            detection_scale, upsample, _ = QUALITY_LEVELS[level]
+            if self.smallest_face * detection_scale * 2 ** upsample >= self.min_face_pixels:
+                return level
+        return 0
+
+    def load(self, budget: float, tracking: bool = True) -> Optional[float]:
+        """Amortized per-frame cost as a fraction of the budget, None before any detection"""
+        if self.detect_time is None:
+            return None
+        interval = QUALITY_LEVELS[self.level][2] if tracking else 1
+        track_time = self.track_time or 0.0
+        return (self.detect_time + track_time * (interval - 1)) / interval / budget
+
+    def observe(self, mode: str, seconds: float, budget: float, tracking: bool = True,
+                now: Optional[float] = None, face_heights: Optional[list] = None) -> Optional[dict]:
+        """Feed one measured detection or tracking pass and the heights of the faces it found
+
+        Returns:
+            dict: the new settings when the level changed, otherwise None
+        """
+        now = time.monotonic() if now is None else now
+        face_remembered = self.smallest_face is not None and now - self.last_face_time <= self.face_memory
+        if face_heights:
+            self.smallest_face = min(face_heights)
+            self.last_face_time = now
+        if mode == "detected":
+            if face_heights or not face_remembered:
+                # A pass that lost a known face is cheap because it lost it, not a reason to step up
+                self.detect_time = self._smooth(self.detect_time, seconds)
+                self.samples += 1
+        elif mode == "tracked":
+            self.track_time = self._smooth(self.track_time, seconds)
+        else:
+            return None
+
+        max_level = self.max_level(now)
+        load = self.load(budget, tracking)
+        if now - self.last_change < self.cooldown:
+            return None
+        if self.level > max_level:
+            new_level = self.level - 1  # A smaller face appeared, whatever the load
+        elif load is None or self.samples < self.min_samples:
+            return None
+        elif load > self.high_water and self.level < max_level:
+            new_level = self.level + 1
+        elif load < self.low_water and self.level > 0:
+            new_level = self.level - 1
+        else:
+            return None
+
+        self.log.record("quality_down" if new_level > self.level else "quality_up",
+                        level=new_level, previous=self.level, load=round(load, 2) if load is not None else None,
+                        detect_ms=round((self.detect_time or 0.0) * 1000, 1),
+                        track_ms=round((self.track_time or 0.0) * 1000, 1),
+                        budget_ms=round(budget * 1000, 1))
+        self.level = new_level
+        self.last_change = now
+        # Judge the new level on its own detection times (tracking cost doesn't depend on it)
+        self.samples = 0
+        self.detect_time = None
+        return self.settings()
+
+    def _smooth(self, average: Optional[float], sample: float) -> float:
+        if average is None:
+            return sample
+        return average + self.smoothing * (sample - average)
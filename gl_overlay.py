@@ -0,0 +1,216 @@
+"""
+OpenGL overlay renderer
+Draws the overlay patches with OpenGL instead of QPainter. Every patch is uploaded as a
+sub-image into a texture that is kept between frames (it is only reallocated when a
+bigger patch arrives), scaled to the window by the vertex shader, and feathered by the
+fragment shader, so the processor doesn't have to build the soft circular masks. Needs
+desktop OpenGL 2.0, which any driver including Mesa's llvmpipe provides.
+
+    python face_blur.py --renderer opengl
+"""
+
+from typing import List, Optional
+
+from PyQt6 import sip
+from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtGui import QOpenGLContext, QSurfaceFormat, QVector2D
+from PyQt6.QtOpenGL import (QOpenGLShader, QOpenGLShaderProgram, QOpenGLTexture, QOpenGLVersionFunctionsFactory,
+                            QOpenGLVersionProfile)
+from PyQt6.QtOpenGLWidgets import QOpenGLWidget
+
+from pipeline import OverlayPatch
+
+# OpenGL enums (PyQt6 doesn't export them)
+GL_COLOR_BUFFER_BIT = 0x4000
+GL_BLEND = 0x0BE2
+GL_ONE = 1
+GL_ONE_MINUS_SRC_ALPHA = 0x0303
+GL_TRIANGLE_STRIP = 0x0005
+
+VERTEX_SHADER = """
+attribute highp vec2 corner;      // Unit quad
+uniform highp vec4 target;        // Patch rectangle in clip space: x, y, width, height
+varying highp vec2 position;      // 0..1 across the patch
+void main() {
+    position = corner;
+    gl_Position = vec4(target.xy + corner * target.zw, 0.0, 1.0);
+}
+"""
+
+FRAGMENT_SHADER = """
+uniform sampler2D pixels;
+uniform highp vec2 extent;        // Part of the texture the patch fills
+uniform highp vec2 size;          // Patch size in pixels
+uniform highp float radius;       // Mask circle radius in pixels, 0 = use the patch's alpha
+uniform highp float sigma;        // Gaussian feather of the circle's edge
+varying highp vec2 position;
+void main() {
+    highp vec4 color = texture2D(pixels, position * extent);
+    if (radius > 0.0) {
+        highp float distance = length((position - 0.5) * size);
+        color.a = 1.0 - smoothstep(radius - 2.0 * sigma, radius + 2.0 * sigma, distance);  // ~ MaskCache within 4%
+    }
+    gl_FragColor = vec4(color.rgb * color.a, color.a);  // Premultiplied for the compositor
+}
+"""
+
+
+def opengl_available() -> bool:
+    """Whether an OpenGL context can be created on this display (call after QApplication)"""
+    context = QOpenGLContext()
+    return context.create()
+
+
+class PatchRenderer:
+    """Uploads overlay patches into reused textures and draws them (needs a current context)"""
+
+    def __init__(self, texture_bucket: int = 64):
+        self.texture_bucket = texture_bucket  # Texture sizes are rounded up to this, so they get reused
+        self.gl = None
+        self.program = None
+        self.textures = []  # Per patch slot: (QOpenGLTexture, width, height)
+        self.patches = []  # Patches uploaded for the next render()
+        self.corners = [QVector2D(0, 0), QVector2D(1, 0), QVector2D(0, 1), QVector2D(1, 1)]
+
+        # Counters
+        self.uploads = 0
+        self.upload_bytes = 0
+        self.texture_allocations = 0
+
+    def initialize(self, context: QOpenGLContext):
+        """Compile the shaders on the current context
+
+        Raises:
+            ValueError: no desktop OpenGL 2.0 or the shaders don't compile
+        """
+        profile = QOpenGLVersionProfile()
+        profile.setVersion(2, 0)
+        self.gl = QOpenGLVersionFunctionsFactory.get(profile, context)
+        if self.gl is None or not self.gl.initializeOpenGLFunctions():
+            raise ValueError("OpenGL 2.0 functions are not available")
+        self.program = QOpenGLShaderProgram()
+        if not (self.program.addShaderFromSourceCode(QOpenGLShader.ShaderTypeBit.Vertex, VERTEX_SHADER)
+                and self.program.addShaderFromSourceCode(QOpenGLShader.ShaderTypeBit.Fragment, FRAGMENT_SHADER)
+                and self.program.link()):
+            raise ValueError(f"Overlay shaders failed: {self.program.log()}")
+
+    def upload(self, patches: List[OverlayPatch]):
+        """Copy the patches into their textures (a sub-image update unless a patch outgrew its slot)"""
+        for slot, patch in enumerate(patches):
+            texture = self._texture(slot, patch.width, patch.height)
+            texture.setData(0, 0, 0, patch.width, patch.height, 1, QOpenGLTexture.PixelFormat.RGBA,
+                            QOpenGLTexture.PixelType.UInt8, sip.voidptr(patch.rgba))
+            self.uploads += 1
+            self.upload_bytes += patch.rgba.nbytes
+        self.patches = list(patches)
+
+    def render(self, width: int, height: int, frame_shape: Optional[tuple]):
+        """Clear to transparent and draw the uploaded patches, scaling frame pixels to the window"""
+        gl = self.gl
+        gl.glClearColor(0.0, 0.0, 0.0, 0.0)
+        gl.glClear(GL_COLOR_BUFFER_BIT)
+        if not self.patches or not frame_shape or width <= 0 or height <= 0:
+            return
+        frame_height, frame_width = frame_shape
+        scale_x, scale_y = 2.0 / frame_width, 2.0 / frame_height  # Frame pixels to clip space
+
+        gl.glEnable(GL_BLEND)
+        gl.glBlendFunc(GL_ONE, GL_ONE_MINUS_SRC_ALPHA)
+        self.program.bind()
+        self.program.setAttributeArray("corner", self.corners)
+        self.program.enableAttributeArray("corner")
+        self.program.setUniformValue("pixels", 0)
+        for slot, patch in enumerate(self.patches):
+            texture, texture_width, texture_height = self.textures[slot]
+            texture.bind(0)
+            # Clip space has y pointing up, the frame has it pointing down
+            self.program.setUniformValue("target", patch.left * scale_x - 1.0, 1.0 - patch.top * scale_y,
+                                         patch.width * scale_x, -patch.height * scale_y)
+            self.program.setUniformValue("extent", patch.width / texture_width, patch.height / texture_height)
+            self.program.setUniformValue("size", float(patch.width), float(patch.height))
+            self.program.setUniformValue("radius", float(patch.mask_radius or 0.0))
+            self.program.setUniformValue("sigma", float(patch.mask_sigma or 1.0))
+            gl.glDrawArrays(GL_TRIANGLE_STRIP, 0, 4)
+        self.program.disableAttributeArray("corner")
+        self.program.release()
+
+    def release(self):
+        """Free the textures and the shaders (needs the context current)"""
+        for texture, _, _ in self.textures:
+            texture.destroy()
+        self.textures = []
+        self.patches = []
+        self.program = None
+
+    def _texture(self, slot: int, width: int, height: int) -> QOpenGLTexture:
+        if slot < len(self.textures):
+            texture, texture_width, texture_height = self.textures[slot]
+            if width <= texture_width and height <= texture_height:
+                return texture
+            texture.destroy()
+        texture_width = -(-width // self.texture_bucket) * self.texture_bucket
+        texture_height = -(-height // self.texture_bucket) * self.texture_bucket
+        texture = QOpenGLTexture(QOpenGLTexture.Target.Target2D)
+        texture.setFormat(QOpenGLTexture.TextureFormat.RGBA8_UNorm)
+        texture.setSize(texture_width, texture_height)
+        texture.setMinMagFilters(QOpenGLTexture.Filter.Linear, QOpenGLTexture.Filter.Linear)
+        texture.setWrapMode(QOpenGLTexture.WrapMode.ClampToEdge)
+        texture.allocateStorage(QOpenGLTexture.PixelFormat.RGBA, QOpenGLTexture.PixelType.UInt8)
+        self.texture_allocations += 1
+        entry = (texture, texture_width, texture_height)
+        if slot < len(self.textures):
+            self.textures[slot] = entry
+        else:
+            self.textures.append(entry)
+        return texture
+
+
+class GLOverlayWidget(QOpenGLWidget):
+    """Transparent OpenGL view laid over an overlay window that paints its face patches
+
+    Mouse events pass through to the window underneath (dragging, resizing). failed is
+    emitted when OpenGL can't be initialized, so the window can paint with QPainter.
+    """
+
+    failed = pyqtSignal(str)
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        surface_format = QSurfaceFormat()
+        surface_format.setAlphaBufferSize(8)
+        self.setFormat(surface_format)
+        self.setAttribute(Qt.WidgetAttribute.WA_AlwaysStackOnTop)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.renderer = PatchRenderer()
+        self.pending = None  # Patches not uploaded yet, None = nothing new since the last paint
+        self.frame_shape = None
+        self.ready = False
+
+    def show_patches(self, patches: Optional[List[OverlayPatch]], frame_shape: tuple):
+        """Draw these patches on the next paint (only this view repaints, not the window)"""
+        self.pending = patches or []
+        self.frame_shape = frame_shape
+        self.update()
+
+    def initializeGL(self):
+        try:
+            self.renderer.initialize(self.context())
+        except ValueError as e:
+            self.failed.emit(str(e))
+            return
+        self.context().aboutToBeDestroyed.connect(self._release)
+        self.ready = True
+
+    def paintGL(self):
+        if not self.ready:
+            return
+        if self.pending is not None:
+            self.renderer.upload(self.pending)
+            self.pending = None
+        self.renderer.render(self.width(), self.height(), self.frame_shape)
+
+    def _release(self):
+        self.makeCurrent()
+        self.renderer.release()
+        self.doneCurrent()
+        self.ready = False
@@ -0,0 +1,157 @@
+"""
+Face obfuscation engines and feathered masks
+Selectable ways to hide a face area whose cost stays close to constant as faces get
+larger, and an LRU cache of the soft circular masks used to blend them, keyed by
+size bucket so a moving face reuses the same few masks.
+"""
+
+import math
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from buffer_pool import BufferPool
+
+ENGINES = ("downscale", "gaussian", "box", "pixelate", "solid")
+
+
+def kernel_sigma(kernel_size: int) -> float:
+    """Sigma OpenCV's GaussianBlur uses for a kernel size when sigma is 0"""
+    return 0.3 * ((kernel_size - 1) * 0.5 - 1) + 0.8
+
+
+def gaussian_blur(region: np.ndarray, strength: int, dst: Optional[np.ndarray] = None,
+                  buffers: Optional[BufferPool] = None) -> np.ndarray:
+    """Full-resolution Gaussian blur with a strength x strength kernel (the original look)"""
+    return cv2.GaussianBlur(region, (strength, strength), 0, dst=dst)
+
+
+def downscale_blur(region: np.ndarray, strength: int, dst: Optional[np.ndarray] = None,
+                   buffers: Optional[BufferPool] = None) -> np.ndarray:
+    """Shrink by the blur's sigma, blur the small image lightly and scale back up
+
+    Looks like the full-resolution Gaussian of the same strength, but the blur itself
+    runs on sigma^2 times fewer pixels.
+    """
+    height, width = region.shape[:2]
+    factor = max(1.0, kernel_sigma(strength))
+    small_size = (max(1, int(round(width / factor))), max(1, int(round(height / factor))))
+    small = _scratch(buffers, "downscale_small", (small_size[1], small_size[0]) + region.shape[2:])
+    small = cv2.resize(region, small_size, dst=small, interpolation=cv2.INTER_AREA)
+    small = cv2.GaussianBlur(small, (3, 3), 0, dst=small)
+    return cv2.resize(small, (width, height), dst=dst, interpolation=cv2.INTER_LINEAR)
+
+
+def box_blur(region: np.ndarray, strength: int, dst: Optional[np.ndarray] = None,
+             buffers: Optional[BufferPool] = None, passes: int = 2) -> np.ndarray:
+    """Repeated separable box filter sized to match the Gaussian's sigma
+
+    Box filters run in constant time per pixel whatever the kernel size.
+    """
+    sigma = kernel_sigma(strength)
+    size = max(1, int(round(math.sqrt(12.0 * sigma * sigma / passes + 1.0))))
+    blurred = region
+    for _ in range(passes):
+        blurred = cv2.blur(blurred, (size, size), dst=dst)
+        dst = blurred  # Later passes filter in place
+    return blurred
+
+
+def pixelate(region: np.ndarray, strength: int, dst: Optional[np.ndarray] = None,
+             buffers: Optional[BufferPool] = None) -> np.ndarray:
+    """Mosaic of blocks about strength / 2 pixels wide"""
+    height, width = region.shape[:2]
+    block = max(2, strength // 2)
+    small_size = (max(1, width // block), max(1, height // block))
+    small = _scratch(buffers, "pixelate_small", (small_size[1], small_size[0]) + region.shape[2:])
+    small = cv2.resize(region, small_size, dst=small, interpolation=cv2.INTER_AREA)
+    return cv2.resize(small, (width, height), dst=dst, interpolation=cv2.INTER_NEAREST)
+
+
+def solid_fill(region: np.ndarray, strength: int, dst: Optional[np.ndarray] = None,
+               buffers: Optional[BufferPool] = None) -> np.ndarray:
+    """The region's mean colour"""
+    filled = np.empty_like(region) if dst is None else dst
+    filled[...] = cv2.mean(region)[:region.shape[2]]
+    return filled
+
+
+def _scratch(buffers: Optional[BufferPool], name: str, shape: Tuple[int, ...]) -> Optional[np.ndarray]:
+    """A pooled intermediate image, or None to let OpenCV allocate it"""
+    return buffers.get(name, shape) if buffers is not None else None
+
+
+_ENGINE_FUNCTIONS = {
+    "gaussian": gaussian_blur,
+    "downscale": downscale_blur,
+    "box": box_blur,
+    "pixelate": pixelate,
+    "solid": solid_fill,
+}
+
+
+def obfuscate(region: np.ndarray, engine: str = "downscale", strength: int = 31, dst: Optional[np.ndarray] = None,
+              buffers: Optional[BufferPool] = None) -> np.ndarray:
+    """Hide the contents of an image region with one of ENGINES
+
+    dst (same shape as the region) receives the result and buffers supplies the
+    intermediate images, so a frame loop can run without allocating.
+    """
+    try:
+        function = _ENGINE_FUNCTIONS[engine]
+    except KeyError:
+        raise ValueError(f"Unknown obfuscation engine: {engine}")
+    return function(region, strength, dst, buffers)
+
+
+class MaskCache:
+    """Feathered circular masks, reused across frames
+
+    Masks are built at sizes rounded up to the bucket and cropped to the requested
+    size around their centre, so faces that move or change size slightly hit the
+    same entry. The least recently used masks are evicted beyond capacity.
+    """
+
+    def __init__(self, capacity: int = 64, bucket: int = 16, feather: int = 41):
+        self.capacity = capacity
+        self.bucket = bucket
+        self.feather = feather  # Gaussian kernel that softens the circle's edge
+        self.masks = OrderedDict()  # (height, width, radius) buckets -> mask
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, height: int, width: int, radius: int) -> np.ndarray:
+        """height x width uint8 mask: a soft-edged circle of the radius around the centre"""
+        key = (self._round_up(height), self._round_up(width), self._round_up(radius))
+        mask = self.masks.get(key)
+        if mask is None:
+            self.misses += 1
+            mask = self._build(*key)
+            self.masks[key] = mask
+            while len(self.masks) > self.capacity:
+                self.masks.popitem(last=False)
+        else:
+            self.hits += 1
+            self.masks.move_to_end(key)
+        offset_y = (mask.shape[0] - height) // 2
+        offset_x = (mask.shape[1] - width) // 2
+        return mask[offset_y:offset_y + height, offset_x:offset_x + width]
+
+    def stats(self) -> Tuple[int, int]:
+        return self.hits, self.misses
+
+    def sigma(self) -> float:
+        """Gaussian sigma OpenCV uses for the feather kernel (for renderers drawing the mask themselves)"""
+        return 0.3 * ((self.feather - 1) * 0.5 - 1) + 0.8
+
+    def _round_up(self, value: int) -> int:
+        return max(self.bucket, -(-value // self.bucket) * self.bucket)
+
+    def _build(self, height: int, width: int, radius: int) -> np.ndarray:
+        mask = np.zeros((height, width), dtype=np.uint8)
+        cv2.circle(mask, (width // 2, height // 2), radius, 255, -1)
+        mask = cv2.GaussianBlur(mask, (self.feather, self.feather), 0)
+        mask.setflags(write=False)  # Shared between frames
+        return mask
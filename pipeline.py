@@ -0,0 +1,180 @@
+"""
+Pipeline plumbing
+Latest-frame-wins queues and the packets that carry frames and overlays between the
+capture, detection and composition stages together with their stage timestamps.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+class LatestFrameQueue:
+    """Bounded queue that drops the oldest item instead of blocking the producer
+
+    With maxsize=1 a consumer always gets the newest frame, and a slow consumer
+    never builds up lag - stale frames are simply counted as dropped. A consumer on
+    another event loop (the GUI thread) only needs a notification when put() returns
+    True: later items replace the pending one until it is taken.
+    """
+
+    def __init__(self, maxsize: int = 1):
+        self.items = deque(maxlen=maxsize)
+        self.condition = threading.Condition()
+        self.closed = False
+        self.put_count = 0
+        self.dropped = 0  # Items replaced before anyone consumed them
+
+    def put(self, item) -> bool:
+        """Queue an item; True when the queue was empty before"""
+        with self.condition:
+            was_empty = not self.items
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.put_count += 1
+            self.condition.notify()
+            return was_empty
+
+    def get(self, timeout: Optional[float] = None):
+        """Return the oldest queued item, or None on timeout or once closed"""
+        with self.condition:
+            if not self.items and not self.closed:
+                self.condition.wait(timeout)
+            if not self.items:
+                return None
+            return self.items.popleft()
+
+    def depth(self) -> int:
+        with self.condition:
+            return len(self.items)
+
+    def close(self):
+        """Wake up every waiting consumer; get() returns None from now on when empty"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class FramePacket:
+    """A captured frame travelling through the pipeline"""
+
+    def __init__(self, frame_id: int, image: np.ndarray, timestamps: dict, area: Optional[dict] = None,
+                 regions: Optional[list] = None):
+        self.frame_id = frame_id
+        self.image = image
+        self.timestamps = timestamps  # Stage name -> time.perf_counter()
+        self.area = area  # Screen area the frame was grabbed from
+        self.regions = regions  # Parts of the frame that were captured (None = all of it)
+
+
+class FaceResult:
+    """Face boxes produced by one detection/tracking pass"""
+
+    def __init__(self, frame_id: int, face_locations: list, shape, timestamps: dict,
+                 motions: Optional[list] = None):
+        self.frame_id = frame_id
+        self.face_locations = face_locations
+        self.shape = shape  # Frame shape the boxes refer to
+        self.timestamps = timestamps
+        self.motions = motions  # Per face: motion model snapshot to predict the box at a later time
+
+
+class OverlayPatch:
+    """One RGBA piece of the overlay and its position, in frame pixels"""
+
+    def __init__(self, top: int, left: int, rgba: np.ndarray, mask_radius: Optional[float] = None,
+                 mask_sigma: Optional[float] = None):
+        self.top = top
+        self.left = left
+        self.rgba = rgba  # Contiguous (height, width, 4) uint8, alpha is the blend mask
+        # Set when the renderer draws the mask (OpenGL): soft circle of this radius around the
+        # centre, edge feathered with this Gaussian sigma; the alpha channel is then opaque
+        self.mask_radius = mask_radius
+        self.mask_sigma = mask_sigma
+
+    @property
+    def height(self) -> int:
+        return self.rgba.shape[0]
+
+    @property
+    def width(self) -> int:
+        return self.rgba.shape[1]
+
+    def box(self) -> Tuple[int, int, int, int]:
+        """(top, right, bottom, left) in frame pixels"""
+        return self.top, self.left + self.width, self.top + self.height, self.left
+
+
+class OverlayFrame:
+    """Sparse overlay sent to the window together with per-stage timestamps
+
+    The overlay is a list of patches placed on an otherwise transparent frame of the
+    given shape, so only the face areas are allocated, copied and painted.
+
+    Timestamps (time.perf_counter) use these keys when the stage ran:
+        capture, captured: grab started / pixels converted to RGB
+        detect_capture: capture time of the frame the face boxes came from
+        detect_start, detect_end: detection or tracking pass
+        compose_start, compose_end: blur and overlay assembly
+        emit: overlay handed to the window
+    """
+
+    def __init__(self, patches: Optional[List[OverlayPatch]], shape: Tuple[int, ...] = (0, 0),
+                 frame_id: int = 0, timestamps: Optional[dict] = None, area: Optional[dict] = None):
+        self.patches = patches  # None when no matching face is visible
+        self.shape = tuple(shape[:2])  # (height, width) of the captured frame
+        self.frame_id = frame_id
+        self.timestamps = timestamps if timestamps is not None else {}
+        self.area = area  # Screen area of the frame, used to route patches to windows
+
+    def stamp(self, stage: str):
+        self.timestamps[stage] = time.perf_counter()
+
+    def latency(self) -> Optional[float]:
+        """Seconds from grabbing the pixels to emitting the overlay"""
+        if "capture" not in self.timestamps or "emit" not in self.timestamps:
+            return None
+        return self.timestamps["emit"] - self.timestamps["capture"]
+
+    def stage_durations(self) -> dict:
+        """Seconds spent in each stage that ran for this overlay"""
+        durations = {}
+        for stage, start, end in (("capture", "capture", "captured"),
+                                  ("detect", "detect_start", "detect_end"),
+                                  ("compose", "compose_start", "compose_end")):
+            if start in self.timestamps and end in self.timestamps:
+                durations[stage] = self.timestamps[end] - self.timestamps[start]
+        if "detect_capture" in self.timestamps and "emit" in self.timestamps:
+            durations["face_age"] = self.timestamps["emit"] - self.timestamps["detect_capture"]
+        return durations
+
+
+def route_patches(patches: Optional[List[OverlayPatch]], box: Tuple[int, int, int, int]) -> List[OverlayPatch]:
+    """The patches overlapping a (top, right, bottom, left) box, moved into its coordinates
+
+    The patches share their pixels with the originals; parts outside the box are left
+    for the painter to clip.
+    """
+    top, right, bottom, left = box
+    routed = []
+    for patch in patches or []:
+        patch_top, patch_right, patch_bottom, patch_left = patch.box()
+        if patch_top < bottom and top < patch_bottom and patch_left < right and left < patch_right:
+            routed.append(OverlayPatch(patch.top - top, patch.left - left, patch.rgba, patch.mask_radius,
+                                       patch.mask_sigma))
+    return routed
+
+
+def composite_overlay(frame: np.ndarray, patches: Optional[List[OverlayPatch]]) -> np.ndarray:
+    """Blend overlay patches onto a 3-channel frame in place and return the frame"""
+    for patch in patches or ():
+        top, right, bottom, left = patch.box()
+        region = frame[top:bottom, left:right]
+        alpha = patch.rgba[:, :, 3:4].astype(np.float32) * (1.0 / 255.0)
+        blended = patch.rgba[:, :, :3].astype(np.float32) * alpha + region.astype(np.float32) * (1.0 - alpha)
+        region[...] = blended.astype(np.uint8)
+    return frame
@@ -0,0 +1,275 @@
+"""
+Offline video redaction
+Streams a recorded video through the same detect/match/track/blur path as the live
+overlay and writes a blurred copy. Decoding, processing and encoding run as
+overlapping stages connected by bounded queues, so memory stays flat for files of
+any length. With --workers N the file is cut into N frame ranges that are processed
+in parallel processes and stitched back together.
+
+    python process_video.py meeting.mp4 meeting_blurred.mp4 --store ~/.face_blur/references
+    python process_video.py clip.mp4 out.mp4 --reference alice.jpg --workers 4
+
+The output has no audio track.
+"""
+
+import argparse
+import multiprocessing
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+import cv2
+
+from detectors import DETECTORS
+from obfuscation import ENGINES
+from pipeline import composite_overlay
+from reference_store import DEFAULT_STORE_PATH, load_gallery
+
+_END = object()  # Queue sentinel: no more frames
+
+
+def video_info(path: str) -> Tuple[float, int, int, int]:
+    """(fps, frame_count, width, height) of a video file; frame_count may be 0 if unknown"""
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video: {path}")
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    finally:
+        capture.release()
+    return fps, max(0, frame_count), width, height
+
+
+def split_ranges(frame_count: int, chunks: int) -> List[Tuple[int, int]]:
+    """Cut [0, frame_count) into up to chunks contiguous (start, end) ranges"""
+    chunks = max(1, min(chunks, frame_count))
+    return [(i * frame_count // chunks, (i + 1) * frame_count // chunks) for i in range(chunks)]
+
+
+def process_range(task: tuple) -> dict:
+    """Blur frames [start, end) of a video into its own output file (end None = to the end)
+
+    Runs in the calling process: a decode thread and an encode thread overlap with the
+    detection/blur work done here.
+    """
+    input_path, output_path, start, end, gallery, options = task
+    # Imported here so spawned workers only load Qt/dlib when they actually process frames
+    from face_blur import BlurProcessor
+
+    processor = BlurProcessor(gallery)
+    processor.detection_scale = options["detection_scale"]
+    processor.detection_model = options["detection_model"]
+    processor.detector_model_dir = options["model_dir"]
+    processor.detection_interval = options["detection_interval"]
+    processor.tracking_enabled = options["tracking"]
+    processor.detection_workers = options["detection_workers"]
+    processor.blur_engine = options["blur_engine"]
+    processor.adaptive_quality = False  # Same settings for every frame, however long it takes
+    processor.error_occurred.connect(print)  # e.g. the detector falling back, with no window to show it
+
+    fps, _, width, height = video_info(input_path)
+    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*options["fourcc"]), fps, (width, height))
+    if not writer.isOpened():
+        raise ValueError(f"Could not open video writer for {output_path} (fourcc {options['fourcc']})")
+
+    decoded = queue.Queue(maxsize=options["queue_size"])
+    encoded = queue.Queue(maxsize=options["queue_size"])
+    stop = threading.Event()
+    errors = []
+
+    def put(target: queue.Queue, item) -> bool:
+        # Bounded put that gives up once another stage failed
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(source: queue.Queue):
+        # Blocking get that gives up (as if the stream ended) once another stage failed
+        while not stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def decode_loop():
+        capture = cv2.VideoCapture(input_path)
+        try:
+            if start:
+                capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+            index = start
+            while end is None or index < end:
+                ok, frame_bgr = capture.read()
+                if not ok or not put(decoded, cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)):
+                    break
+                index += 1
+        except Exception as e:
+            errors.append(e)
+        finally:
+            capture.release()
+            put(decoded, _END)
+
+    def encode_loop():
+        try:
+            while True:
+                frame_rgb = encoded.get()
+                if frame_rgb is _END:
+                    break
+                writer.write(cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR))
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    stages = [threading.Thread(target=decode_loop, name="video-decode", daemon=True),
+              threading.Thread(target=encode_loop, name="video-encode", daemon=True)]
+    for stage in stages:
+        stage.start()
+
+    frames = 0
+    modes = {}
+    try:
+        while not stop.is_set():
+            frame_rgb = get(decoded)
+            if frame_rgb is _END:
+                break
+            overlay = processor.process_image(frame_rgb, ((start or 0) + frames) / fps)  # Video time for the motion model
+            modes[processor.last_frame_mode] = modes.get(processor.last_frame_mode, 0) + 1
+            if not put(encoded, composite_overlay(frame_rgb, overlay)):
+                break
+            frames += 1
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        put(encoded, _END)
+        for stage in stages:
+            stage.join()
+        writer.release()
+        processor.stop()
+
+    if errors:
+        raise errors[0]
+    return {"output": output_path, "frames": frames, "modes": modes}
+
+
+def stitch_chunks(chunk_paths: List[str], output_path: str, fps: float, size: Tuple[int, int], fourcc: str):
+    """Join chunk files into one video, losslessly with ffmpeg when it is installed"""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        list_path = output_path + ".chunks.txt"
+        with open(list_path, "w", encoding="utf-8") as f:
+            for path in chunk_paths:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+        try:
+            result = subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                                     "-i", list_path, "-c", "copy", output_path])
+            if result.returncode == 0:
+                return
+            print("ffmpeg concat failed, re-encoding the chunks with OpenCV")
+        finally:
+            os.remove(list_path)
+
+    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+    try:
+        for path in chunk_paths:
+            capture = cv2.VideoCapture(path)
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                writer.write(frame)
+            capture.release()
+    finally:
+        writer.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="video file to redact")
+    parser.add_argument("output", help="blurred video to write")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH, help="reference store to match (default: %(default)s)")
+    parser.add_argument("--reference", help="use the largest face of this image instead of the store")
+    parser.add_argument("--tolerance", type=float, default=0.4, help="match tolerance for --reference")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="process this many frame ranges of the file in parallel processes")
+    parser.add_argument("--detection-workers", type=int, default=0,
+                        help="worker processes for detection within each frame (0 = in-process)")
+    parser.add_argument("--detection-interval", type=int, default=5, help="full detection every N frames")
+    parser.add_argument("--detection-scale", type=float, default=0.5, help="downscale factor for detection")
+    parser.add_argument("--detection-model", choices=DETECTORS, default="hog", help="face detector backend")
+    parser.add_argument("--model-dir", help="directory with the ssd/yunet/haar model files")
+    parser.add_argument("--no-tracking", action="store_true", help="run full detection on every frame")
+    parser.add_argument("--blur-engine", choices=ENGINES, default="downscale", help="how faces are hidden")
+    parser.add_argument("--fourcc", default="mp4v", help="output codec (default: %(default)s)")
+    parser.add_argument("--queue-size", type=int, default=8, help="frames buffered between stages")
+    args = parser.parse_args()
+
+    try:
+        fps, frame_count, width, height = video_info(args.input)
+        gallery = load_gallery(args.store, args.reference, args.tolerance)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    options = {
+        "detection_scale": args.detection_scale,
+        "detection_model": args.detection_model,
+        "model_dir": args.model_dir,
+        "detection_interval": args.detection_interval,
+        "tracking": not args.no_tracking,
+        "detection_workers": args.detection_workers,
+        "blur_engine": args.blur_engine,
+        "fourcc": args.fourcc,
+        "queue_size": args.queue_size,
+    }
+
+    workers = args.workers
+    if workers > 1 and frame_count == 0:
+        print("Frame count unknown, processing the file in a single pass")
+        workers = 1
+
+    print(f"Processing {args.input} ({width}x{height}, {fps:.1f} fps, {frame_count or '?'} frames) "
+          f"with {workers} worker(s)...")
+    start = time.perf_counter()
+    if workers == 1:
+        results = [process_range((args.input, args.output, 0, None, gallery, options))]
+    else:
+        # Chunks are written next to the output so stitching never crosses filesystems
+        chunk_dir = tempfile.mkdtemp(prefix=".chunks-", dir=os.path.dirname(os.path.abspath(args.output)))
+        extension = os.path.splitext(args.output)[1] or ".mp4"
+        try:
+            tasks = [(args.input, os.path.join(chunk_dir, f"chunk{i:04d}{extension}"), range_start, range_end,
+                      gallery, options)
+                     for i, (range_start, range_end) in enumerate(split_ranges(frame_count, workers))]
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=len(tasks), mp_context=context) as executor:
+                results = list(executor.map(process_range, tasks))
+            stitch_chunks([result["output"] for result in results], args.output, fps, (width, height), args.fourcc)
+        finally:
+            shutil.rmtree(chunk_dir, ignore_errors=True)
+    elapsed = time.perf_counter() - start
+
+    frames = sum(result["frames"] for result in results)
+    modes = {}
+    for result in results:
+        for mode, count in result["modes"].items():
+            modes[mode] = modes.get(mode, 0) + count
+    print(f"\nWrote {frames} frames to {args.output} in {elapsed:.1f}s ({frames / max(elapsed, 1e-9):.1f} fps)")
+    print("  " + ", ".join(f"{mode}: {count}" for mode, count in sorted(modes.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,558 @@
+"""
+Local frame-redaction service
+Runs the detect/match/blur path of BlurProcessor headless, for other programs on the
+same machine (recorders, streaming tools, test harnesses). Clients send RGB frames over
+HTTP on a Unix domain socket (or 127.0.0.1:PORT), either in the request body or in a
+shared-memory block they own, and get back the reference faces' boxes, every face with
+its match verdict, the blurred patches, or the redacted frame. Frames from concurrent
+clients are collected into batches: one detector call and one gallery match per batch.
+
+    python redaction_server.py --store ~/.face_blur/references
+    python redaction_server.py --port 8765 --reference alice.jpg
+
+Endpoints:
+    POST /redact?width=W&height=H[&shm=NAME][&output=boxes|faces|patches|frame]
+        The body is the frame (H*W*3 bytes of RGB) unless shm names a shared-memory
+        block holding it (Unix socket only). Content-Type must be
+        application/octet-stream. Outputs:
+            boxes:   {"boxes": [[top, right, bottom, left], ...]} of the reference faces
+            faces:   {"faces": [{"box": [...], "label": ..., "distance": ...}, ...]}
+                     for every face, label and distance null when it doesn't match
+            patches: one JSON line {"patches": [{"top", "left", "height", "width"}, ...]}
+                     followed by the RGBA bytes of every patch (alpha is the blend mask)
+            frame:   the frame with the reference faces blurred - in place in the
+                     shared-memory block (the response is then the boxes), otherwise
+                     as the response body
+    GET /stats    telemetry as JSON (batch sizes, queue wait, request latency)
+    GET /metrics  the same in the Prometheus text format
+
+The socket is only accessible to the user running the server. Over TCP any local
+process (or web page) can connect, so shared-memory names are refused there: the server
+would read and write any block the caller names. The required Content-Type keeps
+browsers from posting frames without a CORS preflight, which the server never answers.
+RedactionClient below speaks the protocol from Python.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import resource_tracker, shared_memory
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import List, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import numpy as np
+
+from detectors import DETECTORS
+from obfuscation import ENGINES
+from pipeline import OverlayPatch, composite_overlay
+from reference_store import DEFAULT_STORE_PATH, load_gallery
+
+DEFAULT_SOCKET_PATH = os.path.join(os.path.expanduser("~"), ".face_blur", "redaction.sock")
+OUTPUTS = ("boxes", "faces", "patches", "frame")
+MAX_FRAME_PIXELS = 7680 * 4320  # Larger frames are rejected (8K)
+
+
+class RedactionJob:
+    """One client frame waiting for its batch"""
+
+    def __init__(self, image: np.ndarray, render: bool):
+        self.image = image
+        self.render = render  # Blur the matched faces (patches/frame output)
+        self.submitted = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None  # (face_locations, matches, patches) from BlurProcessor.redact_batch
+        self.error = None
+
+
+class RequestBatcher:
+    """Run the frames of all clients through BlurProcessor.redact_batch on one thread
+
+    The first waiting frame opens a batch; frames arriving within batch_window seconds
+    of it (or already queued behind it) join, up to max_batch. Only this thread uses
+    the processor, so its detector, buffer pool and mask cache need no locking.
+    """
+
+    def __init__(self, processor, max_batch: int = 8, batch_window: float = 0.002):
+        self.processor = processor
+        self.telemetry = processor.telemetry
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.jobs = deque()
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="redaction-batcher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        with self.condition:
+            while self.jobs:
+                job = self.jobs.popleft()
+                job.error = RuntimeError("Redaction server stopped")
+                job.done.set()
+
+    def submit(self, image: np.ndarray, render: bool, timeout: float = 30.0):
+        """Queue a frame and wait for its (face_locations, matches, patches)
+
+        Raises:
+            RuntimeError: the server is stopping or the batch failed
+            TimeoutError: no result within timeout seconds
+        """
+        job = RedactionJob(image, render)
+        with self.condition:
+            if not self.running:
+                raise RuntimeError("Redaction server stopped")
+            self.jobs.append(job)
+            self.condition.notify()
+        if not job.done.wait(timeout):
+            raise TimeoutError(f"No result within {timeout:.0f}s")
+        if job.error is not None:
+            raise RuntimeError(str(job.error))
+        return job.result
+
+    def _next_batch(self) -> List[RedactionJob]:
+        with self.condition:
+            while self.running and not self.jobs:
+                self.condition.wait()
+            if not self.running:
+                return []
+            deadline = self.jobs[0].submitted + self.batch_window
+            while self.running and len(self.jobs) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            count = min(self.max_batch, len(self.jobs))
+            batch = [self.jobs.popleft() for _ in range(count)]
+            self.telemetry.set_gauge("queued", len(self.jobs))
+            return batch
+
+    def _run(self):
+        while self.running:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            start = time.perf_counter()
+            try:
+                results = self.processor.redact_batch([job.image for job in batch], [job.render for job in batch])
+            except Exception as e:
+                print(f"Redaction batch failed: {e}")
+                results = None
+            end = time.perf_counter()
+            self.telemetry.record("batch", end - start)
+            self.telemetry.count("batches")
+            self.telemetry.count("frames", len(batch))
+            self.telemetry.set_gauge("batch_size", len(batch))
+            for index, job in enumerate(batch):
+                self.telemetry.record("queue_wait", start - job.submitted)
+                if results is None:
+                    job.error = RuntimeError("Redaction failed")
+                else:
+                    job.result = results[index]
+                job.done.set()
+
+
+class SharedFrames:
+    """Clients' shared-memory blocks, kept attached between requests (least recently used are closed)"""
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self.segments = OrderedDict()  # name -> SharedMemory
+        self.lock = threading.Lock()
+
+    def view(self, name: str, shape: tuple) -> np.ndarray:
+        """The frame of the shape at the start of the named block
+
+        Raises:
+            ValueError: the block doesn't exist or is too small
+        """
+        with self.lock:
+            segment = self.segments.get(name)
+            if segment is None:
+                try:
+                    segment = shared_memory.SharedMemory(name=name)
+                except FileNotFoundError:
+                    raise ValueError(f"No shared memory block named {name}")
+                # The client owns the block: don't let this process's resource tracker unlink it
+                resource_tracker.unregister(segment._name, "shared_memory")
+                self.segments[name] = segment
+                while len(self.segments) > self.capacity:
+                    self._close(self.segments.popitem(last=False)[1])
+            self.segments.move_to_end(name)
+        if segment.size < int(np.prod(shape)):
+            raise ValueError(f"Shared memory block {name} is smaller than a {shape[1]}x{shape[0]} frame")
+        return np.ndarray(shape, dtype=np.uint8, buffer=segment.buf)
+
+    def close(self):
+        with self.lock:
+            for segment in self.segments.values():
+                self._close(segment)
+            self.segments.clear()
+
+    @staticmethod
+    def _close(segment: shared_memory.SharedMemory):
+        try:
+            segment.close()
+        except BufferError:
+            pass  # A request still uses it; the mapping goes away with its last view
+
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    """HTTP over a Unix domain socket, a thread per connection"""
+
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("local", 0)  # The request handler expects a (host, port) address
+
+
+class RedactionServer:
+    """Serve a BlurProcessor on a Unix socket, or on 127.0.0.1:port when port is given"""
+
+    def __init__(self, processor, socket_path: Optional[str] = None, port: Optional[int] = None,
+                 host: str = "127.0.0.1", max_batch: int = 8, batch_window: float = 0.002):
+        self.processor = processor
+        self.telemetry = processor.telemetry
+        self.socket_path = None if port is not None else (socket_path or DEFAULT_SOCKET_PATH)
+        self.host = host
+        self.port = port
+        self.batcher = RequestBatcher(processor, max_batch, batch_window)
+        self.shared_frames = SharedFrames()
+        self.server = None
+        self.thread = None
+
+    def address(self) -> str:
+        return f"unix:{self.socket_path}" if self.socket_path else f"http://{self.host}:{self.port}"
+
+    def start(self):
+        self.batcher.start()
+        handler = self._handler()
+        if self.socket_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), exist_ok=True)
+            if os.path.exists(self.socket_path):
+                if socket_in_use(self.socket_path):
+                    raise ValueError(f"A server is already listening on {self.socket_path}")
+                os.remove(self.socket_path)  # Left over from a server that didn't shut down
+            self.server = UnixHTTPServer(self.socket_path, handler)
+            os.chmod(self.socket_path, 0o600)
+        else:
+            self.server = ThreadingHTTPServer((self.host, self.port), handler)
+            self.port = self.server.server_address[1]  # Resolves port 0 to the chosen port
+        self.thread = threading.Thread(target=self.server.serve_forever, name="redaction-http", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            if self.socket_path and os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+        self.batcher.stop()
+        self.shared_frames.close()
+
+    def _handler(self):
+        batcher = self.batcher
+        accept_shared_memory = self.socket_path is not None  # Only this user can reach the socket
+        shared_frames = self.shared_frames
+        telemetry = self.telemetry
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive: clients send frame after frame on one connection
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path == "/stats":
+                    self._send(json.dumps(telemetry.snapshot()).encode("utf-8"), "application/json")
+                elif path == "/metrics":
+                    self._send(telemetry.prometheus_text("face_blur_redaction").encode("utf-8"),
+                               "text/plain; version=0.0.4")
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                start = time.perf_counter()
+                url = urlparse(self.path)
+                if url.path != "/redact":
+                    self.send_error(404)
+                    return
+                try:
+                    content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+                    if content_type != "application/octet-stream":
+                        raise ValueError("Content-Type must be application/octet-stream")
+                    query = parse_qs(url.query)
+                    if "shm" in query and not accept_shared_memory:
+                        raise ValueError("Shared-memory frames are only accepted on the Unix socket")
+                    width, height = int(query["width"][0]), int(query["height"][0])
+                    output = query.get("output", ["boxes"])[0]
+                    if output not in OUTPUTS:
+                        raise ValueError(f"Unknown output {output}, use one of {', '.join(OUTPUTS)}")
+                    if width <= 0 or height <= 0 or width * height > MAX_FRAME_PIXELS:
+                        raise ValueError(f"Unsupported frame size {width}x{height}")
+                    shape = (height, width, 3)
+                    length = int(self.headers.get("Content-Length", 0))
+                    if "shm" in query:
+                        self._read_body(length)  # Nothing expected, but keep the connection in sync
+                        image = shared_frames.view(query["shm"][0], shape)
+                    elif length != width * height * 3:
+                        raise ValueError(f"Body must be the {width}x{height} RGB frame ({width * height * 3} bytes)")
+                    else:
+                        image = np.frombuffer(self._read_body(length), dtype=np.uint8).reshape(shape)
+                except KeyError as e:
+                    self.send_error(400, f"Missing parameter {e}")
+                    return
+                except ValueError as e:
+                    self.send_error(400, str(e))
+                    return
+
+                try:
+                    face_locations, matches, patches = batcher.submit(image, output in ("patches", "frame"))
+                except (RuntimeError, TimeoutError) as e:
+                    self.send_error(503, str(e))
+                    return
+
+                boxes = [list(location) for location, match in zip(face_locations, matches) if match is not None]
+                if output == "faces":
+                    faces = [{"box": list(location), "label": match[0] if match else None,
+                              "distance": float(match[1]) if match else None}
+                             for location, match in zip(face_locations, matches)]
+                    self._send(json.dumps({"faces": faces}).encode("utf-8"), "application/json")
+                elif output == "patches":
+                    header = json.dumps({"patches": [{"top": patch.top, "left": patch.left, "height": patch.height,
+                                                      "width": patch.width} for patch in patches]})
+                    self._send(header.encode("utf-8") + b"\n", "application/octet-stream",
+                               [patch.rgba for patch in patches])
+                elif output == "frame":
+                    composite_overlay(image, patches)
+                    if "shm" in query:
+                        self._send(json.dumps({"boxes": boxes}).encode("utf-8"), "application/json")
+                    else:
+                        self._send(b"", "application/octet-stream", [image],
+                                   {"X-Face-Boxes": json.dumps(boxes)})
+                else:
+                    self._send(json.dumps({"boxes": boxes}).encode("utf-8"), "application/json")
+                telemetry.record("request", time.perf_counter() - start)
+                telemetry.count("requests")
+
+            def _read_body(self, length: int) -> bytearray:
+                # A writable buffer, so the frame output can be composited into it
+                body = bytearray(length)
+                view = memoryview(body)
+                received = 0
+                while received < length:
+                    count = self.rfile.readinto(view[received:])
+                    if not count:
+                        raise ValueError("Request body ended early")
+                    received += count
+                return body
+
+            def _send(self, body: bytes, content_type: str, arrays: Optional[list] = None,
+                      headers: Optional[dict] = None):
+                arrays = arrays or []
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body) + sum(array.nbytes for array in arrays)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                for array in arrays:
+                    self.wfile.write(np.ascontiguousarray(array).data)
+
+            def log_message(self, format, *args):
+                pass  # One line per frame would flood the console
+
+        return Handler
+
+
+def socket_in_use(path: str) -> bool:
+    """Whether a server accepts connections on the Unix socket"""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """http.client connection over a Unix domain socket"""
+
+    def __init__(self, socket_path: str, timeout: float = 30.0):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class RedactionClient:
+    """Client for RedactionServer, one connection (use one client per thread)
+
+    With use_shared_memory the frames are copied into a block owned by the client and only
+    its name is sent; the block is freed by close(). Shared memory is used by default on
+    the Unix socket; over TCP the server only takes frames in the request body.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, port: Optional[int] = None, host: str = "127.0.0.1",
+                 use_shared_memory: Optional[bool] = None, timeout: float = 30.0):
+        if use_shared_memory is None:
+            use_shared_memory = port is None
+        elif use_shared_memory and port is not None:
+            raise ValueError("Shared-memory frames need the Unix socket, not a port")
+        if port is not None:
+            self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+        else:
+            self.connection = UnixHTTPConnection(socket_path or DEFAULT_SOCKET_PATH, timeout)
+        self.use_shared_memory = use_shared_memory
+        self.block = None  # SharedMemory the frames are sent in
+
+    def redact(self, frame: np.ndarray, output: str = "boxes"):
+        """Send an RGB frame and return the server's answer for the output
+
+        boxes/faces return the decoded JSON, patches a list of OverlayPatch, and frame
+        blurs the reference faces in the given frame (in place) and returns the boxes.
+
+        Raises:
+            ValueError: the server rejected the frame or failed
+        """
+        if output not in OUTPUTS:
+            raise ValueError(f"Unknown output {output}, use one of {', '.join(OUTPUTS)}")
+        height, width = frame.shape[:2]
+        query = {"width": width, "height": height, "output": output}
+        body = b""
+        if self.use_shared_memory:
+            if self.block is None or self.block.size < frame.nbytes:
+                self._free_block()
+                self.block = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+            shared = np.ndarray(frame.shape, dtype=np.uint8, buffer=self.block.buf)
+            np.copyto(shared, frame)
+            query["shm"] = self.block.name
+        else:
+            body = np.ascontiguousarray(frame).data
+
+        self.connection.request("POST", "/redact?" + urlencode(query), body=body,
+                                headers={"Content-Type": "application/octet-stream"})
+        response = self.connection.getresponse()
+        data = response.read()
+        if response.status != 200:
+            raise ValueError(f"Redaction failed: {response.status} {response.reason}")
+
+        if output == "patches":
+            header, _, pixels = data.partition(b"\n")
+            patches = []
+            offset = 0
+            for entry in json.loads(header)["patches"]:
+                size = entry["height"] * entry["width"] * 4
+                rgba = np.frombuffer(pixels, dtype=np.uint8, count=size, offset=offset)
+                rgba = rgba.reshape(entry["height"], entry["width"], 4)
+                patches.append(OverlayPatch(entry["top"], entry["left"], rgba))
+                offset += size
+            return patches
+        if output == "frame" and not self.use_shared_memory:
+            frame[...] = np.frombuffer(data, dtype=np.uint8).reshape(frame.shape)
+            return {"boxes": json.loads(response.getheader("X-Face-Boxes", "[]"))}
+        if output == "frame":
+            np.copyto(frame, shared)
+        return json.loads(data)
+
+    def stats(self) -> dict:
+        """The server's telemetry snapshot"""
+        self.connection.request("GET", "/stats")
+        response = self.connection.getresponse()
+        data = response.read()
+        if response.status != 200:
+            raise ValueError(f"Stats failed: {response.status} {response.reason}")
+        return json.loads(data)
+
+    def close(self):
+        self.connection.close()
+        self._free_block()
+
+    def _free_block(self):
+        if self.block is not None:
+            self.block.close()
+            self.block.unlink()
+            self.block = None
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, help="listen on 127.0.0.1:PORT instead of the Unix socket")
+    parser.add_argument("--store", default=DEFAULT_STORE_PATH, help="reference store to match (default: %(default)s)")
+    parser.add_argument("--reference", help="use the largest face of this image instead of the store")
+    parser.add_argument("--tolerance", type=float, default=0.4, help="match tolerance for --reference")
+    parser.add_argument("--detection-scale", type=float, default=0.5, help="downscale factor for detection")
+    parser.add_argument("--detection-model", choices=DETECTORS, default="hog", help="face detector backend")
+    parser.add_argument("--model-dir", help="directory with the ssd/yunet/haar model files")
+    parser.add_argument("--blur-engine", choices=ENGINES, default="downscale", help="how faces are hidden")
+    parser.add_argument("--max-batch", type=int, default=8, help="most frames per detection pass")
+    parser.add_argument("--batch-window", type=float, default=2.0,
+                        help="milliseconds a batch waits for frames from other clients")
+    args = parser.parse_args()
+
+    try:
+        gallery = load_gallery(args.store, args.reference, args.tolerance)
+    except ValueError as e:
+        print(e)
+        raise SystemExit(1)
+
+    # Imported here so --help doesn't load Qt and dlib
+    from face_blur import BlurProcessor
+
+    processor = BlurProcessor(gallery)
+    processor.detection_scale = args.detection_scale
+    processor.detection_model = args.detection_model
+    processor.detector_model_dir = args.model_dir
+    processor.blur_engine = args.blur_engine
+    processor.adaptive_quality = False
+    processor.error_occurred.connect(print)  # e.g. the detector falling back
+    processor.redact_batch([np.zeros((240, 320, 3), dtype=np.uint8)])  # Load the models before the first client
+
+    server = RedactionServer(processor, None if args.port is not None else args.socket, args.port,
+                             max_batch=max(1, args.max_batch), batch_window=args.batch_window / 1000.0)
+    try:
+        server.start()
+    except (OSError, ValueError) as e:
+        print(f"Could not start the redaction server: {e}")
+        raise SystemExit(1)
+    print(f"Redaction server listening on {server.address()} (Ctrl+C to stop)")
+    signal.signal(signal.SIGTERM, _interrupt)  # Stop cleanly (remove the socket) when terminated
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Reference encoding store
+Saves reference encodings to disk so the overlay can start without the selection
+dialog: a .npy array of encodings (memory-mapped on load) plus a JSON sidecar that
+records the source image hashes and the detection/landmark settings used to encode them.
+Source images that changed since they were encoded are re-encoded automatically.
+"""
+
+import hashlib
+import json
+import os
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from face_gallery import ENCODING_SIZE, FaceGallery
+
+STORE_VERSION = 1
+DEFAULT_STORE_PATH = os.path.join(os.path.expanduser("~"), ".face_blur", "references")
+
+
+def file_sha256(path: str) -> str:
+    """Hash of a file's contents, used to notice edited or replaced source images"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def encode_image(path: str, detection_model: str = "hog", landmark_model: str = "small",
+                 num_jitters: int = 1,
+                 max_dimension: Optional[int] = None) -> Tuple[np.ndarray, List[Tuple], List[np.ndarray]]:
+    """Load an image and return (rgb_image, face_locations, face_encodings)
+
+    max_dimension downscales large photos first; locations refer to the returned image.
+    """
+    image = cv2.imread(path)
+    if image is None:
+        raise ValueError(f"Could not load image: {path}")
+    if max_dimension and max(image.shape[:2]) > max_dimension:
+        scale = max_dimension / max(image.shape[:2])
+        image = cv2.resize(image, (0, 0), fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    import face_recognition  # Loads the dlib models - only when something needs encoding
+    face_locations = face_recognition.face_locations(rgb_image, model=detection_model)
+    face_encodings = face_recognition.face_encodings(rgb_image, face_locations,
+                                                     num_jitters=num_jitters, model=landmark_model)
+    return rgb_image, face_locations, face_encodings
+
+
+def pick_face(face_locations: List[Tuple], image_shape, policy: str = "first") -> Optional[int]:
+    """Index of the face to use from an image: "first", "largest" or "central" """
+    if not face_locations:
+        return None
+    if policy == "largest":
+        return max(range(len(face_locations)),
+                   key=lambda i: (face_locations[i][2] - face_locations[i][0]) *
+                                 (face_locations[i][1] - face_locations[i][3]))
+    if policy == "central":
+        center_y, center_x = image_shape[0] / 2, image_shape[1] / 2
+        return min(range(len(face_locations)),
+                   key=lambda i: ((face_locations[i][0] + face_locations[i][2]) / 2 - center_y) ** 2 +
+                                 ((face_locations[i][1] + face_locations[i][3]) / 2 - center_x) ** 2)
+    return 0
+
+
+class ReferenceStore:
+    """Versioned on-disk store of reference encodings grouped by identity
+
+    Each entry holds the encodings taken from one source image (or imported without
+    a source) for one identity, together with the image hash at encoding time.
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        base = os.path.splitext(path)[0]
+        self.array_path = base + ".npy"
+        self.meta_path = base + ".json"
+
+        # Encoder settings; a store written with different settings is re-encoded
+        self.detection_model = "hog"
+        self.landmark_model = "small"
+        self.num_jitters = 1
+
+        self.entries = []  # dicts: label, source, sha256, face, encodings
+        self.tolerances = {}  # Identity -> tolerance
+        self.mapped = None  # Memory-mapped encodings the entries are views of, None once they changed
+
+    def exists(self) -> bool:
+        return os.path.exists(self.meta_path) and os.path.exists(self.array_path)
+
+    def settings(self) -> dict:
+        return {
+            "detection_model": self.detection_model,
+            "landmark_model": self.landmark_model,
+            "num_jitters": self.num_jitters,
+            "encoding_size": ENCODING_SIZE,
+        }
+
+    def load(self, refresh: bool = True) -> FaceGallery:
+        """Load the store and return it as a gallery, re-encoding changed sources first"""
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version", 0) > STORE_VERSION:
+            raise ValueError(f"Reference store {self.meta_path} was written by a newer version")
+
+        # Memory-mapped: the entries are views of it and the gallery matches against it
+        # directly, so the encodings are paged in from the file rather than copied
+        encodings = np.load(self.array_path, mmap_mode="r")
+        self.tolerances = dict(meta.get("tolerances", {}))
+        self.entries = []
+        expected_start = 0
+        for entry in meta.get("entries", []):
+            start, count = entry["start"], entry["count"]
+            self.entries.append({
+                "label": entry["label"],
+                "source": entry.get("source"),
+                "sha256": entry.get("sha256"),
+                "face": entry.get("face", "first"),
+                "encodings": encodings[start:start + count],
+            })
+            expected_start = start + count if start == expected_start else -1
+        # save() writes the entries back to back; anything else is mapped but copied into the gallery
+        contiguous = expected_start == len(encodings) and encodings.dtype == np.float32
+        self.mapped = encodings if contiguous else None
+
+        stale_settings = (meta.get("version") != STORE_VERSION or meta.get("settings") != self.settings())
+        if refresh and self.refresh(force=stale_settings):
+            self.save()
+            return self.load(refresh=False)  # Map the rewritten file
+        return self.to_gallery()
+
+    def save(self):
+        """Write the encodings and the metadata sidecar atomically"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.meta_path)), exist_ok=True)
+        rows = [entry["encodings"] for entry in self.entries]
+        encodings = (np.vstack(rows).astype(np.float32) if rows
+                     else np.empty((0, ENCODING_SIZE), dtype=np.float32))
+
+        meta_entries = []
+        start = 0
+        for entry in self.entries:
+            count = len(entry["encodings"])
+            meta_entries.append({
+                "label": entry["label"],
+                "source": entry["source"],
+                "sha256": entry["sha256"],
+                "face": entry["face"],
+                "start": start,
+                "count": count,
+            })
+            start += count
+        meta = {
+            "version": STORE_VERSION,
+            "settings": self.settings(),
+            "tolerances": self.tolerances,
+            "entries": meta_entries,
+        }
+
+        # Release the mapping of the old file so it can be replaced (Windows refuses otherwise)
+        for entry in self.entries:
+            entry["encodings"] = np.array(entry["encodings"], dtype=np.float32)
+        self.mapped = None
+
+        array_tmp = self.array_path + ".tmp.npy"
+        meta_tmp = self.meta_path + ".tmp"
+        np.save(array_tmp, encodings)
+        with open(meta_tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(array_tmp, self.array_path)
+        os.replace(meta_tmp, self.meta_path)
+
+    def add(self, label: str, encodings, source: Optional[str] = None, face: str = "first",
+            sha256: Optional[str] = None):
+        """Add encodings for an identity, remembering the source image's hash"""
+        if source and sha256 is None:
+            sha256 = file_sha256(source)
+        self.mapped = None
+        self.entries.append({
+            "label": label,
+            "source": os.path.abspath(source) if source else None,
+            "sha256": sha256 if source else None,
+            "face": face,
+            "encodings": np.asarray(encodings, dtype=np.float32).reshape(-1, ENCODING_SIZE),
+        })
+
+    def set_identity(self, label: str, encodings, source: Optional[str] = None, face: str = "first"):
+        """Replace every stored encoding of an identity"""
+        self.entries = [entry for entry in self.entries if entry["label"] != label]
+        self.add(label, encodings, source, face)  # Also drops the mapping
+
+    def refresh(self, force: bool = False) -> int:
+        """Re-encode entries whose source image changed (or all of them with force)
+
+        With force (the encoder settings changed) entries that can't be re-encoded -
+        imported without a source, source image gone, no face found - are dropped, as
+        their encodings don't match the new settings. Averaged (centroid) entries are
+        recomputed from what is left.
+
+        Returns:
+            int: number of entries that were re-encoded or dropped
+        """
+        refreshed = 0
+        kept = []
+        for entry in self.entries:
+            source = entry["source"]
+            if entry["face"] == "centroid":
+                kept.append(entry)  # Recomputed from the identity's other entries below
+                continue
+            if not source or not os.path.exists(source):
+                if force:
+                    print(f"Reference store: dropping {entry['label']} ({source or 'imported'}), "
+                          f"can't re-encode it with the new settings")
+                    refreshed += 1
+                else:
+                    kept.append(entry)  # Keep the stored encodings when the image is gone
+                continue
+            sha256 = file_sha256(source)
+            if not force and sha256 == entry["sha256"]:
+                kept.append(entry)
+                continue
+            rgb_image, face_locations, face_encodings = encode_image(
+                source, self.detection_model, self.landmark_model, self.num_jitters)
+            index = pick_face(face_locations, rgb_image.shape, entry["face"])
+            if index is None:
+                if force:
+                    print(f"Reference store: no face found in {source}, dropping it")
+                    refreshed += 1
+                else:
+                    print(f"Reference store: no face found in changed image {source}, keeping old encoding")
+                    kept.append(entry)
+                continue
+            entry["encodings"] = np.asarray([face_encodings[index]], dtype=np.float32)
+            entry["sha256"] = sha256
+            kept.append(entry)
+            refreshed += 1
+        self.entries = kept
+
+        if refreshed:
+            # Averaged encodings follow the per-image encodings they were built from
+            kept = []
+            for entry in self.entries:
+                if entry["face"] == "centroid":
+                    members = [e["encodings"] for e in self.entries
+                               if e["label"] == entry["label"] and e["face"] != "centroid"]
+                    if members:
+                        entry["encodings"] = np.vstack(members).mean(axis=0, keepdims=True)
+                    elif force:
+                        continue  # Nothing left to average with the new settings
+                kept.append(entry)
+            self.entries = kept
+            self.mapped = None
+        return refreshed
+
+    def to_gallery(self, default_tolerance: float = 0.4) -> FaceGallery:
+        if self.mapped is not None:
+            labels = [entry["label"] for entry in self.entries for _ in range(len(entry["encodings"]))]
+            return FaceGallery.from_matrix(self.mapped, labels, self.tolerances, default_tolerance)
+        gallery = FaceGallery(default_tolerance=default_tolerance)
+        for entry in self.entries:
+            gallery.add(entry["label"], entry["encodings"], self.tolerances.get(entry["label"]))
+        return gallery
+
+
+def load_gallery(store_path: Optional[str], reference_image: Optional[str], tolerance: float) -> FaceGallery:
+    """Reference faces from a single image (largest face) or from a reference store"""
+    if reference_image:
+        rgb_image, face_locations, face_encodings = encode_image(reference_image)
+        index = pick_face(face_locations, rgb_image.shape, "largest")
+        if index is None:
+            raise ValueError(f"No face found in reference image: {reference_image}")
+        return FaceGallery.from_encoding(face_encodings[index], tolerance=tolerance)
+    store = ReferenceStore(store_path)
+    if not store.exists():
+        raise ValueError(f"No reference store at {store.meta_path} (enroll faces or use --reference)")
+    return store.load()
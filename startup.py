@@ -0,0 +1,129 @@
+"""
+Startup timing and background model warm-up
+face_recognition loads the dlib models when it is imported, and the first detection
+and encoding pay again for setting up their buffers. ModelWarmup does both on a
+background thread with a dummy frame, so the face selection dialog appears right away
+and the first overlay frame doesn't wait. StartupTimer records how long the heavy
+imports took and when the startup milestones were reached, for the startup report:
+
+    python face_blur.py --startup-report startup.json
+"""
+
+import importlib
+import json
+import sys
+import threading
+import time
+from typing import Optional
+
+
+class StartupTimer:
+    """Module import times and milestone times since the timer was created"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.imports = {}  # Module -> seconds its import took
+        self.background = set()  # Modules imported off the main thread (not on the critical path)
+        self.marks = {}  # Milestone -> seconds since start
+        self.lock = threading.Lock()
+
+    def import_module(self, name: str):
+        """Import a module, recording how long it took when it wasn't loaded yet"""
+        if name in sys.modules:
+            return sys.modules[name]
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        with self.lock:
+            self.imports.setdefault(name, time.perf_counter() - start)
+            if threading.current_thread() is not threading.main_thread():
+                self.background.add(name)
+        return module
+
+    def import_modules(self, *names: str):
+        for name in names:
+            self.import_module(name)
+
+    def mark(self, milestone: str):
+        """Record the first time a milestone is reached"""
+        with self.lock:
+            self.marks.setdefault(milestone, time.perf_counter() - self.start)
+
+    def report(self) -> dict:
+        """Import and milestone times in milliseconds"""
+        with self.lock:
+            return {
+                "imports_ms": {name: seconds * 1000.0 for name, seconds in self.imports.items()},
+                "background_imports": sorted(self.background),
+                "milestones_ms": {name: seconds * 1000.0 for name, seconds in
+                                  sorted(self.marks.items(), key=lambda item: item[1])},
+            }
+
+    def format(self) -> str:
+        """The report as text, e.g. for the console"""
+        report = self.report()
+        lines = ["Startup report (ms):"]
+        for name, ms in report["imports_ms"].items():
+            where = " (background)" if name in report["background_imports"] else ""
+            lines.append(f"  import {name:<20} {ms:8.1f}{where}")
+        for name, ms in report["milestones_ms"].items():
+            lines.append(f"  {name:<27} {ms:8.1f} since launch")
+        return "\n".join(lines)
+
+    def write(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+class ModelWarmup:
+    """Load the face models and run them once on a dummy frame, on a background thread
+
+    The detector for detection_model is kept so the processor can use the warmed
+    instance. Code that needs face_recognition before the overlay starts (the
+    selection dialog) calls wait().
+    """
+
+    def __init__(self, timer: StartupTimer, detection_model: str = "hog", detector_model_dir: Optional[str] = None):
+        self.timer = timer
+        self.detection_model = detection_model
+        self.detector_model_dir = detector_model_dir
+        self.detector = None  # Warmed FaceDetector for detection_model, None until ready or when it failed
+        self.error = None  # Why warming up failed (the processor then reports it when it loads the models)
+        self.thread = None
+        self.done = threading.Event()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+        self.thread.start()
+
+    def ready(self) -> bool:
+        return self.done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the models are loaded, True unless the timeout expired"""
+        return self.done.wait(timeout)
+
+    def take_detector(self, detection_model: str):
+        """The warmed detector if it is ready and for this backend, else None"""
+        if not self.ready() or self.detector is None or self.detector.name != detection_model:
+            return None
+        detector, self.detector = self.detector, None  # Detectors aren't shared between threads
+        return detector
+
+    def _run(self):
+        try:
+            # Imported here rather than at the top, so the startup report times them
+            import numpy as np
+            from detectors import create_detector
+            face_recognition = self.timer.import_module("face_recognition")
+            # A gray gradient gives the detectors something to compute on
+            frame = np.repeat(np.linspace(0, 255, 320, dtype=np.uint8)[None, :, None], 240, axis=0)
+            frame = np.ascontiguousarray(np.repeat(frame, 3, axis=2))
+            detector = create_detector(self.detection_model, 1, self.detector_model_dir)
+            detector.detect(frame)
+            face_recognition.face_encodings(frame, [(40, 240, 200, 80)])  # Landmark and descriptor networks
+            self.detector = detector
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.timer.mark("models_ready")
+            self.done.set()
@@ -0,0 +1,259 @@
+"""
+Runtime telemetry
+Low-overhead counters, rates, gauges and ring-buffer histograms for the per-stage
+timings of the capture/detection/composition pipeline, with two exporters: periodic
+JSON lines and a local Prometheus-style text endpoint.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:  # psutil is optional, RSS falls back to /proc or getrusage
+    psutil = None
+
+QUANTILES = (50, 95, 99)
+
+
+def process_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, or None when it can't be read"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Peak rather than current RSS; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+class RingHistogram:
+    """The last capacity samples of a value in a preallocated ring buffer
+
+    Recording is O(1) and allocation-free; percentiles are only computed when a
+    snapshot is taken.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.index = 0
+        self.count = 0  # Samples recorded since creation (not capped by capacity)
+        self.last = 0.0
+
+    def record(self, value: float):
+        self.values[self.index] = value
+        self.index = (self.index + 1) % len(self.values)
+        self.count += 1
+        self.last = value
+
+    def summary(self) -> dict:
+        filled = self.values[:min(self.count, len(self.values))]
+        if not len(filled):
+            return {"count": 0}
+        percentiles = np.percentile(filled, QUANTILES)
+        summary = {f"p{q}": float(p) for q, p in zip(QUANTILES, percentiles)}
+        summary.update(mean=float(filled.mean()), max=float(filled.max()), last=self.last, count=self.count)
+        return summary
+
+
+class RateMeter:
+    """Counted amount per second over a sliding time window"""
+
+    def __init__(self, window: float = 2.0, capacity: int = 1024):
+        self.window = window
+        self.events = deque(maxlen=capacity)  # (time, amount)
+
+    def mark(self, now: float, amount: int = 1):
+        self.events.append((now, amount))
+
+    def rate(self, now: float) -> float:
+        recent = [event for event in self.events if event[0] >= now - self.window]
+        if len(recent) < 2:
+            return 0.0
+        # The window starts at the first event, so its amount falls before the measured span
+        return sum(amount for _, amount in recent[1:]) / max(recent[-1][0] - recent[0][0], 1e-6)
+
+
+class Telemetry:
+    """Pipeline metrics shared by the processor thread, its stages and the window
+
+    Stage timings are recorded in seconds and reported in milliseconds. Sources are
+    callbacks polled at snapshot time for values that are cheaper to read than to push
+    (queue depths, drop counters).
+    """
+
+    def __init__(self, capacity: int = 1024, rate_window: float = 2.0):
+        self.capacity = capacity
+        self.rate_window = rate_window
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.histograms: Dict[str, RingHistogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.rates: Dict[str, RateMeter] = {}
+        self.gauges: Dict[str, float] = {}
+        self.sources: List[Callable[[], dict]] = []
+
+    def record(self, stage: str, seconds: float):
+        """Add a timing sample for a stage"""
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = RingHistogram(self.capacity)
+            histogram.record(seconds)
+
+    def count(self, counter: str, amount: int = 1):
+        """Increment a counter; its per-second rate is tracked as well"""
+        now = time.monotonic()
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+            meter = self.rates.get(counter)
+            if meter is None:
+                meter = self.rates[counter] = RateMeter(self.rate_window)
+            meter.mark(now, amount)
+
+    def set_gauge(self, name: str, value: float):
+        self.gauges[name] = value
+
+    def add_source(self, source: Callable[[], dict]):
+        """Register a callback returning {gauge name: value}, polled by snapshot()"""
+        self.sources.append(source)
+
+    def snapshot(self) -> dict:
+        """Current values of every metric, timings in milliseconds"""
+        now = time.monotonic()
+        gauges = {}
+        for source in self.sources:
+            try:
+                gauges.update(source())
+            except Exception as e:
+                print(f"Telemetry source error: {e}")
+        with self.lock:
+            stages = {}
+            for stage, histogram in self.histograms.items():
+                summary = histogram.summary()
+                stages[stage] = {key: value * 1000.0 if key != "count" else value
+                                 for key, value in summary.items()}
+            counters = dict(self.counters)
+            rates = {name: meter.rate(now) for name, meter in self.rates.items()}
+            gauges.update(self.gauges)
+        return {
+            "time": time.time(),
+            "uptime": now - self.started,
+            "stages": stages,
+            "counters": counters,
+            "rates": rates,
+            "gauges": gauges,
+            "rss_bytes": process_rss(),
+        }
+
+    def prometheus_text(self, prefix: str = "face_blur") -> str:
+        """Snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = [f"# TYPE {prefix}_stage_seconds summary"]
+        for stage, stats in sorted(snapshot["stages"].items()):
+            for q in QUANTILES:
+                if f"p{q}" in stats:
+                    lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q / 100}"}} '
+                                 f'{stats[f"p{q}"] / 1000.0:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f'{prefix}_events_total{{event="{name}"}} {value}')
+        lines.append(f"# TYPE {prefix}_events_per_second gauge")
+        for name, value in sorted(snapshot["rates"].items()):
+            lines.append(f'{prefix}_events_per_second{{event="{name}"}} {value:.3f}')
+        lines.append(f"# TYPE {prefix}_gauge gauge")
+        for name, value in sorted(snapshot["gauges"].items()):
+            lines.append(f'{prefix}_gauge{{name="{name}"}} {value}')
+        if snapshot["rss_bytes"] is not None:
+            lines.append(f"# TYPE {prefix}_rss_bytes gauge")
+            lines.append(f"{prefix}_rss_bytes {snapshot['rss_bytes']}")
+        lines.append(f"# TYPE {prefix}_uptime_seconds gauge")
+        lines.append(f"{prefix}_uptime_seconds {snapshot['uptime']:.1f}")
+        return "\n".join(lines) + "\n"
+
+
+class JsonLinesExporter:
+    """Append a telemetry snapshot as one JSON line every interval seconds"""
+
+    def __init__(self, telemetry: Telemetry, path: str, interval: float = 5.0):
+        self.telemetry = telemetry
+        self.path = path
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="telemetry-jsonl", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while not self.stop_event.wait(self.interval):
+                f.write(json.dumps(self.telemetry.snapshot()) + "\n")
+                f.flush()
+
+
+class MetricsServer:
+    """Serve the telemetry as Prometheus text on http://host:port/metrics (and JSON on /json)"""
+
+    def __init__(self, telemetry: Telemetry, port: int = 9464, host: str = "127.0.0.1"):
+        self.telemetry = telemetry
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        telemetry = self.telemetry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics"):
+                    body = telemetry.prometheus_text().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4"
+                elif self.path.startswith("/json"):
+                    body = json.dumps(telemetry.snapshot()).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of the console
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self.server.server_address[1]  # Resolves port 0 to the chosen port
+        self.thread = threading.Thread(target=self.server.serve_forever, name="telemetry-http", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,88 @@
+"""
+Tiled detection scheduling
+Cuts large capture regions (whole monitors) into overlapping tiles and hands out a
+limited number of tiles per detection pass. Tiles whose content changed are scanned
+first, most overdue first, and every tile is rescanned at least every refresh_passes
+passes, so a desktop of several 4K monitors is covered at a steady per-pass cost.
+"""
+
+from typing import List, Optional, Tuple
+
+from change_detection import regions_intersect
+
+# Regions use the face_recognition box convention: (top, right, bottom, left)
+Region = Tuple[int, int, int, int]
+
+
+def tile_grid(region: Region, tile_size: int, overlap: int) -> List[Region]:
+    """Cut a region into a grid of about tile_size tiles that overlap by overlap pixels
+
+    The overlap is at least the size of the largest face expected on a seam, so a
+    face cut by one tile boundary is whole in the neighbouring tile.
+    """
+    top, right, bottom, left = region
+    height, width = bottom - top, right - left
+    rows = max(1, -(-height // tile_size))
+    cols = max(1, -(-width // tile_size))
+    tiles = []
+    for row in range(rows):
+        for col in range(cols):
+            tile_top = top + row * height // rows
+            tile_bottom = top + (row + 1) * height // rows
+            tile_left = left + col * width // cols
+            tile_right = left + (col + 1) * width // cols
+            tiles.append((max(top, tile_top - overlap // 2), min(right, tile_right + overlap // 2),
+                          min(bottom, tile_bottom + overlap // 2), max(left, tile_left - overlap // 2)))
+    return tiles
+
+
+class TileScheduler:
+    """Round-robin scan budget over the tiles of the capture regions"""
+
+    def __init__(self, tile_size: int = 640, overlap: int = 160, budget: int = 4, refresh_passes: int = 30):
+        self.tile_size = tile_size
+        self.overlap = overlap  # Pixels shared by neighbouring tiles
+        self.budget = budget  # Tiles scanned per detection pass
+        self.refresh_passes = refresh_passes  # Rescan unchanged tiles after this many passes
+
+        self.regions = None  # Regions the tiles were cut from
+        self.tiles = []
+        self.pending = []  # Per tile: changed since it was last scanned
+        self.last_scanned = []  # Per tile: pass number of the last scan
+        self.passes = 0
+
+    def layout(self, regions: List[Region]):
+        """Cut new regions into tiles; every tile starts out pending"""
+        self.regions = list(regions)
+        self.tiles = [tile for region in self.regions for tile in tile_grid(region, self.tile_size, self.overlap)]
+        self.pending = [True] * len(self.tiles)
+        self.last_scanned = [0] * len(self.tiles)
+
+    def select(self, changed: Optional[List[Region]] = None) -> List[Region]:
+        """Tiles to scan on this pass
+
+        changed are the regions that changed since the previous pass (None = everything).
+        """
+        self.passes += 1
+        for index, tile in enumerate(self.tiles):
+            if changed is None or any(regions_intersect(tile, region) for region in changed):
+                self.pending[index] = True
+            elif self.passes - self.last_scanned[index] >= self.refresh_passes:
+                self.pending[index] = True  # Catch faces a previous scan missed
+        due = sorted((index for index, pending in enumerate(self.pending) if pending),
+                     key=lambda index: self.last_scanned[index])[:self.budget]
+        for index in due:
+            self.pending[index] = False
+            self.last_scanned[index] = self.passes
+        return [self.tiles[index] for index in sorted(due)]
+
+    def select_all(self) -> List[Region]:
+        """Every tile, for a pass that has to scan the whole area at once"""
+        self.passes += 1
+        self.pending = [False] * len(self.tiles)
+        self.last_scanned = [self.passes] * len(self.tiles)
+        return list(self.tiles)
+
+    def backlog(self) -> int:
+        """Tiles still waiting for a scan"""
+        return sum(self.pending)